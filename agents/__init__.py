@@ -2,7 +2,7 @@
 AI Query Agent - Agents Package v3
 Enhanced with specialized agents from FINCH architecture
 """
-from .supervisor import SupervisorAgent
+from .supervisor import SupervisorAgent, AgentError
 from .intent_agent import IntentAgent
 from .sql_writer import SQLWriterAgent
 from .validation_agent import ValidationAgent
@@ -14,6 +14,7 @@ from .multi_db_supervisor import MultiDatabaseSupervisor
 __all__ = [
     # Core Agents
     "SupervisorAgent",
+    "AgentError",
     "MultiDatabaseSupervisor",
     "IntentAgent", 
     "SQLWriterAgent",
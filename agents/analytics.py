@@ -0,0 +1,47 @@
+"""
+Analytics Kernels - Numerical post-processing for Insight Agent
+Uses Numba JIT when installed, with a NumPy fallback
+"""
+import numpy as np
+
+try:
+    from numba import njit, prange
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+
+if HAVE_NUMBA:
+    @njit(cache=True, parallel=True)
+    def _relative_change(current: np.ndarray, previous: np.ndarray) -> np.ndarray:
+        out = np.empty_like(current)
+        for i in prange(current.size):
+            if previous[i] == 0.0:
+                out[i] = np.nan
+            else:
+                out[i] = (current[i] - previous[i]) / abs(previous[i])
+        return out
+else:
+    def _relative_change(current: np.ndarray, previous: np.ndarray) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out = (current - previous) / np.abs(previous)
+        out[previous == 0.0] = np.nan
+        return out
+
+
+def relative_change(current, previous) -> np.ndarray:
+    """
+    Relative change per segment: (current - previous) / |previous|.
+    
+    Segments with no previous value get NaN instead of an infinite change.
+    """
+    return _relative_change(
+        np.asarray(current, dtype=np.float64),
+        np.asarray(previous, dtype=np.float64)
+    )
+
+
+def warmup():
+    """Compile kernels ahead of the first request (no-op without Numba)"""
+    if HAVE_NUMBA:
+        relative_change(np.zeros(1), np.ones(1))
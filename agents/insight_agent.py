@@ -4,10 +4,109 @@ Inspired by Uber FINCH's Insight Generation intent
 """
 from typing import Optional, Any
 from dataclasses import dataclass
+import asyncio
+import logging
+import orjson
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from pydantic import BaseModel, Field
 
+from .analytics import relative_change
+from .keyword_matcher import KeywordMatcher
+from services.ai_gateway import BatchCoalescer
+from .llm_errors import LLM_ERRORS
+from .parsers import get_format_instructions
+
+logger = logging.getLogger(__name__)
+
+
+
+# Insight type keywords (casefolded, matched as substrings)
+VARIANCE_WORDS = frozenset({
+    "why", "tại sao", "drop", "increase", "change",
+    "giảm", "tăng", "thay đổi", "differ", "khác",
+})
+TREND_WORDS = frozenset({
+    "trend", "xu hướng", "over time", "theo thời gian",
+    "growth", "tăng trưởng",
+})
+ANOMALY_WORDS = frozenset({
+    "unusual", "bất thường", "anomaly", "outlier",
+    "strange", "lạ",
+})
+COMPARISON_WORDS = frozenset({
+    "compare", "so sánh", "vs", "versus", "difference",
+    "between", "giữa",
+})
+
+
+# Fixed-shape insight queries, built once at import
+VARIANCE_WINDOW_DAYS = 30
+TREND_WINDOW_MONTHS = 12
+
+VARIANCE_SQL = (
+    # Current period
+    f"""
+            SELECT 
+                SUM(total_amount) as current_revenue,
+                COUNT(*) as current_orders
+            FROM orders
+            WHERE order_date >= date('now', '-{VARIANCE_WINDOW_DAYS} days')
+            """,
+    # Previous period
+    f"""
+            SELECT 
+                SUM(total_amount) as previous_revenue,
+                COUNT(*) as previous_orders
+            FROM orders
+            WHERE order_date >= date('now', '-{2 * VARIANCE_WINDOW_DAYS} days') 
+              AND order_date < date('now', '-{VARIANCE_WINDOW_DAYS} days')
+            """,
+    # Breakdown by category
+    f"""
+            SELECT 
+                c.city,
+                SUM(CASE WHEN o.order_date >= date('now', '-{VARIANCE_WINDOW_DAYS} days') 
+                    THEN o.total_amount ELSE 0 END) as current,
+                SUM(CASE WHEN o.order_date < date('now', '-{VARIANCE_WINDOW_DAYS} days') 
+                    THEN o.total_amount ELSE 0 END) as previous
+            FROM orders o
+            JOIN customers c ON o.customer_id = c.id
+            WHERE o.order_date >= date('now', '-{2 * VARIANCE_WINDOW_DAYS} days')
+            GROUP BY c.city
+            ORDER BY (current - previous) ASC
+            LIMIT 5
+            """,
+)
+
+TREND_SQL = (
+    f"""
+            SELECT 
+                strftime('%Y-%m', order_date) as month,
+                SUM(total_amount) as revenue,
+                COUNT(*) as orders,
+                AVG(total_amount) as avg_order
+            FROM orders
+            WHERE order_date >= date('now', '-{TREND_WINDOW_MONTHS} months')
+            GROUP BY month
+            ORDER BY month
+            """,
+)
+
+COMPARISON_SQL = (
+    """
+            SELECT 
+                c.city,
+                COUNT(*) as orders,
+                SUM(o.total_amount) as revenue,
+                AVG(o.total_amount) as avg_order
+            FROM orders o
+            JOIN customers c ON o.customer_id = c.id
+            GROUP BY c.city
+            ORDER BY revenue DESC
+            """,
+)
+
 
 class InsightResult(BaseModel):
     """Insight generation result"""
@@ -53,34 +152,32 @@ Generate the insight analysis in JSON format:
 {format_instructions}
 """
     
+    # Rows per query result passed to the LLM - it cannot reason over more
+    MAX_CONTEXT_ROWS = 50
+    
+    # Insight type keywords, in priority order
+    INSIGHT_TYPES = KeywordMatcher({
+        "variance": VARIANCE_WORDS,
+        "trend": TREND_WORDS,
+        "anomaly": ANOMALY_WORDS,
+        "comparison": COMPARISON_WORDS,
+    })
+    
     def __init__(self, llm=None, db_connector=None):
         self.llm = llm
         self.db_connector = db_connector
         self.parser = JsonOutputParser(pydantic_object=InsightResult)
+        
+        # Prompt, chain and format instructions are fixed - build them once
+        self.prompt = ChatPromptTemplate.from_template(self.SYSTEM_PROMPT)
+        self.format_instructions = get_format_instructions(JsonOutputParser, InsightResult)
+        self.chain = self.prompt | self.llm | self.parser if self.llm else None
+        # Concurrent insight requests are merged into one batched LLM call
+        self._coalescer = BatchCoalescer(self.chain) if self.chain else None
     
     def _detect_insight_type(self, question: str) -> str:
         """Detect what type of insight is requested"""
-        question_lower = question.lower()
-        
-        variance_words = ["why", "tại sao", "drop", "increase", "change", 
-                         "giảm", "tăng", "thay đổi", "differ", "khác"]
-        trend_words = ["trend", "xu hướng", "over time", "theo thời gian", 
-                      "growth", "tăng trưởng"]
-        anomaly_words = ["unusual", "bất thường", "anomaly", "outlier", 
-                        "strange", "lạ"]
-        comparison_words = ["compare", "so sánh", "vs", "versus", "difference",
-                           "between", "giữa"]
-        
-        if any(w in question_lower for w in variance_words):
-            return "variance"
-        elif any(w in question_lower for w in trend_words):
-            return "trend"
-        elif any(w in question_lower for w in anomaly_words):
-            return "anomaly"
-        elif any(w in question_lower for w in comparison_words):
-            return "comparison"
-        else:
-            return "summary"
+        return self.INSIGHT_TYPES.first(question) or "summary"
     
     async def generate_insight(
         self,
@@ -103,51 +200,22 @@ Generate the insight analysis in JSON format:
     
     async def _variance_analysis(self, question: str, context: dict) -> dict:
         """Analyze variance and explain changes"""
-        # Generate SQL for period comparison
-        sql_queries = [
-            # Current period
-            """
-            SELECT 
-                SUM(total_amount) as current_revenue,
-                COUNT(*) as current_orders
-            FROM orders
-            WHERE order_date >= date('now', '-30 days')
-            """,
-            # Previous period
-            """
-            SELECT 
-                SUM(total_amount) as previous_revenue,
-                COUNT(*) as previous_orders
-            FROM orders
-            WHERE order_date >= date('now', '-60 days') 
-              AND order_date < date('now', '-30 days')
-            """,
-            # Breakdown by category
-            """
-            SELECT 
-                c.city,
-                SUM(CASE WHEN o.order_date >= date('now', '-30 days') 
-                    THEN o.total_amount ELSE 0 END) as current,
-                SUM(CASE WHEN o.order_date < date('now', '-30 days') 
-                    THEN o.total_amount ELSE 0 END) as previous
-            FROM orders o
-            JOIN customers c ON o.customer_id = c.id
-            WHERE o.order_date >= date('now', '-60 days')
-            GROUP BY c.city
-            ORDER BY (current - previous) ASC
-            LIMIT 5
-            """
-        ]
+        # Fixed-shape SQL for period comparison
+        sql_queries = list(VARIANCE_SQL)
         
-        # Execute queries if connector available
+        # Execute queries concurrently if connector available
         results = []
         if self.db_connector:
-            for sql in sql_queries:
-                try:
-                    result = await self.db_connector.execute(sql)
-                    results.append(result)
-                except Exception as e:
-                    results.append({"error": str(e)})
+            outcomes = await asyncio.gather(
+                *(self.db_connector.execute(sql) for sql in sql_queries),
+                return_exceptions=True
+            )
+            results = [
+                {"error": str(r)} if isinstance(r, Exception) else r
+                for r in outcomes
+            ]
+            # Annotate the per-city breakdown with relative change
+            results[-1] = self._with_relative_change(results[-1])
         
         # Use LLM to generate insight if available
         if self.llm:
@@ -162,26 +230,33 @@ Generate the insight analysis in JSON format:
             "recommendations": []
         }
     
+    def _with_relative_change(self, result: dict) -> dict:
+        """Add a change_pct column to a (segment, current, previous) result"""
+        rows = result.get("rows") or []
+        if result.get("error") or not rows:
+            return result
+        
+        current = [float(row[1] or 0) for row in rows]
+        previous = [float(row[2] or 0) for row in rows]
+        changes = relative_change(current, previous)
+        
+        return {
+            **result,
+            "columns": [*result.get("columns", []), "change_pct"],
+            "rows": [
+                [*row, None if change != change else round(float(change) * 100, 2)]
+                for row, change in zip(rows, changes)
+            ]
+        }
+    
     async def _trend_analysis(self, question: str, context: dict) -> dict:
         """Analyze trends over time"""
-        sql_queries = [
-            """
-            SELECT 
-                strftime('%Y-%m', order_date) as month,
-                SUM(total_amount) as revenue,
-                COUNT(*) as orders,
-                AVG(total_amount) as avg_order
-            FROM orders
-            WHERE order_date >= date('now', '-12 months')
-            GROUP BY month
-            ORDER BY month
-            """
-        ]
+        sql_queries = list(TREND_SQL)
         
         return {
             "insight_type": "trend",
             "title": "Trend Analysis",
-            "summary": "12-month trend analysis",
+            "summary": f"{TREND_WINDOW_MONTHS}-month trend analysis",
             "sql_queries": sql_queries,
             "key_findings": ["Monthly revenue trend", "Order volume trend"],
             "recommendations": []
@@ -189,19 +264,7 @@ Generate the insight analysis in JSON format:
     
     async def _comparison_analysis(self, question: str, context: dict) -> dict:
         """Compare different segments or periods"""
-        sql_queries = [
-            """
-            SELECT 
-                c.city,
-                COUNT(*) as orders,
-                SUM(o.total_amount) as revenue,
-                AVG(o.total_amount) as avg_order
-            FROM orders o
-            JOIN customers c ON o.customer_id = c.id
-            GROUP BY c.city
-            ORDER BY revenue DESC
-            """
-        ]
+        sql_queries = list(COMPARISON_SQL)
         
         return {
             "insight_type": "comparison",
@@ -226,6 +289,20 @@ Generate the insight analysis in JSON format:
             "recommendations": []
         }
     
+    def _truncate_result(self, result: Any) -> Any:
+        """Keep only the first rows of a query result for the prompt"""
+        if isinstance(result, dict) and len(result.get("rows") or []) > self.MAX_CONTEXT_ROWS:
+            return {**result, "rows": result["rows"][:self.MAX_CONTEXT_ROWS], "truncated": True}
+        return result
+    
+    def _serialize_context(self, context: dict) -> str:
+        """Serialize prompt context as compact JSON"""
+        return orjson.dumps(
+            context,
+            default=str,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        ).decode()
+    
     async def _llm_insight(
         self,
         question: str,
@@ -233,23 +310,22 @@ Generate the insight analysis in JSON format:
         results: list
     ) -> dict:
         """Use LLM to generate insight"""
-        prompt = ChatPromptTemplate.from_template(self.SYSTEM_PROMPT)
-        
         context = {
             "sql_queries": sql_queries,
-            "results": results
+            "results": [self._truncate_result(r) for r in results]
         }
         
-        chain = prompt | self.llm | self.parser
-        
         try:
-            result = await chain.ainvoke({
+            result = await self._coalescer.ainvoke({
                 "question": question,
-                "context": str(context),
-                "format_instructions": self.parser.get_format_instructions()
+                "context": self._serialize_context(context),
+                "format_instructions": self.format_instructions
             })
             return result
         except Exception as e:
+            # Known LLM failures are expected; anything else is a bug worth a traceback
+            if not isinstance(e, LLM_ERRORS):
+                logger.exception("Unexpected insight generation failure")
             return {
                 "insight_type": self._detect_insight_type(question),
                 "title": "Analysis",
@@ -2,13 +2,29 @@
 Intent Agent v2 - Enhanced with 6 intent types from FINCH
 """
 from typing import Literal, Optional
+from collections import OrderedDict
+import hashlib
+import logging
+import re
+import time
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+
+from services.ai_gateway import BatchCoalescer
+from .keyword_matcher import KeywordMatcher
+from .llm_errors import LLM_ERRORS
+from .parsers import get_format_instructions
+
+logger = logging.getLogger(__name__)
+
 
 
 class IntentResult(BaseModel):
     """Result of intent analysis - expanded for FINCH intent flow"""
+    # Results are cached and shared between requests, so keep them immutable
+    model_config = ConfigDict(frozen=True)
+    
     intent_type: Literal[
         "data_retrieval",      # Ad-hoc queries
         "report_generation",   # Predefined reports (PO, P&L)
@@ -99,91 +115,252 @@ Also extract:
 {format_instructions}
 """
     
-    def __init__(self, llm):
+    # Fallback keyword groups, in priority order
+    FALLBACK_INTENTS = KeywordMatcher({
+        "report_generation": ['report', 'báo cáo', 'p&l', 'summary'],
+        "insight_generation": ['why', 'tại sao', 'variance', 'trend', 'xu hướng'],
+        "query_assistance": ['how to', 'help', 'giúp', 'cách'],
+        "knowledge_base": ['policy', 'chính sách', 'rule', 'quy định'],
+    })
+    
+    FALLBACK_QUERY_TYPES = KeywordMatcher({
+        "aggregate": ['total', 'sum', 'count', 'average', 'tổng', 'đếm'],
+        "compare": ['compare', 'so sánh', 'vs', 'versus'],
+        "trend": ['trend', 'over time', 'by month', 'theo tháng'],
+    })
+    
+    # Prebuilt fallback results - trusted literals, so skip validation
+    FALLBACK_RESULTS = {
+        "report_generation": IntentResult.model_construct(
+            intent_type="report_generation",
+            sub_intent="general_report",
+            confidence=0.6,
+            suggested_tools=["report_runner"]
+        ),
+        "insight_generation": IntentResult.model_construct(
+            intent_type="insight_generation",
+            sub_intent="variance_explanation",
+            confidence=0.6,
+            suggested_tools=["insight_generator"]
+        ),
+        "query_assistance": IntentResult.model_construct(
+            intent_type="query_assistance",
+            sub_intent="sql_help",
+            confidence=0.6,
+            suggested_tools=["sql_assistant"]
+        ),
+        "knowledge_base": IntentResult.model_construct(
+            intent_type="knowledge_base",
+            sub_intent="policy_lookup",
+            confidence=0.6,
+            suggested_tools=["policy_finder"]
+        ),
+    }
+    
+    # Unambiguous phrasings classified without the LLM, in priority order.
+    # Each must match the whole question's form, not just contain a keyword
+    FAST_PATH = (
+        ("query_assistance", re.compile(
+            r"^\s*(help\s*[?!.]*\s*$|how (do i|to) (use|write)\b)", re.IGNORECASE
+        )),
+        ("report_generation", re.compile(
+            r"^\s*((generate|create|run|give me|show me)\s+)?((the|a|an|my)\s+)?"
+            r"([\w&-]+\s+){0,3}(report|báo cáo|p&l)\s*[?!.]*\s*$",
+            re.IGNORECASE
+        )),
+        ("insight_generation", re.compile(
+            r"^\s*(why|tại sao|what (explains|caused)|explain the (variance|anomal\w*|drop|spike))\b",
+            re.IGNORECASE
+        )),
+    )
+    DATA_RETRIEVAL_RE = re.compile(
+        r"^\s*(show|list|get|find|count|display|how many|how much|top \d+|liệt kê|cho tôi)\b",
+        re.IGNORECASE
+    )
+    # Lookups that also ask for a report or an explanation are left to the LLM
+    MIXED_INTENT_RE = re.compile(
+        r"\b(report|báo cáo|p&l|why|tại sao|insights?|anomal\w*|variance|explain\w*)\b",
+        re.IGNORECASE
+    )
+    
+    DATA_RETRIEVAL_RESULTS = {
+        query_type: IntentResult.model_construct(
+            intent_type="data_retrieval",
+            sub_intent="ad_hoc_query",
+            query_type=query_type,
+            confidence=0.7,
+            suggested_tools=["column_finder", "value_finder", "table_rules", "execute_sql"]
+        )
+        for query_type in ("select", "aggregate", "compare", "trend")
+    }
+    
+    def __init__(self, llm, cache_size: int = 1024, cache_ttl_seconds: int = 3600):
         self.llm = llm
+        self.cache_size = cache_size
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self._intent_cache: OrderedDict[str, tuple[IntentResult, float]] = OrderedDict()
         self.parser = PydanticOutputParser(pydantic_object=IntentResult)
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", self.SYSTEM_PROMPT),
             ("human", "Analyze this question: {question}")
         ])
         self.chain = self.prompt | self.llm | self.parser
+        # Concurrent analyze() calls are merged into one batched LLM call, in
+        # the short lane so they aren't stuck behind SQL/report prompts
+        self._coalescer = BatchCoalescer(self.chain, lane="short")
+        self.format_instructions = get_format_instructions(PydanticOutputParser, IntentResult)
+    
+    def _cache_key(self, question: str) -> str:
+        """Generate cache key from normalized question"""
+        normalized = question.strip().lower()
+        return hashlib.blake2b(normalized.encode(), digest_size=16).hexdigest()
+    
+    def _cache_get(self, key: str) -> Optional[IntentResult]:
+        """Get cached intent, dropping it if expired"""
+        entry = self._intent_cache.get(key)
+        if entry is None:
+            return None
+        
+        result, timestamp = entry
+        if time.monotonic() - timestamp > self.cache_ttl_seconds:
+            del self._intent_cache[key]
+            return None
+        
+        self._intent_cache.move_to_end(key)
+        return result
+    
+    def _cache_set(self, key: str, result: IntentResult):
+        """Cache intent with LRU eviction"""
+        self._intent_cache[key] = (result, time.monotonic())
+        self._intent_cache.move_to_end(key)
+        while len(self._intent_cache) > self.cache_size:
+            self._intent_cache.popitem(last=False)
+    
+    def cache_clear(self):
+        """Clear cached intent results"""
+        self._intent_cache.clear()
+    
+    def _fast_analysis(self, question: str) -> Optional[IntentResult]:
+        """Rule-based classification for obvious questions, or None to ask the LLM"""
+        for intent_type, pattern in self.FAST_PATH:
+            if pattern.search(question):
+                return self.FALLBACK_RESULTS[intent_type]
+        
+        if self.DATA_RETRIEVAL_RE.match(question) and not self.MIXED_INTENT_RE.search(question):
+            query_type = self.FALLBACK_QUERY_TYPES.first(question) or "select"
+            return self.DATA_RETRIEVAL_RESULTS[query_type]
+        return None
     
     async def analyze(self, question: str) -> IntentResult:
         """Analyze user question and return intent result"""
+        fast = self._fast_analysis(question)
+        if fast is not None:
+            return fast
+        
+        key = self._cache_key(question)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        
         try:
-            result = await self.chain.ainvoke({
+            result = await self._coalescer.ainvoke({
                 "question": question,
-                "format_instructions": self.parser.get_format_instructions()
+                "format_instructions": self.format_instructions
             })
+            self._cache_set(key, result)
             return result
         except Exception as e:
+            # Known LLM failures are expected; anything else is a bug worth a traceback
+            if not isinstance(e, LLM_ERRORS):
+                logger.exception("Unexpected intent analysis failure")
             # Fallback to data_retrieval for SQL-like questions
             return self._fallback_analysis(question)
     
     def _fallback_analysis(self, question: str) -> IntentResult:
         """Rule-based fallback when LLM fails"""
-        question_lower = question.lower()
-        
-        # Report keywords
-        if any(kw in question_lower for kw in ['report', 'báo cáo', 'p&l', 'summary']):
-            return IntentResult(
-                intent_type="report_generation",
-                sub_intent="general_report",
-                confidence=0.6,
-                suggested_tools=["report_runner"]
-            )
-        
-        # Insight keywords
-        if any(kw in question_lower for kw in ['why', 'tại sao', 'variance', 'trend', 'xu hướng']):
-            return IntentResult(
-                intent_type="insight_generation",
-                sub_intent="variance_explanation",
-                confidence=0.6,
-                suggested_tools=["insight_generator"]
-            )
-        
-        # Help keywords
-        if any(kw in question_lower for kw in ['how to', 'help', 'giúp', 'cách']):
-            return IntentResult(
-                intent_type="query_assistance",
-                sub_intent="sql_help",
-                confidence=0.6,
-                suggested_tools=["sql_assistant"]
-            )
-        
-        # Policy keywords
-        if any(kw in question_lower for kw in ['policy', 'chính sách', 'rule', 'quy định']):
-            return IntentResult(
-                intent_type="knowledge_base",
-                sub_intent="policy_lookup",
-                confidence=0.6,
-                suggested_tools=["policy_finder"]
-            )
+        intent_type = self.FALLBACK_INTENTS.first(question)
+        if intent_type:
+            return self.FALLBACK_RESULTS[intent_type]
         
         # Default to data retrieval
-        query_type = "select"
-        if any(kw in question_lower for kw in ['total', 'sum', 'count', 'average', 'tổng', 'đếm']):
-            query_type = "aggregate"
-        elif any(kw in question_lower for kw in ['compare', 'so sánh', 'vs', 'versus']):
-            query_type = "compare"
-        elif any(kw in question_lower for kw in ['trend', 'over time', 'by month', 'theo tháng']):
-            query_type = "trend"
-        
-        return IntentResult(
-            intent_type="data_retrieval",
-            sub_intent="ad_hoc_query",
-            query_type=query_type,
-            confidence=0.7,
-            suggested_tools=["column_finder", "value_finder", "table_rules", "execute_sql"]
-        )
+        query_type = self.FALLBACK_QUERY_TYPES.first(question) or "select"
+        return self.DATA_RETRIEVAL_RESULTS[query_type]
     
     def analyze_sync(self, question: str) -> IntentResult:
         """Synchronous version of analyze"""
+        fast = self._fast_analysis(question)
+        if fast is not None:
+            return fast
+        
+        key = self._cache_key(question)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        
         try:
             result = self.chain.invoke({
                 "question": question,
-                "format_instructions": self.parser.get_format_instructions()
+                "format_instructions": self.format_instructions
             })
+            self._cache_set(key, result)
             return result
-        except Exception:
+        except Exception as e:
+            if not isinstance(e, LLM_ERRORS):
+                logger.exception("Unexpected intent analysis failure")
             return self._fallback_analysis(question)
+    
+    def _pending_questions(self, questions: list[str]) -> tuple[dict[str, IntentResult], list[str]]:
+        """Split questions into cached results and unique uncached questions"""
+        cached: dict[str, IntentResult] = {}
+        pending: dict[str, str] = {}
+        for question in questions:
+            key = self._cache_key(question)
+            if key in cached or key in pending:
+                continue
+            result = self._fast_analysis(question) or self._cache_get(key)
+            if result is not None:
+                cached[key] = result
+            else:
+                pending[key] = question
+        return cached, list(pending.values())
+    
+    def _collect_batch(
+        self,
+        questions: list[str],
+        cached: dict[str, IntentResult],
+        pending: list[str],
+        outputs: list
+    ) -> list[IntentResult]:
+        """Merge batch outputs with cached results, in input order"""
+        for question, output in zip(pending, outputs):
+            key = self._cache_key(question)
+            if isinstance(output, Exception):
+                cached[key] = self._fallback_analysis(question)
+            else:
+                self._cache_set(key, output)
+                cached[key] = output
+        return [cached[self._cache_key(q)] for q in questions]
+    
+    async def analyze_batch(self, questions: list[str], max_concurrency: int = 8) -> list[IntentResult]:
+        """Analyze many questions, running uncached LLM calls concurrently"""
+        cached, pending = self._pending_questions(questions)
+        outputs = []
+        if pending:
+            outputs = await self.chain.abatch(
+                [{"question": q, "format_instructions": self.format_instructions} for q in pending],
+                config={"max_concurrency": max_concurrency},
+                return_exceptions=True
+            )
+        return self._collect_batch(questions, cached, pending, outputs)
+    
+    def analyze_batch_sync(self, questions: list[str], max_concurrency: int = 8) -> list[IntentResult]:
+        """Synchronous version of analyze_batch (runs on a thread pool)"""
+        cached, pending = self._pending_questions(questions)
+        outputs = []
+        if pending:
+            outputs = self.chain.batch(
+                [{"question": q, "format_instructions": self.format_instructions} for q in pending],
+                config={"max_concurrency": max_concurrency},
+                return_exceptions=True
+            )
+        return self._collect_batch(questions, cached, pending, outputs)
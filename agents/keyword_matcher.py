@@ -0,0 +1,99 @@
+"""
+Keyword Matcher - Single-pass multi-keyword classification and phrase search
+Replaces chains of `any(kw in text for kw in [...])` checks
+"""
+import re
+from typing import Iterable, Optional
+
+
+class KeywordMatcher:
+    """
+    Match many keyword groups against a text in one regex scan.
+
+    Groups are checked in priority order: when several groups match,
+    `first()` returns the one declared first, exactly like a chain of
+    `if any(...): ... elif any(...)` checks.
+
+    Usage:
+        matcher = KeywordMatcher({
+            "report": ["report", "báo cáo"],
+            "insight": ["why", "trend"],
+        })
+        matcher.first("why did sales drop")  # -> "insight"
+    """
+
+    def __init__(self, groups: dict[str, Iterable[str]]):
+        self.groups: tuple[str, ...] = tuple(groups)
+
+        alternatives = []
+        for i, keywords in enumerate(groups.values()):
+            # Longest first so a keyword never shadows a longer one in its group
+            ordered = sorted({kw.casefold() for kw in keywords}, key=len, reverse=True)
+            if ordered:
+                alternatives.append(f"(?P<g{i}>{'|'.join(map(re.escape, ordered))})")
+
+        # Zero-width lookahead reports a match at every start position, so
+        # keywords overlapping a lower-priority match are never swallowed
+        self._pattern = re.compile(f"(?=(?:{'|'.join(alternatives)}))") if alternatives else None
+
+    def first(self, text: str) -> Optional[str]:
+        """Return the highest-priority group matching the text"""
+        if self._pattern is None:
+            return None
+
+        best = len(self.groups)
+        for match in self._pattern.finditer(text.casefold()):
+            index = int(match.lastgroup[1:])
+            if index < best:
+                best = index
+                if best == 0:
+                    break
+        return self.groups[best] if best < len(self.groups) else None
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """
+    Regex alternation for words, factored into a prefix trie.
+
+    Each start position walks shared prefixes once instead of retrying every
+    word, and optional tails are greedy, so the longest word still wins.
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in node.items() if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class PhraseMatcher:
+    """
+    Find which of many known phrases occur in a text, in one regex scan.
+
+    Usage:
+        matcher = PhraseMatcher(["last month", "order date"])
+        matcher.find_all("orders by order date last month")
+        # -> ["order date", "last month"]
+    """
+
+    def __init__(self, phrases: Iterable[str]):
+        # Longest first so the longest phrase starting at a position wins
+        ordered = sorted({p.casefold() for p in phrases if p}, key=len, reverse=True)
+        self.phrases: tuple[str, ...] = tuple(ordered)
+        # Lookahead so phrases overlapping an earlier match are still found
+        self._pattern = re.compile(f"(?=({_trie_pattern(ordered)}))") if ordered else None
+
+    def find_all(self, text: str) -> list[str]:
+        """Return the distinct phrases found, in order of first occurrence"""
+        if self._pattern is None:
+            return []
+        return list(dict.fromkeys(m.group(1) for m in self._pattern.finditer(text.casefold())))
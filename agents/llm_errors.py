@@ -0,0 +1,33 @@
+"""
+LLM Errors - Known failure modes of an LLM chain call
+Agents catch these for their rule-based fallbacks instead of bare Exception
+"""
+import asyncio
+
+import httpx
+from langchain_core.exceptions import OutputParserException
+from pydantic import ValidationError
+
+
+def _provider_errors() -> tuple[type[BaseException], ...]:
+    """Base error classes of the installed LLM provider SDKs"""
+    errors = []
+    try:
+        from openai import APIError
+        errors.append(APIError)
+    except ImportError:
+        pass
+    try:
+        from google.api_core.exceptions import GoogleAPIError
+        errors.append(GoogleAPIError)
+    except ImportError:
+        pass
+    return tuple(errors)
+
+
+LLM_ERRORS: tuple[type[BaseException], ...] = (
+    OutputParserException,
+    ValidationError,
+    asyncio.TimeoutError,
+    httpx.HTTPError,
+) + _provider_errors()
@@ -1,11 +1,99 @@
 """
 Multi-Database Supervisor - Extends SupervisorAgent for multi-database agents
 """
+import asyncio
+import copy
+import hashlib
+import logging
+import time
+from collections import OrderedDict
 from typing import Optional, Any
 
 from models import Agent, DatabaseSource
 from .supervisor import SupervisorAgent, QueryResponse
 
+logger = logging.getLogger(__name__)
+
+SEARCH_DB_TYPES = frozenset({"elasticsearch", "opensearch"})
+SUPPORTED_DB_TYPES = frozenset({"sqlite", "mysql", "postgresql", "sqlserver"}) | SEARCH_DB_TYPES
+
+# Default LLM clients shared across supervisors, keyed by config
+_default_llms: dict[tuple, Any] = {}
+
+
+def get_cached_llm(provider: str, model: str, temperature: float, api_key: Optional[str]):
+    """Get or create the LLM client for a provider/model/key combination"""
+    # Hash the key so secrets never appear in cache keys
+    key_hash = hashlib.sha256((api_key or "").encode()).hexdigest()
+    cache_key = (provider, model, temperature, key_hash)
+    if cache_key in _default_llms:
+        return _default_llms[cache_key]
+    
+    if provider == "openai":
+        from langchain_openai import ChatOpenAI
+        llm = ChatOpenAI(
+            model=model,
+            temperature=temperature,
+            api_key=api_key
+        )
+    elif provider == "gemini":
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        llm = ChatGoogleGenerativeAI(
+            model=model,
+            temperature=temperature,
+            google_api_key=api_key
+        )
+    else:
+        from langchain_openai import ChatOpenAI
+        llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0)
+    
+    _default_llms[cache_key] = llm
+    return llm
+
+
+# Elasticsearch/OpenSearch connectors shared by every source pointing at the
+# same cluster with the same credentials, so they reuse one HTTP pool
+_search_connectors: dict[tuple, Any] = {}
+# Live supervisor sources using each shared connector; closed when it drops to zero
+_search_connector_users: dict[tuple, int] = {}
+
+
+def _search_connector_key(db_source: DatabaseSource, port: int) -> tuple:
+    """Cache key for a search cluster connection (password hashed)"""
+    password_hash = hashlib.sha256((db_source.password or "").encode()).hexdigest()
+    options = tuple(sorted((k, str(v)) for k, v in db_source.options.items()))
+    return (
+        db_source.db_type,
+        db_source.host,
+        port,
+        db_source.username,
+        password_hash,
+        options
+    )
+
+
+# Recent successful responses, keyed by agent, database, conversation and question.
+# Module-level so they survive an agent's supervisor being rebuilt.
+_result_cache: OrderedDict[str, tuple[float, QueryResponse]] = OrderedDict()
+
+
+def _drop_cached_results(agent_id: str):
+    """Forget an agent's cached responses - its databases may point elsewhere now"""
+    prefix = f"{agent_id}:"
+    for key in [key for key in _result_cache if key.startswith(prefix)]:
+        del _result_cache[key]
+
+
+async def close_search_connectors():
+    """Close all shared Elasticsearch/OpenSearch connectors"""
+    connectors = list(_search_connectors.values())
+    _search_connectors.clear()
+    _search_connector_users.clear()
+    await asyncio.gather(
+        *(connector.disconnect() for connector in connectors),
+        return_exceptions=True
+    )
+
 
 class MultiDatabaseSupervisor:
     """
@@ -18,10 +106,21 @@ class MultiDatabaseSupervisor:
     
     Usage:
         agent = await get_agent_by_id("agent-123")
-        supervisor = MultiDatabaseSupervisor(agent)
+        supervisor = await MultiDatabaseSupervisor.create(agent)
         result = await supervisor.process_query("Show me top products")
+    
+    Prefer `create()` over the constructor: it opens every connector's
+    pool concurrently up front instead of lazily on the first query.
     """
     
+    # Max databases queried concurrently by process_multi_database_query
+    MAX_PARALLEL_DATABASES = 4
+    
+    # Embedding routing: accept the best database without asking the LLM
+    # only when it is both similar enough and clearly ahead of the runner-up
+    ROUTE_SCORE_THRESHOLD = 0.78
+    ROUTE_SCORE_MARGIN = 0.1
+    
     def __init__(
         self,
         agent: Agent,
@@ -38,33 +137,95 @@ class MultiDatabaseSupervisor:
         
         # Create connectors for each database source
         self.connectors: dict[str, Any] = {}
+        self._supervisors: dict[str, SupervisorAgent] = {}
+        self._db_embeddings: Optional[tuple[list[str], Any]] = None
+        self._db_descriptions = ""
+        # Shared search connector keys this supervisor holds a reference to
+        self._search_keys: list[tuple] = []
         self._init_connectors()
     
+    @classmethod
+    async def create(
+        cls,
+        agent: Agent,
+        llm=None,
+        schema_manager=None,
+        semantic_layer=None,
+        vector_store=None
+    ) -> "MultiDatabaseSupervisor":
+        """Create a supervisor and open all connector pools concurrently"""
+        supervisor = cls(
+            agent,
+            llm=llm,
+            schema_manager=schema_manager,
+            semantic_layer=semantic_layer,
+            vector_store=vector_store
+        )
+        await supervisor.connect_all()
+        return supervisor
+    
+    async def connect_all(self):
+        """Open connection pools for all connectors concurrently"""
+        # Shared search connectors may back several sources - connect each once
+        db_ids = list({
+            id(info["connector"]): db_id for db_id, info in self.connectors.items()
+        }.values())
+        outcomes = await asyncio.gather(
+            *(self.connectors[db_id]["connector"].connect() for db_id in db_ids),
+            return_exceptions=True
+        )
+        
+        for db_id, outcome in zip(db_ids, outcomes):
+            if isinstance(outcome, Exception):
+                # Keep the connector: it will retry connecting on first query
+                logger.warning(
+                    "Failed to connect to %s: %s", self.connectors[db_id]["name"], outcome
+                )
+    
+    async def close(self):
+        """Disconnect this supervisor's connectors (shared search connectors once unused)"""
+        connectors = [
+            info["connector"] for info in self.connectors.values()
+            if info["type"] not in SEARCH_DB_TYPES
+        ]
+        keys, self._search_keys = self._search_keys, []
+        for key in keys:
+            users = _search_connector_users.get(key, 0) - 1
+            if users > 0:
+                _search_connector_users[key] = users
+                continue
+            # Last user gone, e.g. the agent's credentials were rotated
+            _search_connector_users.pop(key, None)
+            connector = _search_connectors.pop(key, None)
+            if connector is not None:
+                connectors.append(connector)
+        await asyncio.gather(
+            *(connector.disconnect() for connector in connectors),
+            return_exceptions=True
+        )
+    
     def _get_default_llm(self):
         """Get default LLM from config"""
         from config import config
         
-        if config.llm.provider == "openai":
-            from langchain_openai import ChatOpenAI
-            return ChatOpenAI(
-                model=config.llm.model,
-                temperature=config.llm.temperature,
-                api_key=config.llm.api_key
-            )
-        elif config.llm.provider == "gemini":
-            from langchain_google_genai import ChatGoogleGenerativeAI
-            return ChatGoogleGenerativeAI(
-                model=config.llm.model,
-                temperature=config.llm.temperature,
-                google_api_key=config.llm.api_key
-            )
-        else:
-            from langchain_openai import ChatOpenAI
-            return ChatOpenAI(model="gpt-3.5-turbo", temperature=0)
+        return get_cached_llm(
+            config.llm.provider,
+            config.llm.model,
+            config.llm.temperature,
+            config.llm.api_key
+        )
     
     def _init_connectors(self):
         """Initialize database connectors for all sources"""
+        # Supervisors and routing embeddings refer to the old connectors
+        self._supervisors.clear()
+        self._db_embeddings = None
         for db_source in self.agent.databases:
+            # Skip invalid configs up front rather than raising for each one
+            error = self._validate_source(db_source)
+            if error:
+                logger.warning("Skipping database %s: %s", db_source.name, error)
+                continue
             try:
                 connector = self._create_connector(db_source)
                 self.connectors[db_source.id] = {
@@ -74,10 +235,36 @@ class MultiDatabaseSupervisor:
                     "type": db_source.db_type
                 }
             except Exception as e:
-                print(f"Warning: Failed to create connector for {db_source.name}: {e}")
+                logger.warning("Failed to create connector for %s: %s", db_source.name, e)
+                logger.debug("Connector creation traceback", exc_info=True)
+        
+        # Routing prompt section only changes with the connector set
+        self._db_descriptions = "\n".join(
+            f"- ID: {db_id}\n"
+            f"  Name: {info['source'].name}\n"
+            f"  Type: {info['source'].db_type}\n"
+            f"  Description: {info['source'].description or 'No description'}"
+            for db_id, info in self.connectors.items()
+        )
+    
+    @staticmethod
+    def _validate_source(db_source: DatabaseSource) -> Optional[str]:
+        """Return why a DatabaseSource cannot be connected, or None if valid"""
+        if db_source.db_type not in SUPPORTED_DB_TYPES:
+            return f"Unsupported database type: {db_source.db_type}"
+        if db_source.db_type != "sqlite" and not db_source.host:
+            return "No host configured"
+        if db_source.db_type not in SEARCH_DB_TYPES and not db_source.database:
+            return "No database configured"
+        return None
     
     def _create_connector(self, db_source: DatabaseSource):
         """Create database connector from DatabaseSource config"""
+        # Fail before importing a driver the config could never use
+        error = self._validate_source(db_source)
+        if error:
+            raise ValueError(error)
+        
         port = db_source.port or db_source.get_default_port()
         
         if db_source.db_type == "sqlite":
@@ -115,7 +302,18 @@ class MultiDatabaseSupervisor:
                 driver=db_source.options.get("driver", "ODBC Driver 17 for SQL Server")
             )
         
-        elif db_source.db_type == "elasticsearch":
+        else:
+            # Indices are chosen per query, so sources on one cluster share a client
+            key = _search_connector_key(db_source, port)
+            if key not in _search_connectors:
+                _search_connectors[key] = self._create_search_connector(db_source, port)
+            _search_connector_users[key] = _search_connector_users.get(key, 0) + 1
+            self._search_keys.append(key)
+            return _search_connectors[key]
+    
+    def _create_search_connector(self, db_source: DatabaseSource, port: int):
+        """Create Elasticsearch/OpenSearch connector from DatabaseSource config"""
+        if db_source.db_type == "elasticsearch":
             from database.sources.elasticsearch import ElasticsearchConnector
             return ElasticsearchConnector(
                 hosts=[f"http://{db_source.host}:{port}"],
@@ -125,7 +323,7 @@ class MultiDatabaseSupervisor:
                 use_opensearch=False
             )
         
-        elif db_source.db_type == "opensearch":
+        else:
             from database.sources.opensearch import OpenSearchConnector
             return OpenSearchConnector(
                 hosts=[f"http://{db_source.host}:{port}"],
@@ -136,9 +334,6 @@ class MultiDatabaseSupervisor:
                 aws_region=db_source.options.get("aws_region", ""),
                 aws_service=db_source.options.get("aws_service", "es")
             )
-        
-        else:
-            raise ValueError(f"Unsupported database type: {db_source.db_type}")
     
     async def select_database(self, question: str) -> Optional[str]:
         """
@@ -147,26 +342,28 @@ class MultiDatabaseSupervisor:
         Uses LLM to analyze the question and match it to available databases.
         Returns the database ID or None if no match.
         """
-        if not self.agent.auto_route or len(self.connectors) <= 1:
+        if len(self.connectors) == 1:
+            # Only one usable database - nothing to route
+            return next(iter(self.connectors))
+        
+        if not self.agent.auto_route or not self.connectors:
             # Use default database
             default_db = self.agent.get_default_database()
             return default_db.id if default_db else None
         
-        # Build database descriptions for LLM
-        db_descriptions = []
-        for db_id, info in self.connectors.items():
-            source = info["source"]
-            db_descriptions.append(
-                f"- ID: {db_id}\n"
-                f"  Name: {source.name}\n"
-                f"  Type: {source.db_type}\n"
-                f"  Description: {source.description or 'No description'}"
-            )
+        # Cheap routing first: explicit database name, then embedding similarity
+        selected_id = self._match_database_name(question)
+        if selected_id:
+            return selected_id
+        
+        selected_id = await self._match_database_embedding(question)
+        if selected_id:
+            return selected_id
         
         prompt = f"""Given the following databases, select the most appropriate one for the user's question.
 
 Available Databases:
-{chr(10).join(db_descriptions)}
+{self._db_descriptions}
 
 User Question: {question}
 
@@ -188,12 +385,79 @@ If unsure, respond with the first database ID.
         default_db = self.agent.get_default_database()
         return default_db.id if default_db else None
     
+    def _match_database_name(self, question: str) -> Optional[str]:
+        """Return the database whose name appears in the question, if unique"""
+        question_lower = question.lower()
+        matches = [
+            db_id for db_id, info in self.connectors.items()
+            if info["name"] and info["name"].lower() in question_lower
+        ]
+        return matches[0] if len(matches) == 1 else None
+    
+    def _get_embedding_model(self):
+        """Get the vector store's sentence embedding model, else the shared one"""
+        model = getattr(self.vector_store, "embedding_model", None)
+        if model is None:
+            from rag.embeddings import get_embedding_model
+            model = get_embedding_model()
+        return model
+    
+    def _get_db_embeddings(self) -> Optional[tuple[list[str], Any]]:
+        """Get (database ids, normalized description embedding matrix), built once"""
+        model = self._get_embedding_model()
+        if model is None or not self.connectors:
+            return None
+        
+        if self._db_embeddings is None:
+            import numpy as np
+            
+            db_ids = list(self.connectors.keys())
+            texts = [
+                f"{self.connectors[db_id]['name']} {self.connectors[db_id]['source'].description or ''}"
+                for db_id in db_ids
+            ]
+            matrix = model.encode(texts, normalize_embeddings=True)
+            self._db_embeddings = (db_ids, np.asarray(matrix))
+        
+        return self._db_embeddings
+    
+    async def _match_database_embedding(self, question: str) -> Optional[str]:
+        """Route by cosine similarity between question and database descriptions"""
+        # The shared model loads on first use - keep that off the event loop
+        model = await asyncio.to_thread(self._get_embedding_model)
+        if model is None:
+            return None
+        
+        try:
+            embeddings = await asyncio.to_thread(self._get_db_embeddings)
+            if not embeddings:
+                return None
+            db_ids, matrix = embeddings
+            
+            query_vector = await asyncio.to_thread(
+                model.encode, question, normalize_embeddings=True
+            )
+        except Exception as e:
+            logger.warning("Embedding routing failed: %s", e)
+            return None
+        
+        scores = matrix @ query_vector
+        ranked = scores.argsort()[::-1]
+        top_score = float(scores[ranked[0]])
+        second_score = float(scores[ranked[1]]) if len(ranked) > 1 else -1.0
+        
+        if (top_score > self.ROUTE_SCORE_THRESHOLD
+                and top_score - second_score > self.ROUTE_SCORE_MARGIN):
+            return db_ids[ranked[0]]
+        return None
+    
     async def process_query(
         self,
         question: str,
         user_id: str = "default",
         session_id: Optional[str] = None,
-        database_id: Optional[str] = None
+        database_id: Optional[str] = None,
+        intent_hint: Optional[str] = None
     ) -> QueryResponse:
         """
         Process a query using the appropriate database.
@@ -203,7 +467,11 @@ If unsure, respond with the first database ID.
             user_id: User identifier
             session_id: Session identifier
             database_id: Specific database to use (overrides auto-routing)
+            intent_hint: Known intent type (skips intent analysis)
         """
+        if intent_hint and intent_hint not in SupervisorAgent.INTENT_GENERATORS:
+            raise ValueError(f"Unknown intent hint: {intent_hint}")
+        
         # Select database
         if database_id:
             target_db_id = database_id
@@ -220,22 +488,19 @@ If unsure, respond with the first database ID.
                 error="No database available for this query"
             )
         
-        # Get the connector
         db_info = self.connectors[target_db_id]
-        connector = db_info["connector"]
-        
-        # Create a supervisor for this specific database
-        supervisor = SupervisorAgent(
-            llm=self.llm,
-            db_connector=connector,
-            db_type=db_info["type"],  # Pass db_type
-            schema_manager=self.schema_manager,
-            semantic_layer=self.semantic_layer,
-            vector_store=self.vector_store
-        )
+        
+        # Serve identical recent questions on the same database from cache
+        cache_key = self._result_cache_key(target_db_id, question, user_id, session_id, intent_hint)
+        cached = self._get_cached_result(cache_key)
+        if cached:
+            return cached
+        
+        # Reuse the supervisor for this specific database
+        supervisor = self._get_supervisor(target_db_id)
         
         # Process the query
-        result = await supervisor.process_query(question, user_id, session_id)
+        result = await supervisor.process_query(question, user_id, session_id, intent_hint)
         
         # Add database info to result
         result.data = result.data or {}
@@ -246,8 +511,80 @@ If unsure, respond with the first database ID.
                 "type": db_info["type"]
             }
         
+        if result.success:
+            self._set_cached_result(cache_key, result)
+        
         return result
     
+    def _result_cache_key(
+        self,
+        db_id: str,
+        question: str,
+        user_id: str,
+        session_id: Optional[str],
+        intent_hint: Optional[str] = None
+    ) -> str:
+        """Cache key for a question on one of this agent's databases in one conversation"""
+        # Follow-ups are answered from conversation memory, so a response is
+        # only valid for the user and session that asked it
+        parts = (user_id, session_id or "", intent_hint or "", question.strip().casefold())
+        digest = hashlib.blake2b(
+            "\x00".join(parts).encode(),
+            digest_size=16
+        ).hexdigest()
+        return f"{self.agent.id}:{db_id}:{digest}"
+    
+    def _get_cached_result(self, key: str) -> Optional[QueryResponse]:
+        """Get a copy of a recent response, if still fresh"""
+        from config import config
+        
+        if not config.result_cache.enabled:
+            return None
+        
+        entry = _result_cache.get(key)
+        if entry is None:
+            return None
+        
+        timestamp, response = entry
+        if time.monotonic() - timestamp > config.result_cache.ttl_seconds:
+            del _result_cache[key]
+            return None
+        
+        _result_cache.move_to_end(key)
+        # Callers mutate response data, so never hand out the cached object
+        result = copy.deepcopy(response)
+        result.cached = True
+        return result
+    
+    def _set_cached_result(self, key: str, response: QueryResponse):
+        """Store a copy of a successful response"""
+        from config import config
+        
+        if not config.result_cache.enabled:
+            return
+        
+        _result_cache[key] = (time.monotonic(), copy.deepcopy(response))
+        _result_cache.move_to_end(key)
+        while len(_result_cache) > config.result_cache.max_size:
+            _result_cache.popitem(last=False)
+    
+    def _get_supervisor(self, db_id: str) -> SupervisorAgent:
+        """Get or create the supervisor bound to a database connector"""
+        supervisor = self._supervisors.get(db_id)
+        if supervisor is None:
+            db_info = self.connectors[db_id]
+            supervisor = SupervisorAgent(
+                llm=self.llm,
+                db_connector=db_info["connector"],
+                db_type=db_info["type"],  # Pass db_type
+                schema_manager=self.schema_manager,
+                semantic_layer=self.semantic_layer,
+                vector_store=self.vector_store,
+                cache_scope=f"{self.agent.id}:{db_id}"
+            )
+            self._supervisors[db_id] = supervisor
+        return supervisor
+    
     async def process_multi_database_query(
         self,
         question: str,
@@ -259,28 +596,41 @@ If unsure, respond with the first database ID.
         
         Useful for cross-database analytics.
         """
-        target_dbs = database_ids or list(self.connectors.keys())
-        results = {}
+        target_dbs = [
+            db_id for db_id in dict.fromkeys(database_ids or self.connectors)
+            if db_id in self.connectors
+        ]
+        
+        # Fan out to all databases concurrently (bounded to respect LLM rate limits)
+        semaphore = asyncio.Semaphore(self.MAX_PARALLEL_DATABASES)
+        
+        async def _query_one(db_id: str) -> QueryResponse:
+            async with semaphore:
+                return await self.process_query(
+                    question,
+                    user_id=user_id,
+                    database_id=db_id
+                )
+        
+        outcomes = await asyncio.gather(
+            *(_query_one(db_id) for db_id in target_dbs),
+            return_exceptions=True
+        )
         
-        for db_id in target_dbs:
-            if db_id in self.connectors:
-                try:
-                    result = await self.process_query(
-                        question,
-                        user_id=user_id,
-                        database_id=db_id
-                    )
-                    results[db_id] = {
-                        "success": result.success,
-                        "sql": result.sql,
-                        "data": result.data,
-                        "error": result.error
-                    }
-                except Exception as e:
-                    results[db_id] = {
-                        "success": False,
-                        "error": str(e)
-                    }
+        results = {}
+        for db_id, result in zip(target_dbs, outcomes):
+            if isinstance(result, Exception):
+                results[db_id] = {
+                    "success": False,
+                    "error": str(result)
+                }
+            else:
+                results[db_id] = {
+                    "success": result.success,
+                    "sql": result.sql,
+                    "data": result.data,
+                    "error": result.error
+                }
         
         return {
             "question": question,
@@ -299,3 +649,46 @@ If unsure, respond with the first database ID.
             }
             for db_id, info in self.connectors.items()
         ]
+
+
+# Connected supervisors per agent id, with the agent version they were built
+# from, so per-database supervisors, pools and routing embeddings persist
+_agent_supervisors: dict[str, tuple[Any, MultiDatabaseSupervisor]] = {}
+_agent_supervisors_lock = asyncio.Lock()
+
+
+async def get_agent_supervisor(agent: Agent) -> MultiDatabaseSupervisor:
+    """Get the connected supervisor for an agent, rebuilt when the agent was updated"""
+    async with _agent_supervisors_lock:
+        entry = _agent_supervisors.get(agent.id)
+        if entry is not None and entry[0] == agent.updated_at:
+            return entry[1]
+        
+        supervisor = await MultiDatabaseSupervisor.create(agent)
+        _agent_supervisors[agent.id] = (agent.updated_at, supervisor)
+        if entry is not None:
+            _drop_cached_results(agent.id)
+    
+    if entry is not None:
+        await entry[1].close()
+    return supervisor
+
+
+async def invalidate_agent_supervisor(agent_id: str):
+    """Drop and close the supervisor and cached responses of an updated or deleted agent"""
+    async with _agent_supervisors_lock:
+        entry = _agent_supervisors.pop(agent_id, None)
+        _drop_cached_results(agent_id)
+    if entry is not None:
+        await entry[1].close()
+
+
+async def close_agent_supervisors():
+    """Close every cached agent supervisor"""
+    async with _agent_supervisors_lock:
+        supervisors = [supervisor for _, supervisor in _agent_supervisors.values()]
+        _agent_supervisors.clear()
+    await asyncio.gather(
+        *(supervisor.close() for supervisor in supervisors),
+        return_exceptions=True
+    )
@@ -0,0 +1,15 @@
+"""
+Output Parser Helpers - Shared, precomputed parser artifacts
+"""
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def get_format_instructions(parser_cls: type, pydantic_object: type) -> str:
+    """
+    Render format instructions for a parser/model pair once per process.
+
+    Rendering walks the model's JSON schema, so agents share the result
+    instead of recomputing it per instance or per call.
+    """
+    return parser_cls(pydantic_object=pydantic_object).get_format_instructions()
@@ -5,10 +5,19 @@ Inspired by Uber FINCH's Report Generation intent
 from typing import Optional, Any
 from dataclasses import dataclass, field
 from datetime import datetime
+import logging
+import re
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from pydantic import BaseModel, Field
 
+from services.ai_gateway import BatchCoalescer
+from .keyword_matcher import KeywordMatcher
+from .llm_errors import LLM_ERRORS
+from .parsers import get_format_instructions
+
+logger = logging.getLogger(__name__)
+
 
 class ReportResult(BaseModel):
     """Report generation result"""
@@ -19,14 +28,48 @@ class ReportResult(BaseModel):
     format_template: Optional[str] = Field(default=None, description="Output format template")
 
 
-@dataclass
+# {name} placeholders in report SQL templates
+PLACEHOLDER_RE = re.compile(r"\{(\w+)\}")
+
+# Default report parameters (SQLite expressions)
+DEFAULT_PARAMETERS = {
+    "period": "strftime('%Y-%m', order_date)",
+    "start_date": "date('now', '-30 days')",
+    "end_date": "date('now')",
+    "limit": "20"
+}
+
+
+@dataclass(frozen=True, slots=True)
 class ReportTemplate:
     """Predefined report template"""
     name: str
     description: str
     sql_template: str
-    parameters: list[str] = field(default_factory=list)
-    output_columns: list[str] = field(default_factory=list)
+    parameters: tuple[str, ...] = ()
+    output_columns: tuple[str, ...] = ()
+    
+    # Derived in __post_init__
+    _default_sql: str = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        # Catch template typos at import rather than shipping "{x}" to the database
+        undeclared = set(PLACEHOLDER_RE.findall(self.sql_template)) - set(self.parameters)
+        if undeclared:
+            raise ValueError(
+                f"Report template '{self.name}' uses undeclared parameters: {sorted(undeclared)}"
+            )
+        # Templates are static, so render the all-defaults SQL once
+        object.__setattr__(self, "_default_sql", self._substitute(DEFAULT_PARAMETERS))
+    
+    def _substitute(self, params: dict) -> str:
+        """Substitute parameters into the SQL template in a single pass"""
+        sql = PLACEHOLDER_RE.sub(lambda m: str(params.get(m.group(1), m.group(0))), self.sql_template)
+        return sql.strip()
+    
+    def render(self, params: Optional[dict] = None) -> str:
+        """Render SQL, using the precomputed defaults when no params are given"""
+        return self._substitute(params) if params else self._default_sql
 
 
 class ReportAgent:
@@ -80,8 +123,8 @@ Generate the report configuration in JSON format:
                 GROUP BY {period}
                 ORDER BY period
             """,
-            parameters=["period", "start_date", "end_date"],
-            output_columns=["period", "total_orders", "revenue", "avg_order_value"]
+            parameters=("period", "start_date", "end_date"),
+            output_columns=("period", "total_orders", "revenue", "avg_order_value")
         ),
         "customer_report": ReportTemplate(
             name="Customer Report",
@@ -98,8 +141,8 @@ Generate the report configuration in JSON format:
                 ORDER BY total_spent DESC
                 LIMIT {limit}
             """,
-            parameters=["limit"],
-            output_columns=["id", "name", "email", "city", "order_count", "total_spent", "last_order"]
+            parameters=("limit",),
+            output_columns=("id", "name", "email", "city", "order_count", "total_spent", "last_order")
         ),
         "product_performance": ReportTemplate(
             name="Product Performance",
@@ -118,8 +161,8 @@ Generate the report configuration in JSON format:
                 ORDER BY revenue DESC
                 LIMIT {limit}
             """,
-            parameters=["start_date", "limit"],
-            output_columns=["product", "category", "units_sold", "revenue"]
+            parameters=("start_date", "limit"),
+            output_columns=("product", "category", "units_sold", "revenue")
         ),
         "inventory_status": ReportTemplate(
             name="Inventory Status",
@@ -135,8 +178,8 @@ Generate the report configuration in JSON format:
                 FROM products p
                 ORDER BY status DESC, stock_quantity ASC
             """,
-            parameters=[],
-            output_columns=["name", "category", "stock_quantity", "reorder_level", "status"]
+            parameters=(),
+            output_columns=("name", "category", "stock_quantity", "reorder_level", "status")
         ),
         "revenue_by_region": ReportTemplate(
             name="Revenue by Region",
@@ -153,22 +196,38 @@ Generate the report configuration in JSON format:
                 GROUP BY c.city
                 ORDER BY revenue DESC
             """,
-            parameters=["start_date"],
-            output_columns=["region", "customers", "orders", "revenue"]
+            parameters=("start_date",),
+            output_columns=("region", "customers", "orders", "revenue")
         )
     }
     
+    # Prompt listing of the templates - they are static, so build it once
+    TEMPLATE_DESCRIPTIONS = "\n".join(
+        f"- **{t.name}** ({key}): {t.description} [params: {', '.join(t.parameters) or 'none'}]"
+        for key, t in TEMPLATES.items()
+    )
+    
+    # Template keywords, in priority order
+    TEMPLATE_KEYWORDS = KeywordMatcher({
+        "sales_summary": ["sales", "bán hàng", "doanh số", "revenue summary"],
+        "customer_report": ["customer", "khách hàng", "client"],
+        "product_performance": ["product", "sản phẩm", "top product", "best selling"],
+        "inventory_status": ["inventory", "tồn kho", "stock", "kho"],
+        "revenue_by_region": ["region", "vùng", "khu vực", "city", "thành phố"]
+    })
+    
     def __init__(self, llm=None):
         self.llm = llm
         self.parser = JsonOutputParser(pydantic_object=ReportResult)
+        self.format_instructions = get_format_instructions(JsonOutputParser, ReportResult)
+        # Concurrent custom reports are merged into one batched LLM call
+        self._coalescer = BatchCoalescer(
+            ChatPromptTemplate.from_template(self.SYSTEM_PROMPT) | self.llm | self.parser
+        ) if self.llm else None
     
     def _get_template_descriptions(self) -> str:
         """Format templates for prompt"""
-        lines = []
-        for key, template in self.TEMPLATES.items():
-            params = ", ".join(template.parameters) if template.parameters else "none"
-            lines.append(f"- **{template.name}** ({key}): {template.description} [params: {params}]")
-        return "\n".join(lines)
+        return self.TEMPLATE_DESCRIPTIONS
     
     async def generate_report(
         self,
@@ -195,21 +254,8 @@ Generate the report configuration in JSON format:
     
     def _match_template(self, request: str) -> Optional[ReportTemplate]:
         """Match request to predefined template"""
-        request_lower = request.lower()
-        
-        keywords = {
-            "sales_summary": ["sales", "bán hàng", "doanh số", "revenue summary"],
-            "customer_report": ["customer", "khách hàng", "client"],
-            "product_performance": ["product", "sản phẩm", "top product", "best selling"],
-            "inventory_status": ["inventory", "tồn kho", "stock", "kho"],
-            "revenue_by_region": ["region", "vùng", "khu vực", "city", "thành phố"]
-        }
-        
-        for template_key, kws in keywords.items():
-            if any(kw in request_lower for kw in kws):
-                return self.TEMPLATES[template_key]
-        
-        return None
+        template_key = self.TEMPLATE_KEYWORDS.first(request)
+        return self.TEMPLATES[template_key] if template_key else None
     
     def _generate_from_template(
         self,
@@ -218,26 +264,17 @@ Generate the report configuration in JSON format:
     ) -> dict:
         """Generate report from template"""
         # Fill in default parameters
-        defaults = {
-            "period": "strftime('%Y-%m', order_date)",
-            "start_date": "date('now', '-30 days')",
-            "end_date": "date('now')",
-            "limit": "20"
-        }
-        
-        params = {**defaults, **parameters}
+        params = {**DEFAULT_PARAMETERS, **parameters}
         
         # Substitute parameters in SQL
-        sql = template.sql_template
-        for param, value in params.items():
-            sql = sql.replace(f"{{{param}}}", str(value))
+        sql = template.render(params if parameters else None)
         
         return {
             "report_name": template.name,
             "report_type": "predefined",
-            "sql_queries": [sql.strip()],
+            "sql_queries": [sql],
             "explanation": template.description,
-            "output_columns": template.output_columns,
+            "output_columns": list(template.output_columns),
             "parameters_used": params
         }
     
@@ -247,18 +284,17 @@ Generate the report configuration in JSON format:
         parameters: dict
     ) -> dict:
         """Generate custom report using LLM"""
-        prompt = ChatPromptTemplate.from_template(self.SYSTEM_PROMPT)
-        
-        chain = prompt | self.llm | self.parser
-        
         try:
-            result = await chain.ainvoke({
+            result = await self._coalescer.ainvoke({
                 "templates": self._get_template_descriptions(),
                 "request": request,
-                "format_instructions": self.parser.get_format_instructions()
+                "format_instructions": self.format_instructions
             })
             return result
         except Exception as e:
+            # Known LLM failures are expected; anything else is a bug worth a traceback
+            if not isinstance(e, LLM_ERRORS):
+                logger.exception("Unexpected custom report failure")
             return {"error": str(e)}
     
     def list_templates(self) -> list[dict]:
@@ -268,7 +304,7 @@ Generate the report configuration in JSON format:
                 "key": key,
                 "name": t.name,
                 "description": t.description,
-                "parameters": t.parameters
+                "parameters": list(t.parameters)
             }
             for key, t in self.TEMPLATES.items()
         ]
@@ -3,13 +3,49 @@ SQL Writer Agent v2 - Converts natural language to SQL queries
 Enhanced with SQL Agent Toolset inspired by Uber FINCH
 """
 from typing import Optional, Any
-from dataclasses import dataclass
-from langchain_core.prompts import ChatPromptTemplate, FewShotChatMessagePromptTemplate
+from dataclasses import dataclass, field
+from collections import OrderedDict
+import asyncio
+import copy
+import hashlib
+import logging
+import re
+import string
+import time
+import traceback
+import orjson
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.exceptions import OutputParserException
 from langchain_core.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
 
+from services.ai_gateway import BatchCoalescer
+from services.semantic_cache import SemanticCache
+from .keyword_matcher import PhraseMatcher
+from .parsers import get_format_instructions
+from .sync_bridge import run_sync
 from .tools import ColumnFinderTool, ValueFinderTool, TableRulesTool, ExecuteSQLTool
 
+logger = logging.getLogger(__name__)
+
+
+# Term extraction - words of 3+ characters (unicode-aware for Vietnamese)
+STOP_WORDS = frozenset({
+    'the', 'a', 'an', 'is', 'are', 'was', 'were', 'what', 'how',
+    'many', 'much', 'show', 'get', 'find', 'list', 'all', 'me',
+    'from', 'to', 'in', 'by', 'for', 'with', 'and', 'or', 'of',
+})
+TERM_RE = re.compile(r"\w[\w']{2,}")
+# Word tokens with stop words rejected inside the regex, so filtering needs
+# no per-word Python test
+TOKEN_RE = re.compile(
+    r"(?<![\w'])(?!(?:%s)(?![\w']))\w[\w']{2,}"
+    % "|".join(sorted(map(re.escape, STOP_WORDS), key=len, reverse=True))
+)
+TERM_PHRASES = ('last month', 'this year', 'order date')
+DEFAULT_PHRASES = PhraseMatcher(TERM_PHRASES)
+WHITESPACE_RE = re.compile(r"\s+")
+
 
 class SQLResult(BaseModel):
     """Generated SQL result"""
@@ -24,12 +60,31 @@ class SQLResult(BaseModel):
     confidence: float = Field(default=0.8, description="Confidence score 0-1")
 
 
-class AgentContext(BaseModel):
+@dataclass(slots=True)
+class AgentContext:
     """Context built by tools during query processing - like FINCH diagram"""
-    tables: list[dict] = Field(default_factory=list, description="Tables identified")
-    columns: list[dict] = Field(default_factory=list, description="Columns found")
-    values: list[dict] = Field(default_factory=list, description="Values resolved")
-    rules: list[dict] = Field(default_factory=list, description="Table rules applied")
+    tables: list[dict] = field(default_factory=list)  # Tables identified
+    columns: list[dict] = field(default_factory=list)  # Columns found
+    values: list[dict] = field(default_factory=list)  # Values resolved
+    rules: list[dict] = field(default_factory=list)  # Table rules applied
+    
+    # dump() serialized on first use - contexts are not mutated after building
+    _dump: Optional[bytes] = field(default=None, init=False, repr=False, compare=False)
+    
+    def dump(self) -> dict:
+        """Plain-dict copy of this context for API responses, serialized once"""
+        if self._dump is None:
+            self._dump = orjson.dumps(
+                {
+                    "tables": self.tables,
+                    "columns": self.columns,
+                    "values": self.values,
+                    "rules": self.rules
+                },
+                option=orjson.OPT_NON_STR_KEYS
+            )
+        # Each caller gets its own objects, down to each entry
+        return orjson.loads(self._dump)
 
 
 class SQLWriterAgent:
@@ -76,6 +131,8 @@ class SQLWriterAgent:
 """
     }
     
+    # $-placeholders are filled once per dialect; {braced} ones are
+    # prompt variables filled per request
     SYSTEM_PROMPT = """You are an AI Agent specialized in converting natural language into SQL queries.
 
 Your primary role:
@@ -89,7 +146,7 @@ Your primary role:
 DATABASE CONTEXT RULES
 ========================
 - You will be given:
-  1. Database dialect: {db_type}
+  1. Database dialect: ${db_type}
   2. Schema metadata:
      {schema}
   3. Semantic Mappings (Business Terms → SQL):
@@ -100,7 +157,7 @@ DATABASE CONTEXT RULES
      {agent_context}
 
 - Dialect Specific Optimization Rules:
-{dialect_rules}
+${dialect_rules}
 
 - You MUST use only these tables/columns
 - If required data is missing → ask clarifying questions
@@ -151,7 +208,7 @@ ERROR HANDLING
 ========================
 If user request is:
 - Impossible with current schema → respond:
-  "Cannot generate SQL: missing required schema fields: {{{{fields}}}}"
+  "Cannot generate SQL: missing required schema fields: {{fields}}"
 - Ambiguous → ask clarification
 - Unsafe → refuse politely
 
@@ -160,24 +217,100 @@ OUTPUT FORMAT
 ========================
 Always respond in JSON:
 
-{{{{{{{{
+{{{{
   "intent": "...",
   "assumptions": "...",
   "sql": "...",
-  "params": {{{{...}}}},
+  "params": {{...}},
   "explanation": "..."
-}}}}}}}}
+}}}}
 
 {format_instructions}
 """
 
-    EXAMPLE_TEMPLATE = ChatPromptTemplate.from_messages([
-        ("human", "{question}"),
-        ("ai", "{sql}")
-    ])
+    SYSTEM_TEMPLATE = string.Template(SYSTEM_PROMPT)
+    
+    # Agent context entries shown in the prompt - anything past these is dropped
+    MAX_CONTEXT_TABLES = 5
+    MAX_CONTEXT_COLUMNS = 8
+    MAX_CONTEXT_VALUES = 5
+    MAX_CONTEXT_RULES = 3
+    
+    # Default SQL examples for few-shot learning
+    DEFAULT_EXAMPLES = (
+        {
+            "question": "Show all customers", 
+            "sql": "SELECT id, name, email, created_at FROM customers LIMIT 100"
+        },
+        {
+            "question": "Total revenue by month", 
+            "sql": """
+WITH MonthlySales AS (
+    SELECT 
+        strftime('%Y-%m', order_date) as sales_month, 
+        SUM(total_amount) as revenue 
+    FROM orders 
+    GROUP BY 1
+)
+SELECT sales_month, revenue 
+FROM MonthlySales 
+ORDER BY sales_month DESC
+LIMIT 12;
+"""
+        },
+        {
+            "question": "Top 10 products by sales", 
+            "sql": """
+SELECT 
+    p.name, 
+    COALESCE(SUM(oi.quantity), 0) as total_sold 
+FROM products p 
+JOIN order_items oi ON p.id = oi.product_id 
+GROUP BY p.id, p.name 
+ORDER BY total_sold DESC 
+LIMIT 10;
+"""
+        }
+    )
+    
+    # Dialect-injected system prompts and chat prompts, shared by all instances
+    # per dialect - few-shot examples are passed in as a chain input
+    _system_prompts: dict[str, str] = {}
+    _prompts: dict[str, ChatPromptTemplate] = {}
+    
+    # Lookup tools built from the same schema manager and semantic layer,
+    # shared by all instances using them
+    MAX_SHARED_TOOLS = 8
+    _shared_tools: OrderedDict[tuple[int, int], tuple] = OrderedDict()
+    
+    HUMAN_PROMPT = "Examples:\n{examples}\n\n{conversation}Convert this question to SQL: {question}"
+    
+    # Seconds to reuse prompt sections from sources without a version counter
+    PROMPT_SECTION_TTL = 60.0
+    
+    # Results below this confidence are not worth replaying from cache
+    MIN_CACHE_CONFIDENCE = 0.5
+    
+    # Seconds to reuse the rows of an identical, recently executed query
+    EXEC_CACHE_TTL = 30.0
+    
+    # Traceback frames kept in error results
+    ERROR_TRACEBACK_FRAMES = 5
+    
+    # Semantic cache: reuse a cached answer outright at or above HIT, and
+    # ask the LLM whether the questions are equivalent between CHECK and HIT
+    SEMANTIC_HIT_THRESHOLD = 0.98
+    SEMANTIC_CHECK_THRESHOLD = 0.92
+    
+    EQUIVALENCE_PROMPT = """Do these two questions ask for exactly the same data from a database?
+Answer only "yes" or "no".
+
+Question 1: {cached}
+Question 2: {question}"""
     
     def __init__(self, llm, schema_manager=None, semantic_layer=None, 
-                 vector_store=None, db_connector=None, db_type: str = "generic"):
+                 vector_store=None, db_connector=None, db_type: str = "generic",
+                 cache_size: int = 256):
         self.llm = llm
         self.schema_manager = schema_manager
         self.semantic_layer = semantic_layer
@@ -185,65 +318,168 @@ Always respond in JSON:
         self.db_connector = db_connector
         self.db_type = db_type.lower()
         self.parser = PydanticOutputParser(pydantic_object=SQLResult)
+        # Models with native structured output return SQLResult directly, so they
+        # need neither the JSON format instructions nor the parser
+        self._structured_llm = self._get_structured_llm(llm)
+        self.format_instructions = (
+            "" if self._structured_llm is not None
+            else get_format_instructions(PydanticOutputParser, SQLResult)
+        )
         
-        # Initialize tools
-        self.column_finder = ColumnFinderTool(
-            schema_manager=schema_manager,
-            semantic_layer=semantic_layer
+        self.system_prompt = self._get_system_prompt(self.db_type)
+        self.prompt = self._get_prompt(self.db_type)
+        # Concurrent generate_sql calls are merged into one batched LLM call
+        self._coalescer = BatchCoalescer(
+            self.prompt | (self._structured_llm if self._structured_llm is not None else llm)
+        ) if llm is not None else None
+        # Known multi-word business terms -> (semantic layer version, matcher)
+        self._phrase_matcher: Optional[tuple[Any, PhraseMatcher]] = None
+        # Schema/semantic prompt sections, keyed by name -> (source version, built at, text)
+        self._prompt_sections: dict[str, tuple[Any, float, str]] = {}
+        
+        # Initialize tools - the lookup tools are shared per schema/semantic layer
+        self.column_finder, self.value_finder, self.table_rules = self._get_lookup_tools(
+            schema_manager, semantic_layer
         )
-        self.value_finder = ValueFinderTool(semantic_layer=semantic_layer)
-        self.table_rules = TableRulesTool()
         self.execute_sql = ExecuteSQLTool(db_connector=db_connector)
         
         # Agent context accumulator
         self.context = AgentContext()
+        
+        # Recent results with the context they were generated from
+        self.cache_size = cache_size
+        self._sql_cache: OrderedDict[str, tuple[SQLResult, AgentContext]] = OrderedDict()
+        # Paraphrase cache: embedding -> (question, result, context), valid for one
+        # (schema version, semantic version) pair
+        self._semantic_cache = SemanticCache(max_size=cache_size)
+        self._semantic_cache_versions: Optional[tuple] = None
+        # Few-shot search results: (normalized question, k) -> (store version, fetched at, examples)
+        self._few_shot_cache: OrderedDict[tuple, tuple[Any, float, list[dict]]] = OrderedDict()
+        # Successful executions: SQL hash -> (executed at, result)
+        self._exec_cache: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+    
+    @classmethod
+    def _get_system_prompt(cls, db_type: str) -> str:
+        """Get the system prompt with dialect rules injected, rendered once per dialect"""
+        if db_type not in cls._system_prompts:
+            cls._system_prompts[db_type] = cls.SYSTEM_TEMPLATE.substitute(
+                db_type=db_type,
+                dialect_rules=cls.DIALECT_OPTIMIZATIONS.get(db_type, "No specific dialect rules.")
+            )
+        return cls._system_prompts[db_type]
+    
+    @classmethod
+    def _get_lookup_tools(cls, schema_manager, semantic_layer) -> tuple:
+        """Get (column finder, value finder, table rules) for these sources, building them once"""
+        key = (id(schema_manager), id(semantic_layer))
+        # The tools index the semantic layer when built, so rebuild when it changes
+        version = getattr(semantic_layer, "version", None)
+        entry = cls._shared_tools.get(key)
+        # Entries hold their sources, so the ids cannot be reused while cached
+        if (entry is not None and entry[0] is schema_manager
+                and entry[1] is semantic_layer and entry[2] == version):
+            cls._shared_tools.move_to_end(key)
+            return entry[3]
+        
+        tools = (
+            ColumnFinderTool(schema_manager=schema_manager, semantic_layer=semantic_layer),
+            ValueFinderTool(semantic_layer=semantic_layer),
+            TableRulesTool()
+        )
+        cls._shared_tools[key] = (schema_manager, semantic_layer, version, tools)
+        cls._shared_tools.move_to_end(key)
+        while len(cls._shared_tools) > cls.MAX_SHARED_TOOLS:
+            cls._shared_tools.popitem(last=False)
+        return tools
+    
+    @staticmethod
+    def _get_structured_llm(llm):
+        """LLM bound to SQLResult via function calling, or None if unsupported"""
+        try:
+            return llm.with_structured_output(SQLResult)
+        except (AttributeError, NotImplementedError):
+            return None
+    
+    @classmethod
+    def _get_prompt(cls, db_type: str) -> ChatPromptTemplate:
+        """Get the SQL generation prompt, built once per dialect"""
+        if db_type not in cls._prompts:
+            cls._prompts[db_type] = ChatPromptTemplate.from_messages([
+                ("system", cls._get_system_prompt(db_type)),
+                ("human", cls.HUMAN_PROMPT)
+            ])
+        return cls._prompts[db_type]
+    
+    def _get_phrase_matcher(self) -> PhraseMatcher:
+        """Matcher for known phrases, rebuilt when the semantic layer changes"""
+        if not self.semantic_layer or not hasattr(self.semantic_layer, 'get_all_aliases'):
+            return DEFAULT_PHRASES
+        
+        version = getattr(self.semantic_layer, "version", None)
+        if self._phrase_matcher is None or self._phrase_matcher[0] != version:
+            # Single words are already found by the tokenizer
+            aliases = [
+                a for a in self.semantic_layer.get_all_aliases()
+                if not TERM_RE.fullmatch(a.lower())
+            ]
+            self._phrase_matcher = (version, PhraseMatcher([*TERM_PHRASES, *aliases]))
+        return self._phrase_matcher[1]
     
     def _extract_terms(self, question: str) -> list[str]:
         """Extract potential business terms from question"""
         # Simple word extraction - in production use NER
-        stop_words = {'the', 'a', 'an', 'is', 'are', 'was', 'were', 'what', 'how',
-                      'many', 'much', 'show', 'get', 'find', 'list', 'all', 'me',
-                      'from', 'to', 'in', 'by', 'for', 'with', 'and', 'or', 'of'}
-        
-        words = question.lower().replace('?', '').replace(',', '').split()
-        terms = [w for w in words if w not in stop_words and len(w) > 2]
-        
-        # Also extract multi-word phrases
-        if 'last month' in question.lower():
-            terms.append('last month')
-        if 'this year' in question.lower():
-            terms.append('this year')
-        if 'order date' in question.lower():
-            terms.append('order date')
-            
-        return terms
+        question_lower = question.lower()
+        terms = TOKEN_RE.findall(question_lower)
+        
+        # Also extract known multi-word phrases, in one scan
+        terms.extend(self._get_phrase_matcher().find_all(question_lower))
+        
+        # Each term costs a tool lookup, so drop repeats (order preserved)
+        return list(dict.fromkeys(terms))
     
     async def _build_context(self, question: str) -> AgentContext:
         """Build agent context using tools - like FINCH diagram 2"""
         context = AgentContext()
         terms = self._extract_terms(question)
-        tables_found = set()
+        if not terms:
+            # No business terms, so no tool has anything to resolve
+            return context
+        tables_found = {}
         
-        # Use Column Finder for each term
-        for term in terms:
-            columns = self.column_finder._run(term)
+        # Column and value lookups are independent, so run them together
+        column_results, value_results = await asyncio.gather(
+            self.column_finder._arun_batch(terms),
+            self.value_finder._arun_batch(terms)
+        )
+        
+        # Use Column Finder results for all terms, keeping the first hit per
+        # (table, column) - hashing the key avoids comparing whole column dicts
+        columns_found: dict[tuple, dict] = {}
+        for columns in column_results:
             for col in columns:
-                if col not in context.columns:
-                    context.columns.append(col)
-                    tables_found.add(col.get('table', ''))
+                columns_found.setdefault((col.get('table'), col.get('column')), col)
+            if len(columns_found) >= self.MAX_CONTEXT_COLUMNS:
+                break
+        context.columns = list(columns_found.values())[:self.MAX_CONTEXT_COLUMNS]
+        for col in context.columns:
+            tables_found[col.get('table', '')] = None
         
-        # Use Value Finder for potential value aliases
-        for term in terms:
-            value_result = self.value_finder._run(term)
+        # Use Value Finder for potential value aliases - partial matches can
+        # resolve different terms to the same mapping, so keep one per mapping
+        values_found: dict[tuple, dict] = {}
+        for value_result in value_results:
             if value_result.get('found'):
-                context.values.append(value_result)
+                key = (value_result.get('column'), tuple(map(str, value_result.get('values', []))))
+                values_found.setdefault(key, value_result)
+                if len(values_found) >= self.MAX_CONTEXT_VALUES:
+                    break
+        context.values = list(values_found.values())
         
-        # Get rules for identified tables
-        for table in tables_found:
-            if table and table != '*':
-                rules = self.table_rules._run(table)
-                context.rules.append(rules)
-                context.tables.append({"name": table, "description": rules.get("description", "")})
+        # Get rules for identified tables (once per distinct table)
+        tables = [t for t in tables_found if t and t != '*'][:self.MAX_CONTEXT_TABLES]
+        for table, rules in zip(tables, await self.table_rules._arun_batch(tables)):
+            context.rules.append(rules)
+            context.tables.append({"name": table, "description": rules.get("description", "")})
         
         return context
     
@@ -253,79 +489,93 @@ Always respond in JSON:
         
         if context.tables:
             lines.append("### Identified Tables:")
-            for t in context.tables[:5]:
-                lines.append(f"  - {t.get('name')}: {t.get('description', '')}")
+            lines.extend(
+                f"  - {t.get('name')}: {t.get('description', '')}"
+                for t in context.tables[:self.MAX_CONTEXT_TABLES]
+            )
         
         if context.columns:
             lines.append("\n### Resolved Columns:")
-            for c in context.columns[:8]:
-                lines.append(f"  - {c.get('table')}.{c.get('column')} ({c.get('data_type')})")
+            lines.extend(
+                f"  - {c.get('table')}.{c.get('column')} ({c.get('data_type')})"
+                for c in context.columns[:self.MAX_CONTEXT_COLUMNS]
+            )
         
         if context.values:
             lines.append("\n### Resolved Values:")
-            for v in context.values[:5]:
-                vals = ', '.join(str(x) for x in v.get('values', []))
-                lines.append(f"  - \"{v.get('alias')}\" → {vals}")
+            lines.extend(
+                f"  - \"{v.get('alias')}\" → {', '.join(map(str, v.get('values', [])))}"
+                for v in context.values[:self.MAX_CONTEXT_VALUES]
+            )
         
         if context.rules:
             lines.append("\n### Example Queries:")
-            for r in context.rules[:3]:
+            for r in context.rules[:self.MAX_CONTEXT_RULES]:
                 for ex in r.get('example_queries', [])[:2]:
-                    lines.append(f"  Q: {ex.get('question')}")
-                    lines.append(f"  A: {ex.get('sql')}")
+                    lines.append(f"  Q: {ex.get('question')}\n  A: {ex.get('sql')}")
         
         return "\n".join(lines) if lines else "No additional context"
     
-    def _get_few_shot_examples(self, question: str, k: int = 3) -> list[dict]:
+    async def _get_few_shot_examples(self, question: str, k: int = 3) -> list[dict]:
         """Retrieve similar SQL examples from vector store"""
         if not self.vector_store:
             return self._get_default_examples()
         
-        examples = self.vector_store.search_similar(question, k=k)
-        return examples if examples else self._get_default_examples()
+        # Same freshness rules as prompt sections: store version, else TTL
+        key = (WHITESPACE_RE.sub(" ", question.strip().lower()), k)
+        version = getattr(self.vector_store, "version", None)
+        now = time.monotonic()
+        cached = self._few_shot_cache.get(key)
+        if cached is not None:
+            cached_version, fetched_at, examples = cached
+            if (cached_version == version if version is not None
+                    else now - fetched_at < self.PROMPT_SECTION_TTL):
+                self._few_shot_cache.move_to_end(key)
+                return list(examples) if examples else self._get_default_examples()
+        
+        # Each search re-embeds the question, so repeats are served from the LRU;
+        # misses embed and search on a worker thread to keep the loop free
+        examples = await asyncio.to_thread(self.vector_store.search_similar, question, k=k)
+        self._few_shot_cache[key] = (version, now, examples)
+        self._few_shot_cache.move_to_end(key)
+        while len(self._few_shot_cache) > self.cache_size:
+            self._few_shot_cache.popitem(last=False)
+        return list(examples) if examples else self._get_default_examples()
     
     def _get_default_examples(self) -> list[dict]:
         """Default SQL examples for few-shot learning"""
-        return [
-            {
-                "question": "Show all customers", 
-                "sql": "SELECT id, name, email, created_at FROM customers LIMIT 100"
-            },
-            {
-                "question": "Total revenue by month", 
-                "sql": """
-WITH MonthlySales AS (
-    SELECT 
-        strftime('%Y-%m', order_date) as sales_month, 
-        SUM(total_amount) as revenue 
-    FROM orders 
-    GROUP BY 1
-)
-SELECT sales_month, revenue 
-FROM MonthlySales 
-ORDER BY sales_month DESC
-LIMIT 12;
-"""
-            },
-            {
-                "question": "Top 10 products by sales", 
-                "sql": """
-SELECT 
-    p.name, 
-    COALESCE(SUM(oi.quantity), 0) as total_sold 
-FROM products p 
-JOIN order_items oi ON p.id = oi.product_id 
-GROUP BY p.id, p.name 
-ORDER BY total_sold DESC 
-LIMIT 10;
-"""
-            }
-        ]
+        return list(self.DEFAULT_EXAMPLES)
     
-    def _get_schema_info(self) -> str:
-        """Get database schema information"""
+    def _cached_section(self, name: str, source: Any, build) -> str:
+        """
+        Get a prompt section, rebuilding it only when its source changes.
+        
+        Sources with a version counter are rebuilt when it moves; sources
+        without one are rebuilt every PROMPT_SECTION_TTL seconds.
+        """
+        version = getattr(source, "version", None)
+        now = time.monotonic()
+        cached = self._prompt_sections.get(name)
+        if cached is not None:
+            cached_version, built_at, text = cached
+            if version is not None and cached_version == version:
+                return text
+            if version is None and now - built_at < self.PROMPT_SECTION_TTL:
+                return text
+        
+        text = build()
+        self._prompt_sections[name] = (version, now, text)
+        return text
+    
+    def _get_schema_info(self, tables: Optional[list[str]] = None) -> str:
+        """Get database schema information, limited to the given tables when known"""
         if self.schema_manager:
-            return self.schema_manager.get_schema_description()
+            if tables and hasattr(self.schema_manager, 'get_related_tables'):
+                # Only the identified tables and their join partners reach the prompt
+                return self.schema_manager.get_schema_description(tables)
+            return self._cached_section(
+                "schema", self.schema_manager, self.schema_manager.get_schema_description
+            )
         return "Schema not available"
     
     def _get_semantic_mappings(self) -> str:
@@ -334,80 +584,333 @@ LIMIT 10;
             # We might want to deprecate this in favor of get_semantic_context
             # as it covers more. For now, keep it for legacy mappings.
             if hasattr(self.semantic_layer, 'get_mappings_description'):
-                 return self.semantic_layer.get_mappings_description()
+                 return self._cached_section(
+                     "semantic_mappings", self.semantic_layer,
+                     self.semantic_layer.get_mappings_description
+                 )
             return "No custom mappings defined"
         return "No custom mappings defined"
     
     def _get_semantic_context(self) -> str:
         """Get advanced semantic context (graph, metrics)"""
         if self.semantic_layer and hasattr(self.semantic_layer, 'get_semantic_context'):
-             return self.semantic_layer.get_semantic_context()
+             return self._cached_section(
+                 "semantic_context", self.semantic_layer, self.semantic_layer.get_semantic_context
+             )
         return "No semantic knowledge graph available"
     
-    def _build_prompt(self, question: str) -> ChatPromptTemplate:
-        """Build the prompt with few-shot examples and dialect optimizations"""
-        examples = self._get_few_shot_examples(question)
-        
-        # Get dialect-specific rules
-        dialect_rules = self.DIALECT_OPTIMIZATIONS.get(self.db_type, "No specific dialect rules.")
-        
-        # Inject dialect rules into system prompt
-        system_prompt = self.SYSTEM_PROMPT.format(
-            db_type=self.db_type,
-            schema="{schema}",
-            semantic_mappings="{semantic_mappings}",
-            semantic_context="{semantic_context}",
-            agent_context="{agent_context}",
-            format_instructions="{format_instructions}",
-            dialect_rules=dialect_rules
+    def _format_examples(self, examples: list[dict]) -> str:
+        """Format few-shot examples for the prompt"""
+        return "\n\n".join(
+            f"Q: {ex.get('question')}\nA: {ex.get('sql', '').strip()}" for ex in examples
         )
+    
+    def _cache_key(self, question: str) -> str:
+        """Cache key from normalized question, dialect and schema/semantic versions"""
+        normalized = WHITESPACE_RE.sub(" ", question.strip().lower())
+        raw = "\x1f".join((
+            normalized,
+            self.db_type,
+            str(getattr(self.schema_manager, "version", 0)),
+            str(getattr(self.semantic_layer, "version", 0))
+        ))
+        return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+    
+    def cache_clear(self):
+        """Clear cached SQL and execution results"""
+        self._sql_cache.clear()
+        self._semantic_cache.clear()
+        self._few_shot_cache.clear()
+        self._exec_cache.clear()
+    
+    def _get_embedding_model(self):
+        """Get sentence embedding model from the vector stores, if one has it"""
+        for store in (self.vector_store, getattr(self.semantic_layer, "vector_store", None)):
+            model = getattr(store, "embedding_model", None)
+            if model is not None:
+                return model
+        return None
+    
+    async def _embed_question(self, question: str):
+        """Normalized question embedding, or None when no model is available"""
+        model = self._get_embedding_model()
+        if model is None:
+            return None
+        try:
+            return await asyncio.to_thread(model.encode, question, normalize_embeddings=True)
+        except Exception as e:
+            logger.warning("SQLWriter question embedding error: %s", e)
+            return None
+    
+    async def _embed_questions(self, questions: list[str]) -> list:
+        """Normalized embeddings for many questions in one encode call (None when unavailable)"""
+        model = self._get_embedding_model()
+        if model is None or not questions:
+            return [None] * len(questions)
+        try:
+            return list(await asyncio.to_thread(model.encode, questions, normalize_embeddings=True))
+        except Exception as e:
+            logger.warning("SQLWriter question embedding error: %s", e)
+            return [None] * len(questions)
+    
+    def _check_semantic_cache_versions(self):
+        """Drop semantic cache entries built against an older schema/semantic layer"""
+        versions = (
+            getattr(self.schema_manager, "version", 0),
+            getattr(self.semantic_layer, "version", 0)
+        )
+        if versions != self._semantic_cache_versions:
+            self._semantic_cache.clear()
+            self._semantic_cache_versions = versions
+    
+    async def _semantic_cached_result(self, question: str, embedding) -> Optional[SQLResult]:
+        """Get a cached result for a paraphrase of the question, restoring its context"""
+        self._check_semantic_cache_versions()
+        hit = self._semantic_cache.lookup(embedding)
+        if hit is None:
+            return None
+        
+        score, (cached_question, result, context) = hit
+        if score < self.SEMANTIC_CHECK_THRESHOLD:
+            return None
+        if score < self.SEMANTIC_HIT_THRESHOLD and not await self._questions_equivalent(
+            cached_question, question
+        ):
+            return None
         
-        few_shot_prompt = FewShotChatMessagePromptTemplate(
-            example_prompt=self.EXAMPLE_TEMPLATE,
-            examples=examples
+        self.context = copy.deepcopy(context)
+        return result.model_copy(update={"confidence": result.confidence * score}, deep=True)
+    
+    async def _questions_equivalent(self, cached: str, question: str) -> bool:
+        """Ask the LLM whether two similar questions want the same data"""
+        try:
+            response = await self.llm.ainvoke(
+                self.EQUIVALENCE_PROMPT.format(cached=cached, question=question)
+            )
+        except Exception as e:
+            # Runs before generate_sql's own error handling - a failed check is a miss
+            logger.warning("SQLWriter equivalence check failed: %s", e)
+            return False
+        content = getattr(response, "content", response)
+        return isinstance(content, str) and content.strip().lower().startswith("yes")
+    
+    async def _chain_input(self, question: str, context: AgentContext, conversation: str = "") -> dict:
+        """Inputs for the SQL generation chain"""
+        examples = await self._get_few_shot_examples(question)
+        return {
+            "question": question,
+            "examples": self._format_examples(examples),
+            "conversation": f"{conversation}\n\n" if conversation else "",
+            "schema": self._get_schema_info([t["name"] for t in context.tables]),
+            "semantic_mappings": self._get_semantic_mappings(),
+            "semantic_context": self._get_semantic_context(),
+            "agent_context": self._format_context(context),
+            "format_instructions": self.format_instructions
+        }
+    
+    def _error_result(self, error: BaseException) -> SQLResult:
+        """SQLResult carrying the error and traceback for the SQL console"""
+        # Innermost frames only - LangChain stacks run to dozens of frames
+        tb = "".join(traceback.format_exception(error, limit=-self.ERROR_TRACEBACK_FRAMES))
+        error_sql = f"/*\nERROR GENERATING SQL:\n{str(error)}\n\nTRACEBACK:\n{tb}\n*/"
+        
+        return SQLResult(
+            intent="Error",
+            assumptions="None",
+            sql=error_sql,
+            explanation=f"Error generating SQL. Check the SQL console for technical details.",
+            confidence=0.0
         )
+    
+    def _cache_result(self, key: str, result: SQLResult, context: AgentContext):
+        """Cache a generated result with LRU eviction"""
+        if result.confidence < self.MIN_CACHE_CONFIDENCE:
+            return
+        self._sql_cache[key] = (result.model_copy(deep=True), copy.deepcopy(context))
+        while len(self._sql_cache) > self.cache_size:
+            self._sql_cache.popitem(last=False)
+    
+    def _cached_result(self, key: str) -> Optional[SQLResult]:
+        """Get a copy of a cached result, restoring its context"""
+        cached = self._sql_cache.get(key)
+        if cached is None:
+            return None
         
-        return ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            few_shot_prompt,
-            ("human", "Convert this question to SQL: {question}")
-        ])
+        self._sql_cache.move_to_end(key)
+        result, context = cached
+        self.context = copy.deepcopy(context)
+        return result.model_copy(deep=True)
     
-    async def generate_sql(self, question: str) -> SQLResult:
-        """Generate SQL from natural language question with tool-assisted context"""
+    async def generate_sql(self, question: str, conversation_context: Optional[str] = None) -> SQLResult:
+        """
+        Generate SQL from natural language question with tool-assisted context
+        
+        conversation_context (prior turns) goes into its own prompt section,
+        so terms, examples and caching still key on the question itself.
+        """
+        key = self._cache_key(
+            f"{conversation_context}\n{question}" if conversation_context else question
+        )
+        cached = self._cached_result(key)
+        if cached is not None:
+            return cached
+        
+        # Paraphrases of recent questions skip context building and the LLM. A
+        # follow-up depends on its conversation, so it is never matched that way
+        embedding = None if conversation_context else await self._embed_question(question)
+        if embedding is not None:
+            cached = await self._semantic_cached_result(question, embedding)
+            if cached is not None:
+                return cached
+        
         # Build context using tools
         context = await self._build_context(question)
         self.context = context  # Store for inspection
         
-        prompt = self._build_prompt(question)
-        chain = prompt | self.llm | self.parser
-        
         try:
-            result = await chain.ainvoke({
-                "question": question,
-                "schema": self._get_schema_info(),
-                "semantic_mappings": self._get_semantic_mappings(),
-                "semantic_context": self._get_semantic_context(),
-                "agent_context": self._format_context(context),
-                "format_instructions": self.parser.get_format_instructions()
-            })
-            return result
+            result = await self._invoke_chain(
+                await self._chain_input(question, context, conversation_context or "")
+            )
         except Exception as e:
-            import traceback
-            tb = traceback.format_exc()
-            error_sql = f"/*\nERROR GENERATING SQL:\n{str(e)}\n\nTRACEBACK:\n{tb}\n*/"
+            return self._error_result(e)
+        
+        self._cache_result(key, result, context)
+        if embedding is not None and result.confidence >= self.MIN_CACHE_CONFIDENCE:
+            self._semantic_cache.add(
+                embedding, (question, result.model_copy(deep=True), copy.deepcopy(context))
+            )
+        # Concurrent calls on a shared writer may have replaced it meanwhile
+        self.context = context
+        return result
+    
+    async def generate_sql_batch(self, questions: list[str], max_concurrency: int = 8) -> list[SQLResult]:
+        """Generate SQL for many questions, batching the uncached LLM calls"""
+        keys = [self._cache_key(q) for q in questions]
+        results: dict[str, SQLResult] = {}
+        pending: dict[str, str] = {}
+        for key, question in zip(keys, questions):
+            if key in results or key in pending:
+                continue
+            cached = self._cached_result(key)
+            if cached is not None:
+                results[key] = cached
+            else:
+                pending[key] = question
+        
+        # Paraphrases of recent questions skip context building and the LLM
+        embeddings: dict[str, Any] = {}
+        if pending:
+            found = await self._embed_questions(list(pending.values()))
+            embeddings = {k: e for k, e in zip(pending, found) if e is not None}
+            hits = await asyncio.gather(
+                *(self._semantic_cached_result(pending[k], e) for k, e in embeddings.items())
+            )
+            for key, hit in zip(list(embeddings), hits):
+                if hit is not None:
+                    results[key] = hit
+                    del pending[key]
+        
+        if pending:
+            pending_questions = list(pending.values())
+            contexts = await asyncio.gather(*(self._build_context(q) for q in pending_questions))
+            self.context = contexts[-1]
             
-            return SQLResult(
-                intent="Error",
-                assumptions="None",
-                sql=error_sql,
-                explanation=f"Error generating SQL. Check the SQL console for technical details.",
-                confidence=0.0
+            inputs = await asyncio.gather(
+                *(self._chain_input(q, c) for q, c in zip(pending_questions, contexts))
             )
+            outputs = await self._batch_chain(inputs, max_concurrency)
+            
+            for (key, question), context, output in zip(pending.items(), contexts, outputs):
+                if isinstance(output, Exception):
+                    results[key] = self._error_result(output)
+                    continue
+                self._cache_result(key, output, context)
+                results[key] = output
+                embedding = embeddings.get(key)
+                if embedding is not None and output.confidence >= self.MIN_CACHE_CONFIDENCE:
+                    self._semantic_cache.add(
+                        embedding, (question, output.model_copy(deep=True), copy.deepcopy(context))
+                    )
+        
+        return [results[key] for key in keys]
+    
+    async def _invoke_chain(self, chain_input: dict) -> SQLResult:
+        """Run the SQL generation chain for one input"""
+        if self._coalescer is None:
+            raise ValueError("SQLWriterAgent has no LLM configured")
+        
+        output = await self._coalescer.ainvoke(chain_input)
+        if self._structured_llm is not None:
+            if output is None:
+                raise OutputParserException("Model returned no structured SQLResult")
+            return output
+        
+        message = output
+        # Parsing and validating the response is CPU-bound, keep it off the loop
+        return await asyncio.to_thread(self.parser.invoke, message)
+    
+    async def _batch_chain(self, inputs: list[dict], max_concurrency: int) -> list:
+        """Run the SQL generation chain over many inputs, returning exceptions in place of results"""
+        config = {"max_concurrency": max_concurrency}
+        if self._structured_llm is not None:
+            results = await (self.prompt | self._structured_llm).abatch(
+                inputs, config=config, return_exceptions=True
+            )
+            return [
+                OutputParserException("Model returned no structured SQLResult") if r is None else r
+                for r in results
+            ]
+        
+        messages = await (self.prompt | self.llm).abatch(inputs, config=config, return_exceptions=True)
+        return await asyncio.to_thread(self._parse_messages, messages)
+    
+    def _parse_messages(self, messages: list) -> list:
+        """Parse LLM responses, returning exceptions in place of results"""
+        outputs = []
+        for message in messages:
+            if isinstance(message, Exception):
+                outputs.append(message)
+                continue
+            try:
+                outputs.append(self.parser.invoke(message))
+            except Exception as e:
+                outputs.append(e)
+        return outputs
+    
+    @staticmethod
+    def _copy_exec_result(result: dict) -> dict:
+        """Copy of an execution result that shares no mutable rows with the original"""
+        copied = dict(result)
+        if "columns" in copied:
+            copied["columns"] = list(copied["columns"])
+        if "rows" in copied:
+            copied["rows"] = [copy.copy(row) for row in copied["rows"]]
+        return copied
+    
+    async def _execute(self, sql: str) -> dict:
+        """Execute SQL, reusing the result of the same query run within EXEC_CACHE_TTL"""
+        key = hashlib.blake2b(WHITESPACE_RE.sub(" ", sql.strip()).encode(), digest_size=16).digest()
+        now = time.monotonic()
+        cached = self._exec_cache.get(key)
+        if cached is not None and now - cached[0] < self.EXEC_CACHE_TTL:
+            self._exec_cache.move_to_end(key)
+            return self._copy_exec_result(cached[1])
+        
+        result = await self.execute_sql._arun(sql)
+        # Only SELECTs pass validation, so replaying a success is safe;
+        # failures are retried in case they were transient
+        if result.get("success"):
+            self._exec_cache[key] = (now, self._copy_exec_result(result))
+            self._exec_cache.move_to_end(key)
+            while len(self._exec_cache) > self.cache_size:
+                self._exec_cache.popitem(last=False)
+        return result
     
     async def generate_and_execute(self, question: str) -> dict:
         """Generate SQL and execute it - full pipeline"""
         sql_result = await self.generate_sql(question)
+        # Taken before the next await, so concurrent calls can't swap it
+        context = self.context
         
         if not sql_result.sql:
             return {
@@ -418,19 +921,18 @@ LIMIT 10;
             }
         
         # Execute using tool
-        exec_result = await self.execute_sql._arun(sql_result.sql)
+        exec_result = await self._execute(sql_result.sql)
         
         return {
             "success": exec_result.get("success", False),
             "question": question,
             "sql": sql_result.sql,
             "explanation": sql_result.explanation,
-            "context": self.context.model_dump(),
+            "context": context.dump(),
             "data": exec_result if exec_result.get("success") else None,
             "error": exec_result.get("error") if not exec_result.get("success") else None
         }
     
     def generate_sql_sync(self, question: str) -> SQLResult:
         """Synchronous version of generate_sql"""
-        import asyncio
-        return asyncio.run(self.generate_sql(question))
+        return run_sync(self.generate_sql(question))
@@ -3,10 +3,15 @@ Supervisor Agent v3 - Enterprise-Grade Orchestration
 Enhanced with Memory, Specialized Agents, and AI Gateway
 Inspired by Uber FINCH's supervisor pattern
 """
-from typing import TypedDict, Annotated, Literal, Any, Optional
+from typing import TypedDict, Annotated, Literal, Any, Optional, Coroutine
 from dataclasses import dataclass, field
+from collections import OrderedDict
+from contextlib import aclosing
+import asyncio
+import hashlib
+import logging
+import re
 from langgraph.graph import StateGraph, END
-from langchain_core.messages import HumanMessage, AIMessage
 
 from .intent_agent import IntentAgent, IntentResult
 from .sql_writer import SQLWriterAgent, SQLResult
@@ -14,6 +19,9 @@ from .validation_agent import ValidationAgent, ValidationResult
 from .report_agent import ReportAgent
 from .insight_agent import InsightAgent
 from .visualization_agent import VisualizationAgent
+from .sync_bridge import run_sync
+
+logger = logging.getLogger(__name__)
 
 
 class AgentState(TypedDict):
@@ -27,11 +35,36 @@ class AgentState(TypedDict):
     query_result: Any
     visualization: dict | None
     error: str | None
-    messages: list
     conversation_context: str | None
+    question_embedding: Any
+    cache_scope: str
+
+
+# Stateless agents, shared by every supervisor
+_VALIDATION_AGENT = ValidationAgent()
+_VIZ_AGENT = VisualizationAgent()
+
+# Error report the SQL writer returns in place of SQL
+ERROR_SQL_RE = re.compile(r"\s*/\*\nERROR")
 
+# Per-query state template - copying it keeps every state dict the same shape
+_BASE_STATE: AgentState = {
+    "question": "",
+    "user_id": "default",
+    "session_id": "",
+    "intent": None,
+    "sql_result": None,
+    "validation": None,
+    "query_result": None,
+    "visualization": None,
+    "error": None,
+    "conversation_context": None,
+    "question_embedding": None,
+    "cache_scope": ""
+}
 
-@dataclass
+
+@dataclass(slots=True)
 class QueryResponse:
     """Final response from the supervisor"""
     success: bool
@@ -60,6 +93,37 @@ class QueryResponse:
         }
 
 
+class AgentError(Exception):
+    """A workflow step failed; the message is reported to the user as is"""
+    
+    def __init__(self, message: str, node: Optional[str] = None):
+        super().__init__(message)
+        self.node = node
+
+
+def _node(method_name: str, failure: Optional[str] = None):
+    """
+    Graph node that runs a supervisor method on the instance in the run config
+    
+    Errors become the state's "error" here, once for every node: AgentError
+    messages as is, other exceptions as "<failure> failed: ..." when the
+    node names a failure (otherwise they propagate).
+    """
+    async def node(state: AgentState, config) -> dict:
+        try:
+            return await getattr(config["configurable"]["supervisor"], method_name)(state)
+        except AgentError as e:
+            if e.node is None:
+                e.node = method_name
+            return {"error": str(e)}
+        except Exception as e:
+            if failure is None:
+                raise
+            return {"error": f"{failure} failed: {str(e)}"}
+    node.__name__ = method_name
+    return node
+
+
 class SupervisorAgent:
     """
     Supervisor Agent v3 - Enterprise Orchestration
@@ -79,10 +143,33 @@ class SupervisorAgent:
     5. Validation → Check safety
     6. Execution → Run query
     7. Visualization → Generate charts
-    8. Feedback → Record for learning
-    9. Update Memory → Store context
+    8. Feedback → Record for learning (after responding)
+    9. Update Memory → Store context (after responding)
     """
     
+    # Generator node per intent type; also the intent hints process_query accepts
+    INTENT_GENERATORS = {
+        "data_retrieval": "generate_sql",
+        "report_generation": "generate_report",
+        "insight_generation": "generate_insight",
+        "query_assistance": "generate_sql",
+    }
+    
+    # Pending post-response housekeeping tasks before writes run inline again
+    MAX_BACKGROUND_TASKS = 64
+    
+    # IntentAgents shared per LLM: id(llm) -> (llm, agent)
+    MAX_SHARED_INTENT_AGENTS = 8
+    _shared_intent_agents: OrderedDict[int, tuple[Any, IntentAgent]] = OrderedDict()
+    
+    # Running workflows by question, so identical concurrent queries share one run
+    _in_flight: dict[bytes, asyncio.Task] = {}
+    
+    # Rows kept from a streamed result; the rest are never fetched
+    MAX_RESULT_ROWS = 10000
+    # Rows the visualization agent looks at
+    VIZ_SAMPLE_ROWS = 1000
+    
     def __init__(
         self,
         llm=None,
@@ -93,10 +180,13 @@ class SupervisorAgent:
         vector_store=None,
         use_gateway: bool = True,
         use_memory: bool = True,
-        use_cache: bool = True
+        use_cache: bool = True,
+        cache_scope: Optional[str] = None
     ):
         self.db_connector = db_connector
         self.db_type = db_type
+        # The query cache is process-wide, so results are kept per database
+        self.cache_scope = cache_scope or f"{db_type}:{id(db_connector)}"
         self.use_gateway = use_gateway
         self.use_memory = use_memory
         self.use_cache = use_cache
@@ -127,7 +217,7 @@ class SupervisorAgent:
         self.feedback = get_feedback()
         
         # Initialize sub-agents
-        self.intent_agent = IntentAgent(llm)
+        self.intent_agent = self._get_intent_agent(llm)
         self.sql_writer = SQLWriterAgent(
             llm, 
             schema_manager=schema_manager,
@@ -136,66 +226,121 @@ class SupervisorAgent:
             db_connector=db_connector,
             db_type=db_type  # Pass db_type
         )
-        self.validation_agent = ValidationAgent()
+        self.validation_agent = _VALIDATION_AGENT
         self.report_agent = ReportAgent(llm)
         self.insight_agent = InsightAgent(llm, db_connector)
-        self.viz_agent = VisualizationAgent()
+        self.viz_agent = _VIZ_AGENT
+        
+        # The graph topology is static - compile it once per class and pass
+        # this instance to the nodes through the run config
+        self.graph = type(self)._get_graph()
+        self._graph_config = {"configurable": {"supervisor": self}}
         
-        # Build the workflow graph
-        self.graph = self._build_graph()
+        # Feedback/memory/cache writes running after the response was returned
+        self._background_tasks: set[asyncio.Task] = set()
     
-    def _build_graph(self) -> StateGraph:
-        """Build enhanced LangGraph workflow"""
-        workflow = StateGraph(AgentState)
+    @classmethod
+    def _get_intent_agent(cls, llm) -> IntentAgent:
+        """Get the IntentAgent for this LLM, so its cache and batching are shared"""
+        key = id(llm)
+        entry = cls._shared_intent_agents.get(key)
+        # Entries hold their LLM, so the id cannot be reused while cached
+        if entry is not None and entry[0] is llm:
+            cls._shared_intent_agents.move_to_end(key)
+            return entry[1]
         
-        # Add nodes
-        workflow.add_node("check_cache", self._check_cache)
-        workflow.add_node("load_memory", self._load_memory)
-        workflow.add_node("analyze_intent", self._analyze_intent)
-        workflow.add_node("generate_sql", self._generate_sql)
-        workflow.add_node("generate_report", self._generate_report)
-        workflow.add_node("generate_insight", self._generate_insight)
-        workflow.add_node("validate_sql", self._validate_sql)
-        workflow.add_node("execute_query", self._execute_query)
-        workflow.add_node("generate_visualization", self._generate_visualization)
-        workflow.add_node("record_feedback", self._record_feedback)
-        workflow.add_node("handle_error", self._handle_error)
-        
-        # Set entry point
-        workflow.set_entry_point("check_cache")
-        
-        # Add edges
-        workflow.add_conditional_edges(
-            "check_cache",
-            self._route_after_cache,
-            {
-                "cache_hit": END,
-                "cache_miss": "load_memory"
-            }
-        )
+        agent = IntentAgent(llm)
+        cls._shared_intent_agents[key] = (llm, agent)
+        while len(cls._shared_intent_agents) > cls.MAX_SHARED_INTENT_AGENTS:
+            cls._shared_intent_agents.popitem(last=False)
+        return agent
+    
+    @classmethod
+    def _get_graph(cls, intent_hint: Optional[str] = None):
+        """Compiled workflow for this class and intent hint, built on first use"""
+        # Look in this class's own namespace so subclasses get their own graphs
+        graphs = cls.__dict__.get("_compiled_graphs")
+        if graphs is None:
+            graphs = {}
+            cls._compiled_graphs = graphs
         
-        workflow.add_edge("load_memory", "analyze_intent")
+        generator = cls.INTENT_GENERATORS[intent_hint] if intent_hint else None
+        graph = graphs.get(generator)
+        if graph is None:
+            graph = cls._build_graph(generator)
+            graphs[generator] = graph
+        return graph
+    
+    @classmethod
+    def _build_graph(cls, generator: Optional[str] = None) -> StateGraph:
+        """
+        Build enhanced LangGraph workflow
         
-        # Route based on intent
-        workflow.add_conditional_edges(
-            "analyze_intent",
-            self._route_after_intent,
-            {
-                "data_retrieval": "generate_sql",
-                "report_generation": "generate_report",
-                "insight_generation": "generate_insight",
-                "query_assistance": "generate_sql",
-                "error": "handle_error"
-            }
-        )
+        With a generator node the graph is specialized for a known intent:
+        intent analysis is left out and memory loading feeds the generator.
+        """
+        workflow = StateGraph(AgentState)
+        generators = {
+            "generate_sql": _node("_generate_sql", "SQL generation"),
+            "generate_report": _node("_generate_report", "Report generation"),
+            "generate_insight": _node("_generate_insight", "Insight generation"),
+        }
+        if generator:
+            generators = {generator: generators[generator]}
         
-        workflow.add_edge("generate_report", "validate_sql")
-        workflow.add_edge("generate_insight", "validate_sql")
-        workflow.add_edge("generate_sql", "validate_sql")
+        # Add nodes - methods are looked up by name on the running instance
+        workflow.add_node("load_memory", _node("_load_memory"))
+        if not generator:
+            workflow.add_node("analyze_intent", _node("_analyze_intent", "Intent analysis"))
+            workflow.add_node("route_intent", _node("_join_prep"))
+        for name, node in generators.items():
+            workflow.add_node(name, node)
+        workflow.add_node("validate_sql", _node("_validate_sql"))
+        workflow.add_node("execute_query", _node("_execute_query", "Query execution"))
+        workflow.add_node("generate_visualization", _node("_generate_visualization"))
+        workflow.add_node("handle_error", _node("_handle_error"))
+        
+        if generator:
+            # The intent is already known - no LLM call before generation
+            workflow.set_entry_point("load_memory")
+            workflow.add_edge("load_memory", generator)
+        else:
+            # Cache hits never reach the graph. Memory loading and intent analysis
+            # are independent, so both run in the first step and join before routing
+            workflow.set_conditional_entry_point(
+                cls._route_start,
+                {
+                    "load_memory": "load_memory",
+                    "analyze_intent": "analyze_intent"
+                }
+            )
+            
+            workflow.add_edge(["load_memory", "analyze_intent"], "route_intent")
+            
+            # Route based on intent
+            workflow.add_conditional_edges(
+                "route_intent",
+                cls._route_after_intent,
+                {
+                    **cls.INTENT_GENERATORS,
+                    "error": "handle_error"
+                }
+            )
+        
+        # Failed generation goes straight to error handling
+        for name in generators:
+            workflow.add_conditional_edges(
+                name,
+                cls._route_after_generation,
+                {
+                    "validate": "validate_sql",
+                    "error": "handle_error"
+                }
+            )
         
         workflow.add_conditional_edges(
             "validate_sql",
-            self._route_after_validation,
+            cls._route_after_validation,
             {
                 "execute": "execute_query",
                 "error": "handle_error"
@@ -203,60 +348,76 @@ class SupervisorAgent:
         )
         
         workflow.add_edge("execute_query", "generate_visualization")
-        workflow.add_edge("generate_visualization", "record_feedback")
-        workflow.add_edge("record_feedback", END)
+        workflow.add_edge("generate_visualization", END)
         workflow.add_edge("handle_error", END)
         
         return workflow.compile()
     
-    async def _check_cache(self, state: AgentState) -> AgentState:
-        """Node: Check query cache"""
-        if self.cache:
-            cached = self.cache.get(state["question"])
-            if cached:
-                state["query_result"] = cached.get("result")
-                state["sql_result"] = SQLResult(
-                    sql=cached.get("sql", ""),
-                    explanation="(cached result)",
-                    confidence=1.0
-                )
-        return state
+    def _get_cache_scope(self, user_id: str, session_id: Optional[str]) -> str:
+        """Cache scope for a query: the database, narrowed to the conversation once it has history"""
+        # Follow-ups are answered from conversation memory, so only the first
+        # question of a conversation can share answers with other users
+        if self.memory and self.memory.has_history(user_id, session_id):
+            return f"{self.cache_scope}:{user_id}:{session_id or ''}"
+        return self.cache_scope
     
-    def _route_after_cache(self, state: AgentState) -> str:
-        """Router: Check if cache hit"""
-        if state.get("query_result"):
-            return "cache_hit"
-        return "cache_miss"
+    async def _check_cache(self, question: str, scope: str) -> tuple[Optional[dict], Any]:
+        """
+        Check query cache - exact question first, then paraphrases
+        
+        Returns (cached entry or None, question embedding or None). The
+        embedding is kept so a miss can be cached under it afterwards.
+        """
+        if not self.cache:
+            return None, None
+        
+        cached = self.cache.get(question, scope)
+        if cached:
+            return cached, None
+        
+        embedding = await self.sql_writer._embed_question(question)
+        if embedding is not None:
+            cached = self.cache.get_similar(embedding, scope)
+        return cached, embedding
+    
+    @staticmethod
+    def _route_start(state: AgentState) -> list[str]:
+        """Router: Fan out to memory and intent"""
+        return ["load_memory", "analyze_intent"]
     
-    async def _load_memory(self, state: AgentState) -> AgentState:
+    async def _load_memory(self, state: AgentState) -> dict:
         """Node: Load conversation context"""
-        if self.memory:
-            user_id = state.get("user_id", "default")
-            session_id = state.get("session_id")
-            
-            # Get context from memory
-            context = self.memory.get_context_for_prompt(user_id, session_id)
-            state["conversation_context"] = context
-            
-            # Record this message
-            self.memory.add_message(
-                user_id=user_id,
-                role="user",
-                content=state["question"],
-                session_id=session_id
-            )
-        return state
+        # Runs alongside analyze_intent, so return only the keys written here
+        if not self.memory:
+            return {}
+        
+        user_id = state.get("user_id", "default")
+        session_id = state.get("session_id")
+        
+        # Get context from memory - turns related to this question when it was embedded
+        embedding = state.get("question_embedding")
+        context = self.memory.get_context_for_prompt(user_id, session_id, query_embedding=embedding)
+        
+        # Record this message
+        self.memory.add_message(
+            user_id=user_id,
+            role="user",
+            content=state["question"],
+            session_id=session_id,
+            embedding=embedding
+        )
+        return {"conversation_context": context}
     
-    async def _analyze_intent(self, state: AgentState) -> AgentState:
+    async def _analyze_intent(self, state: AgentState) -> dict:
         """Node: Analyze user intent"""
-        try:
-            intent = await self.intent_agent.analyze(state["question"])
-            state["intent"] = intent
-        except Exception as e:
-            state["error"] = f"Intent analysis failed: {str(e)}"
-        return state
+        return {"intent": await self.intent_agent.analyze(state["question"])}
+    
+    async def _join_prep(self, state: AgentState) -> dict:
+        """Node: Join point once memory and intent are both loaded"""
+        return {}
     
-    def _route_after_intent(self, state: AgentState) -> str:
+    @staticmethod
+    def _route_after_intent(state: AgentState) -> str:
         """Router: Route to appropriate agent based on intent"""
         if state.get("error"):
             return "error"
@@ -279,65 +440,58 @@ class SupervisorAgent:
     
     async def _generate_sql(self, state: AgentState) -> AgentState:
         """Node: Generate SQL from question"""
-        try:
-            # Include conversation context if available
-            context = state.get("conversation_context", "")
-            question = state["question"]
-            if context:
-                question = f"{context}\n\nCurrent question: {question}"
-            
-            sql_result = await self.sql_writer.generate_sql(question)
-            state["sql_result"] = sql_result
-        except Exception as e:
-            state["error"] = f"SQL generation failed: {str(e)}"
+        # Conversation context gets its own prompt section, not a question prefix
+        state["sql_result"] = await self.sql_writer.generate_sql(
+            state["question"],
+            conversation_context=state.get("conversation_context")
+        )
         return state
     
     async def _generate_report(self, state: AgentState) -> AgentState:
         """Node: Generate report using Report Agent"""
-        try:
-            report = await self.report_agent.generate_report(state["question"])
-            
-            if "sql_queries" in report and report["sql_queries"]:
-                state["sql_result"] = SQLResult(
-                    sql=report["sql_queries"][0],
-                    explanation=report.get("explanation", ""),
-                    confidence=0.9
-                )
-            else:
-                state["error"] = report.get("error", "No SQL generated")
-        except Exception as e:
-            state["error"] = f"Report generation failed: {str(e)}"
+        report = await self.report_agent.generate_report(state["question"])
+        if not report.get("sql_queries"):
+            raise AgentError(report.get("error", "No SQL generated"))
+        
+        state["sql_result"] = SQLResult(
+            intent=f"Report: {report.get('report_name', 'custom')}",
+            assumptions="Default report parameters",
+            sql=report["sql_queries"][0],
+            explanation=report.get("explanation", ""),
+            confidence=0.9
+        )
         return state
     
     async def _generate_insight(self, state: AgentState) -> AgentState:
         """Node: Generate insight using Insight Agent"""
-        try:
-            insight = await self.insight_agent.generate_insight(state["question"])
-            
-            if "sql_queries" in insight and insight["sql_queries"]:
-                state["sql_result"] = SQLResult(
-                    sql=insight["sql_queries"][0],
-                    explanation=insight.get("summary", ""),
-                    confidence=0.85
-                )
-            else:
-                state["error"] = "No SQL generated from insight"
-        except Exception as e:
-            state["error"] = f"Insight generation failed: {str(e)}"
+        insight = await self.insight_agent.generate_insight(state["question"])
+        if not insight.get("sql_queries"):
+            raise AgentError("No SQL generated from insight")
+        
+        state["sql_result"] = SQLResult(
+            intent=f"Insight: {insight.get('insight_type', 'summary')}",
+            assumptions="None",
+            sql=insight["sql_queries"][0],
+            explanation=insight.get("summary", ""),
+            confidence=0.85
+        )
         return state
     
+    @staticmethod
+    def _route_after_generation(state: AgentState) -> str:
+        """Router: Validate generated SQL unless generation failed"""
+        return "error" if state.get("error") else "validate"
+    
     async def _validate_sql(self, state: AgentState) -> AgentState:
         """Node: Validate generated SQL"""
         sql_result = state.get("sql_result")
         
         if not sql_result or not sql_result.sql:
-            state["error"] = "No SQL generated"
-            return state
+            raise AgentError("No SQL generated")
             
         # Check if SQL is actually an error report
-        if sql_result.sql.strip().startswith("/*\nERROR"):
-            state["error"] = "SQL Generation Failed (see details in SQL console)"
-            return state
+        if ERROR_SQL_RE.match(sql_result.sql):
+            raise AgentError("SQL Generation Failed (see details in SQL console)")
         
         validation = self.validation_agent.validate(sql_result.sql)
         state["validation"] = validation
@@ -347,7 +501,8 @@ class SupervisorAgent:
         
         return state
     
-    def _route_after_validation(self, state: AgentState) -> str:
+    @staticmethod
+    def _route_after_validation(state: AgentState) -> str:
         """Router: Decide next step after validation"""
         validation = state.get("validation")
         if not validation or not validation.is_valid:
@@ -358,42 +513,64 @@ class SupervisorAgent:
         """Node: Execute validated SQL"""
         validation = state.get("validation")
         if not validation:
-            state["error"] = "No validated SQL"
-            return state
+            raise AgentError("No validated SQL")
         
-        try:
-            if self.db_connector:
-                result = await self.db_connector.execute(validation.sql)
-                state["query_result"] = result
-            else:
-                # Demo mode
-                state["query_result"] = {
-                    "columns": ["id", "name", "value"],
-                    "rows": [
-                        [1, "Sample 1", 100],
-                        [2, "Sample 2", 200],
-                        [3, "Sample 3", 300]
-                    ],
-                    "row_count": 3
-                }
-        except Exception as e:
-            state["error"] = f"Query execution failed: {str(e)}"
+        if self.db_connector and hasattr(self.db_connector, "execute_stream"):
+            state["query_result"] = await self._fetch_rows(validation.sql)
+        elif self.db_connector:
+            state["query_result"] = await self.db_connector.execute(validation.sql)
+        else:
+            # Demo mode
+            state["query_result"] = {
+                "columns": ["id", "name", "value"],
+                "rows": [
+                    [1, "Sample 1", 100],
+                    [2, "Sample 2", 200],
+                    [3, "Sample 3", 300]
+                ],
+                "row_count": 3
+            }
         
         return state
     
+    async def _fetch_rows(self, sql: str) -> dict:
+        """Stream a query's rows, stopping once MAX_RESULT_ROWS are read"""
+        columns: list[str] = []
+        rows: list[list] = []
+        truncated = False
+        async with aclosing(self.db_connector.execute_stream(sql)) as batches:
+            async for columns, batch in batches:
+                rows.extend(batch)
+                if len(rows) >= self.MAX_RESULT_ROWS:
+                    # There may be more rows behind the cap, so flag it either way
+                    truncated = True
+                    del rows[self.MAX_RESULT_ROWS:]
+                    break
+        
+        result = {"columns": columns, "rows": rows, "row_count": len(rows)}
+        if truncated:
+            result["truncated"] = True
+        return result
+    
     async def _generate_visualization(self, state: AgentState) -> AgentState:
         """Node: Generate visualization for results"""
         query_result = state.get("query_result")
         if query_result and not state.get("error"):
-            viz_config = self.viz_agent.generate_chart_config(
+            # Chart selection only needs the shape and a sample of the rows
+            rows = query_result.get("rows") or []
+            if len(rows) > self.VIZ_SAMPLE_ROWS:
+                query_result = {**query_result, "rows": rows[:self.VIZ_SAMPLE_ROWS]}
+            # Chart heuristics are CPU work, keep them off the event loop
+            viz_config = await asyncio.to_thread(
+                self.viz_agent.generate_chart_config,
                 query_result,
                 title=state["question"][:50]
             )
             state["visualization"] = viz_config.to_dict()
         return state
     
-    async def _record_feedback(self, state: AgentState) -> AgentState:
-        """Node: Record query for feedback learning"""
+    async def _record_feedback(self, state: AgentState):
+        """Record query for feedback learning, update memory and cache the result"""
         sql_result = state.get("sql_result")
         if sql_result and self.feedback:
             self.feedback.record_query(
@@ -420,16 +597,32 @@ class SupervisorAgent:
                 }
             )
         
-        # Cache the result
-        if self.cache and not state.get("error"):
+        # Cache the result - partial results would be served as complete
+        query_result = state.get("query_result") or {}
+        if self.cache and not state.get("error") and not query_result.get("truncated"):
             validation = state.get("validation")
             self.cache.set(
                 state["question"],
                 validation.sql if validation else "",
-                state.get("query_result", {})
+                state.get("query_result", {}),
+                embedding=state.get("question_embedding"),
+                scope=state["cache_scope"]
             )
-        
-        return state
+    
+    async def _run_in_background(self, coro: Coroutine):
+        """Run housekeeping off the response path, inline once too many are pending"""
+        if len(self._background_tasks) >= self.MAX_BACKGROUND_TASKS:
+            await coro
+            return
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_done)
+    
+    def _background_done(self, task: asyncio.Task):
+        """Forget a finished background task, reporting its failure"""
+        self._background_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Background housekeeping failed", exc_info=task.exception())
     
     async def _handle_error(self, state: AgentState) -> AgentState:
         """Node: Handle errors"""
@@ -441,25 +634,101 @@ class SupervisorAgent:
         self,
         question: str,
         user_id: str = "default",
-        session_id: Optional[str] = None
+        session_id: Optional[str] = None,
+        intent_hint: Optional[str] = None
     ) -> QueryResponse:
-        """Process a natural language query through the full workflow"""
-        initial_state: AgentState = {
-            "question": question,
-            "user_id": user_id,
-            "session_id": session_id or "",
-            "intent": None,
-            "sql_result": None,
-            "validation": None,
-            "query_result": None,
-            "visualization": None,
-            "error": None,
-            "messages": [HumanMessage(content=question)],
-            "conversation_context": None
-        }
+        """
+        Process a natural language query through the full workflow
+        
+        Callers that already know the intent (one of INTENT_GENERATORS) can pass
+        it as intent_hint to run a graph that skips intent analysis.
+        """
+        if intent_hint and intent_hint not in self.INTENT_GENERATORS:
+            raise ValueError(f"Unknown intent hint: {intent_hint}")
+        
+        # Cache hits are answered directly, without building state or entering the graph
+        scope = self._get_cache_scope(user_id, session_id)
+        if intent_hint:
+            # A hinted run may answer with a report or insight, not rows
+            scope = f"{scope}:{intent_hint}"
+        cached, embedding = await self._check_cache(question, scope)
+        if cached:
+            return QueryResponse(
+                success=True,
+                question=question,
+                sql=cached.get("sql", ""),
+                explanation="(cached result)",
+                data=cached.get("result"),
+                cached=True
+            )
+        
+        # A concurrent run of the same question against the same database is
+        # joined instead of repeating its LLM calls and query
+        key = self._in_flight_key(question, user_id, session_id, intent_hint)
+        loop = asyncio.get_running_loop()
+        task = self._in_flight.get(key)
+        if task is None or task.get_loop() is not loop:
+            task = loop.create_task(
+                self._run_workflow(question, user_id, session_id, embedding, intent_hint, scope)
+            )
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._in_flight_done(key, t))
+        
+        # A cancelled caller leaves the run going for the others
+        return await asyncio.shield(task)
+    
+    def _in_flight_key(
+        self,
+        question: str,
+        user_id: str,
+        session_id: Optional[str],
+        intent_hint: Optional[str]
+    ) -> bytes:
+        """Key for joining identical queries - whitespace and case insensitive"""
+        # Conversation context makes the answer session specific
+        parts = (
+            " ".join(question.lower().split()),
+            user_id,
+            session_id or "",
+            intent_hint or "",
+            str(id(self.db_connector)),
+        )
+        return hashlib.blake2b("\0".join(parts).encode(), digest_size=16).digest()
+    
+    @classmethod
+    def _in_flight_done(cls, key: bytes, task: asyncio.Task):
+        """Forget a finished run unless a newer one took its key"""
+        if cls._in_flight.get(key) is task:
+            del cls._in_flight[key]
+    
+    async def _run_workflow(
+        self,
+        question: str,
+        user_id: str,
+        session_id: Optional[str],
+        embedding: Any,
+        intent_hint: Optional[str],
+        cache_scope: str
+    ) -> QueryResponse:
+        """Run the graph for a cache miss and build the response"""
+        initial_state = _BASE_STATE.copy()
+        initial_state["question"] = question
+        initial_state["user_id"] = user_id
+        initial_state["session_id"] = session_id or ""
+        initial_state["question_embedding"] = embedding
+        initial_state["cache_scope"] = cache_scope
         
         # Run the workflow
-        final_state = await self.graph.ainvoke(initial_state)
+        graph = self.graph
+        if intent_hint:
+            graph = type(self)._get_graph(intent_hint)
+            initial_state["intent"] = IntentResult(intent_type=intent_hint, confidence=1.0)
+        final_state = await graph.ainvoke(initial_state, config=self._graph_config)
+        
+        # Feedback, memory and cache writes don't change the response
+        validation = final_state.get("validation")
+        if validation is not None and validation.is_valid:
+            await self._run_in_background(self._record_feedback(final_state))
         
         # Build response
         if final_state.get("error"):
@@ -473,22 +742,27 @@ class SupervisorAgent:
             )
         
         sql_result = final_state.get("sql_result")
-        validation = final_state.get("validation")
         intent = final_state.get("intent")
         
         return QueryResponse(
             success=True,
             question=question,
-            sql=validation.sql if validation else "",
+            sql=validation.sql if validation else (sql_result.sql if sql_result else ""),
             explanation=sql_result.explanation if sql_result else "",
             data=final_state.get("query_result"),
             intent_type=intent.intent_type if intent else "data_retrieval",
             visualization=final_state.get("visualization"),
-            warnings=validation.warnings if validation else [],
-            cached=False
+            warnings=validation.warnings if validation else []
         )
     
-    def process_query_sync(self, question: str) -> QueryResponse:
-        """Synchronous version for simple use cases"""
-        import asyncio
-        return asyncio.run(self.process_query(question))
+    def process_query_sync(
+        self,
+        question: str,
+        user_id: str = "default",
+        session_id: Optional[str] = None,
+        intent_hint: Optional[str] = None
+    ) -> QueryResponse:
+        """Synchronous version for simple use cases (runs on the shared bridge loop)"""
+        return run_sync(self.process_query(
+            question, user_id=user_id, session_id=session_id, intent_hint=intent_hint
+        ))
@@ -0,0 +1,73 @@
+"""
+Sync Bridge - Run coroutines from synchronous code on one shared event loop
+Avoids creating and tearing down a loop per call like asyncio.run does
+"""
+import asyncio
+import atexit
+import threading
+from typing import Any, Coroutine, Optional
+
+
+class _SyncBridge:
+    """Background event loop on a daemon thread, started on first use"""
+
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _thread: Optional[threading.Thread] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def loop(cls) -> asyncio.AbstractEventLoop:
+        """Get the bridge loop, starting it if needed"""
+        if cls._loop is None:
+            with cls._lock:
+                if cls._loop is None:
+                    loop = asyncio.new_event_loop()
+                    cls._thread = threading.Thread(
+                        target=loop.run_forever, name="sync-bridge", daemon=True
+                    )
+                    cls._thread.start()
+                    cls._loop = loop
+                    atexit.register(cls.shutdown)
+        return cls._loop
+
+    @classmethod
+    def shutdown(cls):
+        """Stop the bridge loop and wait for its thread"""
+        with cls._lock:
+            loop, thread = cls._loop, cls._thread
+            cls._loop = cls._thread = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(cls._drain(), loop).result(timeout=5)
+        except Exception:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        loop.close()
+
+    @staticmethod
+    async def _drain():
+        """Cancel leftover tasks and release the loop's worker threads"""
+        loop = asyncio.get_running_loop()
+        tasks = [t for t in asyncio.all_tasks(loop) if t is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await loop.shutdown_asyncgens()
+        # Tools offload blocking work with asyncio.to_thread onto this executor
+        await loop.shutdown_default_executor()
+
+
+def run_sync(coro: Coroutine) -> Any:
+    """Run a coroutine to completion from synchronous code"""
+    loop = _SyncBridge.loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    # Blocking the bridge loop on its own work would deadlock
+    if running is loop:
+        coro.close()
+        raise RuntimeError("run_sync() cannot be called from the bridge event loop")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
@@ -2,10 +2,71 @@
 Column Finder Tool - Search columns by semantic meaning
 Inspired by FINCH's self-querying capability
 """
-from typing import Optional
+from typing import Any, ClassVar, Iterable, Optional
 from dataclasses import dataclass, field
+from collections import OrderedDict
+import asyncio
+import logging
+import threading
 from langchain_core.tools import BaseTool
 from pydantic import BaseModel, Field, PrivateAttr
+from rapidfuzz import fuzz, process
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize_term(term: str) -> str:
+    """Lower-case and strip a term, skipping the copies when it already is"""
+    if not term.islower():
+        term = term.lower()
+    # strip() hands back the same string when there is nothing to strip
+    return term.strip()
+
+
+# Default E-commerce column mappings: term -> (table, column, type, description)
+DEFAULT_COLUMN_MAPPINGS = {
+    # Revenue/Money
+    "revenue": ("orders", "total_amount", "REAL", "Total order revenue"),
+    "doanh thu": ("orders", "total_amount", "REAL", "Total order revenue"),
+    "total": ("orders", "total_amount", "REAL", "Order total amount"),
+    "amount": ("orders", "total_amount", "REAL", "Order amount"),
+    "price": ("products", "price", "REAL", "Product price"),
+    "giá": ("products", "price", "REAL", "Product price"),
+
+    # Customers
+    "customer": ("customers", "name", "TEXT", "Customer name"),
+    "khách hàng": ("customers", "name", "TEXT", "Customer name"),
+    "email": ("customers", "email", "TEXT", "Customer email"),
+    "city": ("customers", "city", "TEXT", "Customer city"),
+    "thành phố": ("customers", "city", "TEXT", "Customer city"),
+
+    # Products
+    "product": ("products", "name", "TEXT", "Product name"),
+    "sản phẩm": ("products", "name", "TEXT", "Product name"),
+    "stock": ("products", "stock", "INTEGER", "Available stock"),
+    "tồn kho": ("products", "stock", "INTEGER", "Available stock"),
+    "category": ("categories", "name", "TEXT", "Category name"),
+    "danh mục": ("categories", "name", "TEXT", "Category name"),
+
+    # Orders
+    "order": ("orders", "id", "INTEGER", "Order ID"),
+    "đơn hàng": ("orders", "id", "INTEGER", "Order ID"),
+    "status": ("orders", "status", "TEXT", "Order status"),
+    "trạng thái": ("orders", "status", "TEXT", "Order status"),
+    "order date": ("orders", "order_date", "DATETIME", "Order placement date"),
+    "ngày đặt": ("orders", "order_date", "DATETIME", "Order date"),
+    "date": ("orders", "order_date", "DATETIME", "Order date"),
+
+    # Order Items
+    "quantity": ("order_items", "quantity", "INTEGER", "Item quantity"),
+    "số lượng": ("order_items", "quantity", "INTEGER", "Quantity"),
+
+    # Aggregations hints
+    "count": ("*", "COUNT(*)", "INTEGER", "Count of records"),
+    "sum": ("*", "SUM()", "REAL", "Sum aggregation"),
+    "average": ("*", "AVG()", "REAL", "Average aggregation"),
+    "total count": ("*", "COUNT(*)", "INTEGER", "Total count"),
+}
 
 
 class ColumnMatch(BaseModel):
@@ -39,10 +100,25 @@ Use this tool when you need to identify which table and column to use for a metr
 Input should be a business term like 'revenue', 'customer', 'order date', etc."""
     args_schema: type[BaseModel] = ColumnFinderInput
     
-    # Internal state
-    _column_index: dict = PrivateAttr(default_factory=dict)
+    # Results memoized per normalized search term
+    RUN_CACHE_SIZE: ClassVar[int] = 256
+    # Minimum RapidFuzz token-set ratio (0-100) for a fuzzy term match
+    FUZZY_CUTOFF: ClassVar[int] = 80
+    
+    # Internal state - index terms and their columns as parallel lists
+    _terms: list[str] = PrivateAttr(default_factory=list)
+    _tables: list[str] = PrivateAttr(default_factory=list)
+    _columns: list[str] = PrivateAttr(default_factory=list)
+    _types: list[str] = PrivateAttr(default_factory=list)
+    _descs: list[str] = PrivateAttr(default_factory=list)
+    _term_to_idx: dict[str, int] = PrivateAttr(default_factory=dict)
+    _postings: dict[str, set[str]] = PrivateAttr(default_factory=dict)  # word -> index terms
+    _trigrams: dict[str, set[str]] = PrivateAttr(default_factory=dict)  # trigram -> index terms
+    _short_terms: list[str] = PrivateAttr(default_factory=list)  # terms too short for trigrams
     _schema_manager: Optional[object] = PrivateAttr(default=None)
     _semantic_layer: Optional[object] = PrivateAttr(default=None)
+    _run_cache: OrderedDict = PrivateAttr(default_factory=OrderedDict)
+    _run_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
     
     def __init__(self, schema_manager=None, semantic_layer=None, **kwargs):
         super().__init__(**kwargs)
@@ -52,158 +128,236 @@ Input should be a business term like 'revenue', 'customer', 'order date', etc.""
     
     def _build_index(self):
         """Build searchable index from schema and semantic layer"""
-        self._column_index = {}
+        with self._run_lock:
+            self._run_cache.clear()
         
-        # Default E-commerce column mappings
-        default_mappings = {
-            # Revenue/Money
-            "revenue": ("orders", "total_amount", "REAL", "Total order revenue"),
-            "doanh thu": ("orders", "total_amount", "REAL", "Total order revenue"),
-            "total": ("orders", "total_amount", "REAL", "Order total amount"),
-            "amount": ("orders", "total_amount", "REAL", "Order amount"),
-            "price": ("products", "price", "REAL", "Product price"),
-            "giá": ("products", "price", "REAL", "Product price"),
-            
-            # Customers
-            "customer": ("customers", "name", "TEXT", "Customer name"),
-            "khách hàng": ("customers", "name", "TEXT", "Customer name"),
-            "email": ("customers", "email", "TEXT", "Customer email"),
-            "city": ("customers", "city", "TEXT", "Customer city"),
-            "thành phố": ("customers", "city", "TEXT", "Customer city"),
-            
-            # Products
-            "product": ("products", "name", "TEXT", "Product name"),
-            "sản phẩm": ("products", "name", "TEXT", "Product name"),
-            "stock": ("products", "stock", "INTEGER", "Available stock"),
-            "tồn kho": ("products", "stock", "INTEGER", "Available stock"),
-            "category": ("categories", "name", "TEXT", "Category name"),
-            "danh mục": ("categories", "name", "TEXT", "Category name"),
-            
-            # Orders
-            "order": ("orders", "id", "INTEGER", "Order ID"),
-            "đơn hàng": ("orders", "id", "INTEGER", "Order ID"),
-            "status": ("orders", "status", "TEXT", "Order status"),
-            "trạng thái": ("orders", "status", "TEXT", "Order status"),
-            "order date": ("orders", "order_date", "DATETIME", "Order placement date"),
-            "ngày đặt": ("orders", "order_date", "DATETIME", "Order date"),
-            "date": ("orders", "order_date", "DATETIME", "Order date"),
-            
-            # Order Items
-            "quantity": ("order_items", "quantity", "INTEGER", "Item quantity"),
-            "số lượng": ("order_items", "quantity", "INTEGER", "Quantity"),
-            
-            # Aggregations hints
-            "count": ("*", "COUNT(*)", "INTEGER", "Count of records"),
-            "sum": ("*", "SUM()", "REAL", "Sum aggregation"),
-            "average": ("*", "AVG()", "REAL", "Average aggregation"),
-            "total count": ("*", "COUNT(*)", "INTEGER", "Total count"),
-        }
-        
-        self._column_index = default_mappings
+        index = dict(DEFAULT_COLUMN_MAPPINGS)
         
         # Add from semantic layer if available
+        # Keys are stored lower-cased to match the normalized search term
         if self._semantic_layer:
             for mapping in self._semantic_layer.term_mappings:
-                self._column_index[mapping.term] = (
+                index[_normalize_term(mapping.term)] = (
                     mapping.table,
                     mapping.sql_column,
                     "UNKNOWN",
                     mapping.description
                 )
                 for syn in mapping.synonyms:
-                    self._column_index[syn] = (
+                    index[_normalize_term(syn)] = (
                         mapping.table,
                         mapping.sql_column,
                         "UNKNOWN",
                         mapping.description
                     )
+        
+        # Scoring scans only the terms; column details are read for matches
+        self._terms = list(index)
+        self._tables, self._columns, self._types, self._descs = (
+            list(values) for values in zip(*index.values())
+        )
+        self._term_to_idx = {term: i for i, term in enumerate(self._terms)}
+        
+        # Inverted index, so fuzzy scoring only visits terms sharing a word
+        self._postings = {}
+        for term in self._terms:
+            for word in term.split():
+                self._postings.setdefault(word, set()).add(term)
+        
+        # Trigram index, so partial matching only checks terms sharing a trigram
+        self._trigrams = {}
+        self._short_terms = [term for term in self._terms if len(term) < 3]
+        for term in self._terms:
+            for i in range(len(term) - 2):
+                self._trigrams.setdefault(term[i:i + 3], set()).add(term)
     
     def _run(self, search_term: str) -> list[dict]:
         """Find columns matching the search term"""
-        search_lower = search_term.lower().strip()
-        results = []
+        key = _normalize_term(search_term)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        
+        semantic_results = []
+        search_failed = False
         
         # Semantic Search using OpenSearch (via Semantic Layer)
-        if self._semantic_layer and hasattr(self._semantic_layer, 'search_definitions'):
+        if self._has_semantic_search():
             try:
                 semantic_results = self._semantic_layer.search_definitions(search_term, k=3)
-                for res in semantic_results:
-                    obj = res.get('obj') # Enriched object (Entity or Metric)
-                    if not obj:
-                        continue
-                        
-                    # Map Semantic Objects to Columns
-                    if res['type'] == 'metric':
-                        # Metric -> SQL Expression (treat as computed column)
-                        results.append({
-                            "table": "*", # Computed
-                            "column": obj.definition, # e.g. SUM(total_amount)
-                            "data_type": "REAL",
-                            "description": f"Metric: {obj.description}",
-                            "score": res['score']
-                        })
-                    elif res['type'] == 'entity':
-                        # Entity -> Primary Key or Table ref
-                        results.append({
-                            "table": obj.table_name,
-                            "column": obj.primary_key,
-                            "data_type": "INTEGER", # Assumption
-                            "description": f"Entity: {obj.description}",
-                            "score": res['score']
-                        })
             except Exception as e:
-                print(f"ColumnFinder semantic search error: {e}")
-
-        # Direct match
-        if search_lower in self._column_index:
-            table, column, dtype, desc = self._column_index[search_lower]
-            results.append({
-                "table": table,
-                "column": column,
-                "data_type": dtype,
-                "description": desc,
-                "score": 1.0
-            })
-        
-        # Partial match
-        for term, (table, column, dtype, desc) in self._column_index.items():
-            if term != search_lower:
-                if search_lower in term or term in search_lower:
-                    results.append({
-                        "table": table,
-                        "column": column,
-                        "data_type": dtype,
-                        "description": desc,
-                        "score": 0.7
-                    })
+                logger.warning("ColumnFinder semantic search error: %s", e)
+                search_failed = True
         
-        # Fuzzy matching using word overlap
-        search_words = set(search_lower.split())
-        for term, (table, column, dtype, desc) in self._column_index.items():
-            term_words = set(term.split())
-            overlap = search_words & term_words
-            if overlap and term != search_lower:
-                score = len(overlap) / max(len(search_words), len(term_words))
-                if score > 0.3:
-                    results.append({
-                        "table": table,
-                        "column": column,
-                        "data_type": dtype,
-                        "description": desc,
-                        "score": score * 0.5
-                    })
+        matches = self._match(search_term, semantic_results)
+        if not search_failed:
+            self._store(key, matches)
+        return matches
+    
+    def _cached(self, key: str) -> Optional[list[dict]]:
+        """Copy of the memoized matches for a normalized term"""
+        with self._run_lock:
+            matches = self._run_cache.get(key)
+            if matches is None:
+                return None
+            self._run_cache.move_to_end(key)
+        # Callers get their own result dicts
+        return [dict(r) for r in matches]
+    
+    def _store(self, key: str, matches: list[dict]):
+        """Memoize matches for a normalized term"""
+        with self._run_lock:
+            self._run_cache[key] = [dict(r) for r in matches]
+            while len(self._run_cache) > self.RUN_CACHE_SIZE:
+                self._run_cache.popitem(last=False)
+    
+    def _semantic_columns(self, semantic_results: list[dict]) -> list[dict]:
+        """Map semantic layer search results to columns"""
+        results = []
+        for res in semantic_results:
+            obj = res.get('obj') # Enriched object (Entity or Metric)
+            if not obj:
+                continue
+                
+            # Map Semantic Objects to Columns
+            if res['type'] == 'metric':
+                # Metric -> SQL Expression (treat as computed column)
+                results.append({
+                    "table": "*", # Computed
+                    "column": obj.definition, # e.g. SUM(total_amount)
+                    "data_type": "REAL",
+                    "description": f"Metric: {obj.description}",
+                    "score": res['score']
+                })
+            elif res['type'] == 'entity':
+                # Entity -> Primary Key or Table ref
+                results.append({
+                    "table": obj.table_name,
+                    "column": obj.primary_key,
+                    "data_type": "INTEGER", # Assumption
+                    "description": f"Entity: {obj.description}",
+                    "score": res['score']
+                })
+        return results
+    
+    def _match(self, search_term: str, semantic_results: list[dict]) -> list[dict]:
+        """Combine semantic results with index matches for a term"""
+        search_lower = _normalize_term(search_term)
         
-        # Deduplicate and sort by score
-        seen = set()
-        unique_results = []
-        for r in sorted(results, key=lambda x: x["score"], reverse=True):
+        # Best (score, semantic result or index position) per (table, column)
+        best: dict[tuple[str, str], tuple[float, Any]] = {}
+        for r in self._semantic_columns(semantic_results):
             key = (r["table"], r["column"])
-            if key not in seen:
-                seen.add(key)
-                unique_results.append(r)
+            if key not in best or r["score"] > best[key][0]:
+                best[key] = (r["score"], r)
+        
+        exact = self._term_to_idx.get(search_lower)
+        if exact is not None:
+            # A direct hit is the answer - skip the partial and fuzzy scans
+            key = (self._tables[exact], self._columns[exact])
+            if key not in best or 1.0 > best[key][0]:
+                best[key] = (1.0, exact)
+        else:
+            # Partial matches, checked only on terms sharing a trigram, then word overlap
+            scores = {
+                term: 0.7 for term in self._substring_candidates(search_lower)
+                if search_lower in term or term in search_lower
+            }
+            for term, overlap in self._overlap_scores(search_lower).items():
+                scores[term] = max(scores.get(term, 0.0), overlap * 0.5)
+            
+            # In index order, so equal scores keep a stable ranking
+            for i in sorted(map(self._term_to_idx.__getitem__, scores)):
+                score = scores[self._terms[i]]
+                key = (self._tables[i], self._columns[i])
+                if key not in best or score > best[key][0]:
+                    best[key] = (score, i)
+        
+        top = sorted(best.values(), key=lambda x: x[0], reverse=True)[:5]  # Top 5 matches
+        return [match if isinstance(match, dict) else self._index_result(match, score) for score, match in top]
+    
+    def _index_result(self, i: int, score: float) -> dict:
+        """Result dict for the index term at position i"""
+        return {
+            "table": self._tables[i],
+            "column": self._columns[i],
+            "data_type": self._types[i],
+            "description": self._descs[i],
+            "score": score
+        }
+    
+    def _substring_candidates(self, search_lower: str) -> Iterable[str]:
+        """Index terms that may contain, or be contained in, the search term"""
+        if len(search_lower) < 3:
+            return self._terms
+        
+        # A term inside the search term has only the search term's trigrams, so
+        # take the union of their postings rather than the intersection
+        candidates = set(self._short_terms)
+        for i in range(len(search_lower) - 2):
+            candidates.update(self._trigrams.get(search_lower[i:i + 3], ()))
+        return candidates
+    
+    def _overlap_scores(self, search_lower: str) -> dict[str, float]:
+        """Fuzzy word-overlap score (0-1) of each index term that loosely matches"""
+        # Only terms sharing a word or a trigram with the search term can reach
+        # the cutoff, so the C scorer runs on those rather than the whole index
+        candidates = set(self._substring_candidates(search_lower))
+        for word in search_lower.split():
+            candidates.update(self._postings.get(word, ()))
         
-        return unique_results[:5]  # Top 5 matches
+        # Token-set similarity, which also tolerates misspelled words
+        matches = process.extract(
+            search_lower, list(candidates),
+            scorer=fuzz.token_set_ratio, score_cutoff=self.FUZZY_CUTOFF, limit=None
+        )
+        return {term: score / 100.0 for term, score, _ in matches}
+    
+    def _has_semantic_search(self) -> bool:
+        """Whether lookups hit the semantic layer's (blocking) vector search"""
+        return bool(self._semantic_layer and hasattr(self._semantic_layer, 'search_definitions'))
     
     async def _arun(self, search_term: str) -> list[dict]:
-        """Async version"""
+        """Async version - semantic search blocks, so it runs on a worker thread"""
+        cached = self._cached(_normalize_term(search_term))
+        if cached is not None:
+            return cached
+        if self._has_semantic_search():
+            return await asyncio.to_thread(self._run, search_term)
         return self._run(search_term)
+    
+    def _run_batch(self, search_terms: list[str]) -> list[list[dict]]:
+        """Find columns for many terms, looking up each distinct term once"""
+        results = {}
+        missing = []
+        for term in dict.fromkeys(search_terms):
+            cached = self._cached(_normalize_term(term))
+            if cached is None:
+                missing.append(term)
+            else:
+                results[term] = cached
+        
+        # One embedding call and one search request for the terms not memoized
+        if missing and self._has_semantic_search() and hasattr(self._semantic_layer, 'search_definitions_batch'):
+            try:
+                semantic_batches = self._semantic_layer.search_definitions_batch(missing, k=3)
+                search_failed = False
+            except Exception as e:
+                logger.warning("ColumnFinder semantic search error: %s", e)
+                semantic_batches = [[] for _ in missing]
+                search_failed = True
+            for term, semantic_results in zip(missing, semantic_batches):
+                results[term] = self._match(term, semantic_results)
+                if not search_failed:
+                    self._store(_normalize_term(term), results[term])
+        else:
+            for term in missing:
+                results[term] = self._run(term)
+        
+        return [results[term] for term in search_terms]
+    
+    async def _arun_batch(self, search_terms: list[str]) -> list[list[dict]]:
+        """Async version of _run_batch - the batched semantic search runs on a worker thread"""
+        if self._has_semantic_search():
+            return await asyncio.to_thread(self._run_batch, search_terms)
+        return self._run_batch(search_terms)
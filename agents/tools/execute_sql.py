@@ -3,10 +3,46 @@ Execute SQL Tool - Safe SQL execution with result formatting
 Inspired by FINCH's execute SQL capability
 """
 from typing import Any, Optional, ClassVar
+from functools import lru_cache
+from itertools import islice
 from langchain_core.tools import BaseTool
 from pydantic import BaseModel, Field
 import re
 
+from ..sync_bridge import run_sync
+
+try:
+    import sqlglot
+    from sqlglot import exp
+    HAVE_SQLGLOT = True
+except ImportError:
+    HAVE_SQLGLOT = False
+
+
+# LIMIT checks in _clean_sql - compiled once for every execution
+LIMIT_RE = re.compile(r'\bLIMIT\b', re.IGNORECASE)
+AGGREGATE_RE = re.compile(r'\b(COUNT|SUM|AVG|MAX|MIN)\s*\(', re.IGNORECASE)
+GROUP_BY_RE = re.compile(r'\bGROUP\s+BY\b', re.IGNORECASE)
+
+if HAVE_SQLGLOT:
+    # Node names vary across sqlglot versions; statements it can't model are Commands
+    BLOCKED_NODES = tuple(getattr(exp, name) for name in (
+        "Delete", "Insert", "Update", "Create", "Drop",
+        "Alter", "AlterTable", "TruncateTable", "Command",
+    ) if hasattr(exp, name))
+    AGGREGATE_NODES = (exp.Count, exp.Sum, exp.Avg, exp.Min, exp.Max)
+
+
+@lru_cache(maxsize=256)
+def _parse_sql(sql: str) -> Optional[tuple]:
+    """Statements parsed from the SQL, or None when sqlglot is missing or can't parse it"""
+    if not HAVE_SQLGLOT:
+        return None
+    try:
+        return tuple(stmt for stmt in sqlglot.parse(sql) if stmt is not None)
+    except sqlglot.errors.SqlglotError:
+        return None
+
 
 class ExecuteSQLInput(BaseModel):
     """Input for Execute SQL Tool"""
@@ -37,14 +73,14 @@ Returns columns, rows, and row count."""
         r'\bALTER\b', r'\bCREATE\b', r'\bINSERT\b',
         r'\bUPDATE\b', r'\bGRANT\b', r'\bREVOKE\b',
     ]
+    # All blocked patterns as one alternation - a single pass over the SQL
+    BLOCKED_RE: ClassVar[re.Pattern] = re.compile("|".join(BLOCKED_PATTERNS), re.IGNORECASE)
     
     db_connector: Any = None
-    _blocked: list = []
     
     def __init__(self, db_connector=None, **kwargs):
         super().__init__(**kwargs)
         self.db_connector = db_connector
-        self._blocked = [re.compile(p, re.IGNORECASE) for p in self.BLOCKED_PATTERNS]
     
     def _validate_sql(self, sql: str) -> tuple[bool, str]:
         """Validate SQL before execution"""
@@ -54,10 +90,15 @@ Returns columns, rows, and row count."""
         if not sql_clean.upper().startswith('SELECT'):
             return False, "Only SELECT queries are allowed"
         
-        # Check blocked patterns
-        for pattern in self._blocked:
-            if pattern.search(sql_clean):
-                return False, f"Blocked operation detected"
+        # Parsed, blocked operations are found in the tree - not in comments or strings
+        statements = _parse_sql(sql_clean.rstrip(';'))
+        if statements is None:
+            if self.BLOCKED_RE.search(sql_clean):
+                return False, "Blocked operation detected"
+        elif len(statements) != 1:
+            return False, "Only a single statement is allowed"
+        elif statements[0].find(*BLOCKED_NODES):
+            return False, "Blocked operation detected"
         
         return True, ""
     
@@ -65,12 +106,21 @@ Returns columns, rows, and row count."""
         """Clean and add limit to SQL"""
         sql_clean = sql.strip().rstrip(';')
         
+        # Reuses the parse from _validate_sql; regex checks when it's unavailable
+        statements = _parse_sql(sql_clean)
+        if statements and len(statements) == 1:
+            tree = statements[0]
+            has_limit = tree.args.get("limit") is not None
+            has_agg = tree.find(*AGGREGATE_NODES) is not None
+            has_group = tree.args.get("group") is not None
+        else:
+            has_limit = LIMIT_RE.search(sql_clean) is not None
+            has_agg = AGGREGATE_RE.search(sql_clean) is not None
+            has_group = GROUP_BY_RE.search(sql_clean) is not None
+        
         # Add LIMIT if not present
-        if not re.search(r'\bLIMIT\b', sql_clean, re.IGNORECASE):
+        if not has_limit:
             # Don't add limit to aggregate queries without GROUP BY that return single row
-            has_agg = re.search(r'\b(COUNT|SUM|AVG|MAX|MIN)\s*\(', sql_clean, re.IGNORECASE)
-            has_group = re.search(r'\bGROUP\s+BY\b', sql_clean, re.IGNORECASE)
-            
             if not has_agg or has_group:
                 sql_clean += f' LIMIT {limit}'
         
@@ -92,21 +142,9 @@ Returns columns, rows, and row count."""
         
         # Execute
         if self.db_connector:
-            import asyncio
             try:
-                # Try to get running loop
-                loop = asyncio.get_event_loop()
-                if loop.is_running():
-                    # We're in an async context, create a future
-                    import concurrent.futures
-                    with concurrent.futures.ThreadPoolExecutor() as pool:
-                        future = pool.submit(
-                            asyncio.run,
-                            self.db_connector.execute(clean_sql)
-                        )
-                        result = future.result()
-                else:
-                    result = asyncio.run(self.db_connector.execute(clean_sql))
+                # Runs on the shared background loop - no loop set up per query
+                result = run_sync(self.db_connector.execute(clean_sql))
                 
                 return {
                     "success": True,
@@ -181,23 +219,19 @@ Returns columns, rows, and row count."""
         if not columns:
             return "No results"
         
-        # Calculate column widths
-        widths = [len(str(col)) for col in columns]
+        # Stringify every cell once, padding short rows so zip() keeps every
+        # column, then take column widths column-wise
+        n = len(columns)
+        table = [list(map(str, columns))]
         for row in rows:
-            for i, cell in enumerate(row):
-                widths[i] = max(widths[i], len(str(cell)))
+            cells = list(map(str, islice(row, n)))
+            cells.extend([""] * (n - len(cells)))
+            table.append(cells)
+        widths = [max(map(len, col)) for col in zip(*table)]
         
         # Build table
-        lines = []
-        header = " | ".join(str(col).ljust(widths[i]) for i, col in enumerate(columns))
-        separator = "-+-".join("-" * w for w in widths)
-        
-        lines.append(header)
-        lines.append(separator)
-        
-        for row in rows:
-            line = " | ".join(str(cell).ljust(widths[i]) for i, cell in enumerate(row))
-            lines.append(line)
+        lines = [" | ".join(cell.ljust(w) for cell, w in zip(row, widths)) for row in table]
+        lines.insert(1, "-+-".join("-" * w for w in widths))
         
         lines.append(f"\n({result.get('row_count', 0)} rows)")
         
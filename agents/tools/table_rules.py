@@ -2,11 +2,138 @@
 Table Rules Tool - Get table-specific rules and constraints
 Inspired by FINCH's table rules retrieval
 """
-from typing import Optional
+from typing import Mapping, Optional
+from types import MappingProxyType
 from langchain_core.tools import BaseTool
 from pydantic import BaseModel, Field
 
 
+# Rules per table, built once at import
+TABLE_RULES = {
+    "customers": {
+        "table": "customers",
+        "description": "Customer information table",
+        "required_columns": [],
+        "default_filters": {},
+        "common_columns": ["id", "name", "email", "city"],
+        "join_hints": [
+            {"target": "orders", "on": "customers.id = orders.customer_id"}
+        ],
+        "example_queries": [
+            {
+                "question": "All customers from Hanoi",
+                "sql": "SELECT * FROM customers WHERE city = 'Hanoi'"
+            },
+            {
+                "question": "Customer count by city",
+                "sql": "SELECT city, COUNT(*) as count FROM customers GROUP BY city ORDER BY count DESC"
+            }
+        ],
+        "notes": ["City values: Hanoi, Ho Chi Minh, Da Nang, Can Tho, Hai Phong"]
+    },
+
+    "products": {
+        "table": "products",
+        "description": "Product catalog table",
+        "required_columns": [],
+        "default_filters": {"stock": "> 0"},
+        "common_columns": ["id", "name", "price", "category_id", "stock"],
+        "join_hints": [
+            {"target": "categories", "on": "products.category_id = categories.id"},
+            {"target": "order_items", "on": "products.id = order_items.product_id"}
+        ],
+        "example_queries": [
+            {
+                "question": "Products under $50",
+                "sql": "SELECT * FROM products WHERE price < 50"
+            },
+            {
+                "question": "Products by category",
+                "sql": "SELECT c.name as category, COUNT(p.id) as count FROM categories c LEFT JOIN products p ON c.id = p.category_id GROUP BY c.id"
+            }
+        ],
+        "notes": ["Price is in USD", "Use stock > 0 for available products only"]
+    },
+
+    "orders": {
+        "table": "orders",
+        "description": "Customer orders table",
+        "required_columns": ["customer_id"],
+        "default_filters": {},
+        "common_columns": ["id", "customer_id", "order_date", "status", "total_amount"],
+        "join_hints": [
+            {"target": "customers", "on": "orders.customer_id = customers.id"},
+            {"target": "order_items", "on": "orders.id = order_items.order_id"}
+        ],
+        "aggregation_hints": {
+            "revenue": "SUM(total_amount)",
+            "order_count": "COUNT(*)",
+            "avg_order": "AVG(total_amount)"
+        },
+        "example_queries": [
+            {
+                "question": "Total revenue",
+                "sql": "SELECT SUM(total_amount) as total_revenue FROM orders"
+            },
+            {
+                "question": "Revenue by month",
+                "sql": "SELECT strftime('%Y-%m', order_date) as month, SUM(total_amount) as revenue FROM orders GROUP BY month ORDER BY month"
+            },
+            {
+                "question": "Orders by status",
+                "sql": "SELECT status, COUNT(*) as count FROM orders GROUP BY status"
+            }
+        ],
+        "notes": [
+            "Status values: pending, confirmed, shipped, delivered, cancelled",
+            "total_amount is in USD",
+            "Use strftime('%Y-%m', order_date) for monthly grouping"
+        ]
+    },
+
+    "order_items": {
+        "table": "order_items",
+        "description": "Line items in each order",
+        "required_columns": ["order_id", "product_id"],
+        "default_filters": {},
+        "common_columns": ["id", "order_id", "product_id", "quantity", "unit_price"],
+        "join_hints": [
+            {"target": "orders", "on": "order_items.order_id = orders.id"},
+            {"target": "products", "on": "order_items.product_id = products.id"}
+        ],
+        "aggregation_hints": {
+            "total_quantity": "SUM(quantity)",
+            "line_total": "SUM(quantity * unit_price)"
+        },
+        "example_queries": [
+            {
+                "question": "Top selling products",
+                "sql": "SELECT p.name, SUM(oi.quantity) as total_sold FROM products p JOIN order_items oi ON p.id = oi.product_id GROUP BY p.id ORDER BY total_sold DESC LIMIT 10"
+            }
+        ],
+        "notes": ["unit_price captures price at time of order"]
+    },
+
+    "categories": {
+        "table": "categories",
+        "description": "Product categories",
+        "required_columns": [],
+        "default_filters": {},
+        "common_columns": ["id", "name", "parent_id"],
+        "join_hints": [
+            {"target": "products", "on": "categories.id = products.category_id"}
+        ],
+        "example_queries": [
+            {
+                "question": "All categories",
+                "sql": "SELECT * FROM categories"
+            }
+        ],
+        "notes": ["Categories: Electronics, Clothing, Books, Home & Garden, Sports"]
+    }
+}
+
+
 class TableRulesInput(BaseModel):
     """Input for Table Rules Tool"""
     table_name: str = Field(description="Table name to get rules for")
@@ -35,131 +162,10 @@ and proper query patterns for the table."""
         super().__init__(**kwargs)
         self._rules = self._build_rules()
     
-    def _build_rules(self) -> dict:
+    def _build_rules(self) -> Mapping[str, dict]:
         """Build table rules index"""
-        return {
-            "customers": {
-                "table": "customers",
-                "description": "Customer information table",
-                "required_columns": [],
-                "default_filters": {},
-                "common_columns": ["id", "name", "email", "city"],
-                "join_hints": [
-                    {"target": "orders", "on": "customers.id = orders.customer_id"}
-                ],
-                "example_queries": [
-                    {
-                        "question": "All customers from Hanoi",
-                        "sql": "SELECT * FROM customers WHERE city = 'Hanoi'"
-                    },
-                    {
-                        "question": "Customer count by city",
-                        "sql": "SELECT city, COUNT(*) as count FROM customers GROUP BY city ORDER BY count DESC"
-                    }
-                ],
-                "notes": ["City values: Hanoi, Ho Chi Minh, Da Nang, Can Tho, Hai Phong"]
-            },
-            
-            "products": {
-                "table": "products",
-                "description": "Product catalog table",
-                "required_columns": [],
-                "default_filters": {"stock": "> 0"},
-                "common_columns": ["id", "name", "price", "category_id", "stock"],
-                "join_hints": [
-                    {"target": "categories", "on": "products.category_id = categories.id"},
-                    {"target": "order_items", "on": "products.id = order_items.product_id"}
-                ],
-                "example_queries": [
-                    {
-                        "question": "Products under $50",
-                        "sql": "SELECT * FROM products WHERE price < 50"
-                    },
-                    {
-                        "question": "Products by category",
-                        "sql": "SELECT c.name as category, COUNT(p.id) as count FROM categories c LEFT JOIN products p ON c.id = p.category_id GROUP BY c.id"
-                    }
-                ],
-                "notes": ["Price is in USD", "Use stock > 0 for available products only"]
-            },
-            
-            "orders": {
-                "table": "orders",
-                "description": "Customer orders table",
-                "required_columns": ["customer_id"],
-                "default_filters": {},
-                "common_columns": ["id", "customer_id", "order_date", "status", "total_amount"],
-                "join_hints": [
-                    {"target": "customers", "on": "orders.customer_id = customers.id"},
-                    {"target": "order_items", "on": "orders.id = order_items.order_id"}
-                ],
-                "aggregation_hints": {
-                    "revenue": "SUM(total_amount)",
-                    "order_count": "COUNT(*)",
-                    "avg_order": "AVG(total_amount)"
-                },
-                "example_queries": [
-                    {
-                        "question": "Total revenue",
-                        "sql": "SELECT SUM(total_amount) as total_revenue FROM orders"
-                    },
-                    {
-                        "question": "Revenue by month",
-                        "sql": "SELECT strftime('%Y-%m', order_date) as month, SUM(total_amount) as revenue FROM orders GROUP BY month ORDER BY month"
-                    },
-                    {
-                        "question": "Orders by status",
-                        "sql": "SELECT status, COUNT(*) as count FROM orders GROUP BY status"
-                    }
-                ],
-                "notes": [
-                    "Status values: pending, confirmed, shipped, delivered, cancelled",
-                    "total_amount is in USD",
-                    "Use strftime('%Y-%m', order_date) for monthly grouping"
-                ]
-            },
-            
-            "order_items": {
-                "table": "order_items",
-                "description": "Line items in each order",
-                "required_columns": ["order_id", "product_id"],
-                "default_filters": {},
-                "common_columns": ["id", "order_id", "product_id", "quantity", "unit_price"],
-                "join_hints": [
-                    {"target": "orders", "on": "order_items.order_id = orders.id"},
-                    {"target": "products", "on": "order_items.product_id = products.id"}
-                ],
-                "aggregation_hints": {
-                    "total_quantity": "SUM(quantity)",
-                    "line_total": "SUM(quantity * unit_price)"
-                },
-                "example_queries": [
-                    {
-                        "question": "Top selling products",
-                        "sql": "SELECT p.name, SUM(oi.quantity) as total_sold FROM products p JOIN order_items oi ON p.id = oi.product_id GROUP BY p.id ORDER BY total_sold DESC LIMIT 10"
-                    }
-                ],
-                "notes": ["unit_price captures price at time of order"]
-            },
-            
-            "categories": {
-                "table": "categories",
-                "description": "Product categories",
-                "required_columns": [],
-                "default_filters": {},
-                "common_columns": ["id", "name", "parent_id"],
-                "join_hints": [
-                    {"target": "products", "on": "categories.id = products.category_id"}
-                ],
-                "example_queries": [
-                    {
-                        "question": "All categories",
-                        "sql": "SELECT * FROM categories"
-                    }
-                ],
-                "notes": ["Categories: Electronics, Clothing, Books, Home & Garden, Sports"]
-            }
-        }
+        # Shared by every instance; _run only reads it
+        return MappingProxyType(TABLE_RULES)
     
     def _run(self, table_name: str) -> dict:
         """Get rules for a table"""
@@ -189,6 +195,10 @@ and proper query patterns for the table."""
         """Async version"""
         return self._run(table_name)
     
+    async def _arun_batch(self, table_names: list[str]) -> list[dict]:
+        """Get rules for many tables (in-memory index, so no thread needed)"""
+        return [self._run(name) for name in table_names]
+    
     def get_all_tables(self) -> list[str]:
         """Get list of all tables with rules"""
         return list(self._rules.keys())
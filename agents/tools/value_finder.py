@@ -142,3 +142,12 @@ Returns the actual values to use in SQL WHERE clauses."""
     async def _arun(self, alias: str, column: str = "") -> dict:
         """Async version"""
         return self._run(alias, column)
+    
+    def _run_batch(self, aliases: list[str]) -> list[dict]:
+        """Find values for many aliases, looking up each distinct alias once"""
+        results = {alias: self._run(alias) for alias in dict.fromkeys(aliases)}
+        return [results[alias] for alias in aliases]
+    
+    async def _arun_batch(self, aliases: list[str]) -> list[dict]:
+        """Async version of _run_batch (in-memory index, so no thread needed)"""
+        return self._run_batch(aliases)
@@ -4,9 +4,31 @@ Validation Agent - Validates SQL queries before execution
 import re
 from typing import Optional
 from dataclasses import dataclass
+from collections import OrderedDict
 from pydantic import BaseModel, Field
 
 
+# Cleaning, LIMIT and cost checks - compiled once for every validation
+LINE_COMMENT_RE = re.compile(r'--.*$', re.MULTILINE)
+BLOCK_COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+LIMIT_RE = re.compile(r'\bLIMIT\b', re.IGNORECASE)
+AGGREGATE_RE = re.compile(r'\b(COUNT|SUM|AVG|MAX|MIN)\s*\(', re.IGNORECASE)
+GROUP_BY_RE = re.compile(r'\bGROUP\s+BY\b', re.IGNORECASE)
+
+# Cost indicators, matched against the upper-cased SQL
+HIGH_COST_PATTERNS = tuple(re.compile(p) for p in (
+    r'SELECT\s+\*.*JOIN.*JOIN.*JOIN',  # SELECT * with multiple joins
+    r'NOT\s+IN\s*\(',  # NOT IN subquery
+    r'LIKE\s+[\'"]%',  # Leading wildcard
+))
+MEDIUM_COST_PATTERNS = tuple(re.compile(p) for p in (
+    r'JOIN',
+    r'GROUP\s+BY',
+    r'ORDER\s+BY',
+    r'DISTINCT',
+))
+
+
 class ValidationResult(BaseModel):
     """SQL validation result"""
     is_valid: bool = Field(description="Whether the SQL is valid and safe")
@@ -50,12 +72,29 @@ class ValidationAgent:
         (r'\bJOIN\b.*\bJOIN\b.*\bJOIN\b', "Multiple JOINs detected - may be slow"),
     ]
     
-    def __init__(self):
+    def __init__(self, cache_size: int = 512):
         self.blocked_patterns = [re.compile(p, re.IGNORECASE) for p in self.BLOCKED_PATTERNS]
         self.warning_patterns = [(re.compile(p, re.IGNORECASE), msg) for p, msg in self.WARNING_PATTERNS]
+        self.cache_size = cache_size
+        # Repeated prompts regenerate the same SQL, so memoize by SQL text
+        self._cache: OrderedDict[str, ValidationResult] = OrderedDict()
     
     def validate(self, sql: str) -> ValidationResult:
         """Validate SQL query"""
+        cached = self._cache.get(sql)
+        if cached is not None:
+            self._cache.move_to_end(sql)
+            # Callers get their own copy of the error/warning lists
+            return cached.model_copy(deep=True)
+        
+        result = self._validate(sql)
+        self._cache[sql] = result.model_copy(deep=True)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return result
+    
+    def _validate(self, sql: str) -> ValidationResult:
+        """Run the validation checks"""
         errors = []
         warnings = []
         
@@ -88,9 +127,9 @@ class ValidationAgent:
         estimated_cost = self._estimate_cost(cleaned_sql)
         
         # Add LIMIT if not present and no aggregation
-        if not re.search(r'\bLIMIT\b', cleaned_sql, re.IGNORECASE):
-            if not re.search(r'\b(COUNT|SUM|AVG|MAX|MIN)\s*\(', cleaned_sql, re.IGNORECASE):
-                if not re.search(r'\bGROUP\s+BY\b', cleaned_sql, re.IGNORECASE):
+        if not LIMIT_RE.search(cleaned_sql):
+            if not AGGREGATE_RE.search(cleaned_sql):
+                if not GROUP_BY_RE.search(cleaned_sql):
                     cleaned_sql = cleaned_sql.rstrip(';') + ' LIMIT 1000'
                     warnings.append("Added LIMIT 1000 to prevent large result sets")
         
@@ -105,8 +144,8 @@ class ValidationAgent:
     def _clean_sql(self, sql: str) -> str:
         """Clean and normalize SQL"""
         # Remove comments
-        sql = re.sub(r'--.*$', '', sql, flags=re.MULTILINE)
-        sql = re.sub(r'/\*.*?\*/', '', sql, flags=re.DOTALL)
+        sql = LINE_COMMENT_RE.sub('', sql)
+        sql = BLOCK_COMMENT_RE.sub('', sql)
         
         # Normalize whitespace
         sql = ' '.join(sql.split())
@@ -120,27 +159,12 @@ class ValidationAgent:
         """Estimate query cost based on patterns"""
         sql_upper = sql.upper()
         
-        # High cost indicators
-        high_cost_patterns = [
-            r'SELECT\s+\*.*JOIN.*JOIN.*JOIN',  # SELECT * with multiple joins
-            r'NOT\s+IN\s*\(',  # NOT IN subquery
-            r'LIKE\s+[\'"]%',  # Leading wildcard
-        ]
-        
-        # Medium cost indicators
-        medium_cost_patterns = [
-            r'JOIN',
-            r'GROUP\s+BY',
-            r'ORDER\s+BY',
-            r'DISTINCT',
-        ]
-        
-        for pattern in high_cost_patterns:
-            if re.search(pattern, sql_upper):
+        for pattern in HIGH_COST_PATTERNS:
+            if pattern.search(sql_upper):
                 return "high"
         
-        for pattern in medium_cost_patterns:
-            if re.search(pattern, sql_upper):
+        for pattern in MEDIUM_COST_PATTERNS:
+            if pattern.search(sql_upper):
                 return "medium"
         
         return "low"
@@ -17,7 +17,7 @@ class ChartType(Enum):
     METRIC = "metric"  # Single KPI
 
 
-@dataclass
+@dataclass(slots=True)
 class ChartConfig:
     """Chart configuration for frontend"""
     chart_type: ChartType
@@ -94,13 +94,14 @@ class VisualizationAgent:
             return ChartType.METRIC
         
         # Check column types
-        has_time = any("date" in c.lower() or "month" in c.lower() or "year" in c.lower() 
-                       for c in columns)
-        has_category = any("name" in c.lower() or "city" in c.lower() or "category" in c.lower()
-                          for c in columns)
-        has_numeric = any("sum" in c.lower() or "count" in c.lower() or "total" in c.lower() or
-                         "revenue" in c.lower() or "amount" in c.lower()
-                         for c in columns)
+        columns_lower = [c.lower() for c in columns]
+        has_time = any("date" in c or "month" in c or "year" in c 
+                       for c in columns_lower)
+        has_category = any("name" in c or "city" in c or "category" in c
+                          for c in columns_lower)
+        has_numeric = any("sum" in c or "count" in c or "total" in c or
+                         "revenue" in c or "amount" in c
+                         for c in columns_lower)
         
         # Time series = Line chart
         if has_time and has_numeric:
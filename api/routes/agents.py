@@ -188,6 +188,9 @@ async def update_agent(agent_id: str, request: AgentUpdateRequest):
         ]
     
     updated = await repo.update(agent)
+    from agents.multi_db_supervisor import invalidate_agent_supervisor
+    # Its supervisor holds connectors built from the old config
+    await invalidate_agent_supervisor(agent_id)
     return AgentResponse(**updated.to_dict())
 
 
@@ -206,6 +209,8 @@ async def delete_agent(agent_id: str, hard: bool = False):
     if not success:
         raise HTTPException(status_code=404, detail="Agent not found")
     
+    from agents.multi_db_supervisor import invalidate_agent_supervisor
+    await invalidate_agent_supervisor(agent_id)
     return {"success": True, "message": "Agent deleted"}
 
 
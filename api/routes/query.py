@@ -4,7 +4,7 @@ Query API Routes - Main natural language to SQL endpoint
 from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel, Field
 from typing import Optional, Any
-import json
+import orjson
 
 router = APIRouter()
 
@@ -15,6 +15,7 @@ class QueryRequest(BaseModel):
     execute: bool = Field(default=True, description="Whether to execute the SQL")
     agent_id: Optional[str] = Field(default=None, description="Agent ID for multi-database queries")
     database_id: Optional[str] = Field(default=None, description="Specific database to query (overrides auto-routing)")
+    intent: Optional[str] = Field(default=None, description="Known intent type; skips intent analysis")
 
 
 class QueryResponse(BaseModel):
@@ -34,51 +35,73 @@ _query_history: list[dict] = []
 
 
 def _get_llm():
-    """Get configured LLM instance"""
+    """Get configured LLM instance, shared by all requests with the same config"""
     from config import config
+    from agents.multi_db_supervisor import get_cached_llm
     
-    if config.llm.provider == "openai":
-        from langchain_openai import ChatOpenAI
-        return ChatOpenAI(
-            model=config.llm.model,
-            temperature=config.llm.temperature,
-            api_key=config.llm.api_key
-        )
-    elif config.llm.provider == "gemini":
-        from langchain_google_genai import ChatGoogleGenerativeAI
-        return ChatGoogleGenerativeAI(
-            model=config.llm.model,
-            temperature=config.llm.temperature,
-            google_api_key=config.llm.api_key
-        )
-    else:
-        # Default to OpenAI
-        from langchain_openai import ChatOpenAI
-        return ChatOpenAI(model="gpt-3.5-turbo", temperature=0)
+    # One client per config, so agents shared per LLM (intent agents,
+    # batch coalescers) are reused across requests instead of rebuilt
+    return get_cached_llm(
+        config.llm.provider,
+        config.llm.model,
+        config.llm.temperature,
+        config.llm.api_key
+    )
+
+
+# Long-lived agents, so their caches and batch coalescers are shared by requests
+_supervisor = None
+_sql_writers: dict[tuple, Any] = {}
 
 
 def _get_supervisor():
-    """Get configured supervisor agent"""
+    """Get configured supervisor agent, rebuilt only when the LLM or database changes"""
+    global _supervisor
+    from config import config
     from agents import SupervisorAgent
     from database import get_database
     from rag.vector_store import get_vector_store
-    from rag.schema_manager import SchemaManager
-    from rag.semantic_layer import SemanticLayer
+    from rag.schema_manager import get_schema_manager
+    from rag.semantic_layer import get_semantic_layer
     
     llm = _get_llm()
     db = get_database()
-    vector_store = get_vector_store()
-    schema_manager = SchemaManager()
-    semantic_layer = SemanticLayer()
+    if _supervisor is not None and _supervisor.llm is llm and _supervisor.db_connector is db:
+        return _supervisor
     
-    return SupervisorAgent(
+    _supervisor = SupervisorAgent(
         llm=llm,
         db_connector=db,
         db_type=config.database.db_type if hasattr(config.database, 'db_type') else "sqlite",  # Pass db_type
-        schema_manager=schema_manager,
-        semantic_layer=semantic_layer,
-        vector_store=vector_store
+        schema_manager=get_schema_manager(),
+        semantic_layer=get_semantic_layer(),
+        vector_store=get_vector_store()
     )
+    return _supervisor
+
+
+def _get_sql_writer(db_type: str, db=None):
+    """Get a shared SQL writer for this dialect and connector"""
+    from agents import SQLWriterAgent
+    from rag.schema_manager import get_schema_manager
+    from rag.semantic_layer import get_semantic_layer
+    from rag.vector_store import get_vector_store
+    
+    llm = _get_llm()
+    key = (db_type, id(db))
+    writer = _sql_writers.get(key)
+    # The writer holds its connector, so a matching id is the same object
+    if writer is None or writer.llm is not llm or writer.db_connector is not db:
+        writer = SQLWriterAgent(
+            llm=llm,
+            schema_manager=get_schema_manager(),
+            semantic_layer=get_semantic_layer(),
+            vector_store=get_vector_store(),
+            db_connector=db,
+            db_type=db_type
+        )
+        _sql_writers[key] = writer
+    return writer
 
 
 @router.post("/query", response_model=QueryResponse)
@@ -92,19 +115,24 @@ async def process_query(request: QueryRequest):
     try:
         database_used = None
         
+        from agents import SupervisorAgent
+        if request.intent and request.intent not in SupervisorAgent.INTENT_GENERATORS:
+            raise HTTPException(status_code=400, detail=f"Unknown intent: {request.intent}")
+        
         # Check if using a multi-database agent
         if request.agent_id:
             from models import get_agent_repository
-            from agents import MultiDatabaseSupervisor
+            from agents.multi_db_supervisor import get_agent_supervisor
             
             repo = get_agent_repository()
             if repo:
                 agent = await repo.get_by_id(request.agent_id)
                 if agent:
-                    supervisor = MultiDatabaseSupervisor(agent)
+                    supervisor = await get_agent_supervisor(agent)
                     result = await supervisor.process_query(
                         question=request.question,
-                        database_id=request.database_id
+                        database_id=request.database_id,
+                        intent_hint=request.intent
                     )
                     
                     # Extract database info from result
@@ -117,7 +145,7 @@ async def process_query(request: QueryRequest):
         else:
             # Use default supervisor (backward compatible)
             supervisor = _get_supervisor()
-            result = await supervisor.process_query(request.question)
+            result = await supervisor.process_query(request.question, intent_hint=request.intent)
         
         response = QueryResponse(
             success=result.success,
@@ -153,18 +181,8 @@ async def generate_sql_only(request: QueryRequest):
     Generate SQL without executing - useful for review before execution
     """
     try:
-        from agents import SQLWriterAgent
-        from rag.schema_manager import SchemaManager
-        from rag.semantic_layer import SemanticLayer
-        from rag.vector_store import get_vector_store
-        
-        llm = _get_llm()
-        sql_writer = SQLWriterAgent(
-            llm=llm,
-            schema_manager=SchemaManager(),
-            semantic_layer=SemanticLayer(),
-            vector_store=get_vector_store(),
-            db_type=request.database_id if request.database_id else "sqlite"  # Best effort guess or default
+        sql_writer = _get_sql_writer(
+            request.database_id if request.database_id else "sqlite"  # Best effort guess or default
         )
         
         result = await sql_writer.generate_sql(request.question)
@@ -188,27 +206,15 @@ async def query_with_context(request: QueryRequest):
     Like FINCH diagram: table, column, value, rules info
     """
     try:
-        from agents import SQLWriterAgent
-        from rag.schema_manager import SchemaManager
-        from rag.semantic_layer import SemanticLayer
-        from rag.vector_store import get_vector_store
         from database import get_database
         
-        llm = _get_llm()
         db = get_database()
         # Try to determine type
         db_type = "sqlite"
         if hasattr(db, 'db_type'):
             db_type = db.db_type
             
-        sql_writer = SQLWriterAgent(
-            llm=llm,
-            schema_manager=SchemaManager(),
-            semantic_layer=SemanticLayer(),
-            vector_store=get_vector_store(),
-            db_connector=db,
-            db_type=db_type
-        )
+        sql_writer = _get_sql_writer(db_type, db)
         
         result = await sql_writer.generate_and_execute(request.question)
         
@@ -232,9 +238,9 @@ async def find_column(term: str):
     Direct access to Column Finder Tool
     """
     from agents.tools import ColumnFinderTool
-    from rag.semantic_layer import SemanticLayer
+    from rag.semantic_layer import get_semantic_layer
     
-    tool = ColumnFinderTool(semantic_layer=SemanticLayer())
+    tool = ColumnFinderTool(semantic_layer=get_semantic_layer())
     results = tool._run(term)
     return {"term": term, "matches": results}
 
@@ -245,9 +251,9 @@ async def find_value(alias: str):
     Direct access to Value Finder Tool
     """
     from agents.tools import ValueFinderTool
-    from rag.semantic_layer import SemanticLayer
+    from rag.semantic_layer import get_semantic_layer
     
-    tool = ValueFinderTool(semantic_layer=SemanticLayer())
+    tool = ValueFinderTool(semantic_layer=get_semantic_layer())
     result = tool._run(alias)
     return result
 
@@ -304,7 +310,7 @@ async def query_stream(websocket: WebSocket):
     try:
         while True:
             data = await websocket.receive_text()
-            request = json.loads(data)
+            request = orjson.loads(data)
             question = request.get("question", "")
             
             if not question:
@@ -321,10 +327,13 @@ async def query_stream(websocket: WebSocket):
                 await websocket.send_json({"status": "processing", "step": "generating_sql"})
                 result = await supervisor.process_query(question)
                 
-                await websocket.send_json({
-                    "status": "complete",
-                    "result": result.to_dict()
-                })
+                # Results carry rows straight from the driver (dates, decimals),
+                # which orjson serializes faster and stdlib json rejects
+                await websocket.send_text(orjson.dumps(
+                    {"status": "complete", "result": result.to_dict()},
+                    default=str,
+                    option=orjson.OPT_NON_STR_KEYS
+                ).decode())
                 
             except Exception as e:
                 await websocket.send_json({"status": "error", "error": str(e)})
@@ -126,6 +126,17 @@ class VectorStoreConfig:
     persist_directory: str = "./data/chroma"
     collection_name: str = "sql_examples"
     embedding_model: str = "all-MiniLM-L6-v2"
+    # "onnx" runs the int8-quantized ONNX export below, "torch" the FP32 model
+    embedding_backend: str = "onnx"
+    embedding_onnx_file: str = "onnx/model_qint8_avx512_vnni.onnx"
+
+
+@dataclass
+class ResultCacheConfig:
+    """Short-lived cache of full query responses per (agent, database, question)"""
+    enabled: bool = True
+    ttl_seconds: float = 60.0
+    max_size: int = 512
 
 
 @dataclass
@@ -145,6 +156,7 @@ class Config:
     elasticsearch: ElasticsearchConfig = field(default_factory=ElasticsearchConfig)
     opensearch: OpenSearchConfig = field(default_factory=OpenSearchConfig)
     vector_store: VectorStoreConfig = field(default_factory=VectorStoreConfig)
+    result_cache: ResultCacheConfig = field(default_factory=ResultCacheConfig)
     api: APIConfig = field(default_factory=APIConfig)
     
     # Paths
@@ -205,6 +217,15 @@ def load_config_from_env():
     config.opensearch.aws_region = os.getenv("OS_AWS_REGION", config.opensearch.aws_region)
     config.opensearch.aws_service = os.getenv("OS_AWS_SERVICE", config.opensearch.aws_service)
     
+    # Embedding model
+    config.vector_store.embedding_backend = os.getenv("EMBEDDING_BACKEND", config.vector_store.embedding_backend)
+    config.vector_store.embedding_onnx_file = os.getenv("EMBEDDING_ONNX_FILE", config.vector_store.embedding_onnx_file)
+    
+    # Result Cache Config
+    config.result_cache.enabled = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+    config.result_cache.ttl_seconds = float(os.getenv("RESULT_CACHE_TTL", str(config.result_cache.ttl_seconds)))
+    config.result_cache.max_size = int(os.getenv("RESULT_CACHE_MAX_SIZE", str(config.result_cache.max_size)))
+    
     return config
 
 
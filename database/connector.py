@@ -2,7 +2,7 @@
 Database Connector - Handles database connections and query execution
 """
 import asyncio
-from typing import Any, Optional
+from typing import Any, AsyncIterator, Optional
 from dataclasses import dataclass
 import aiosqlite
 from pathlib import Path
@@ -71,6 +71,31 @@ class DatabaseConnector:
         except Exception as e:
             raise Exception(f"Query execution failed: {str(e)}")
     
+    async def execute_stream(
+        self,
+        sql: str,
+        params: tuple = (),
+        batch_size: int = 500
+    ) -> AsyncIterator[tuple[list[str], list[list[Any]]]]:
+        """
+        Execute SQL query and yield (columns, rows) in batches
+        
+        Rows are fetched from the cursor as they are consumed, so callers that
+        stop early never pull the rest of the result set into memory.
+        """
+        await self.connect()
+        
+        try:
+            async with self._connection.execute(sql, params) as cursor:
+                columns = [desc[0] for desc in cursor.description] if cursor.description else []
+                while True:
+                    rows = await cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield columns, [list(row) for row in rows]
+        except Exception as e:
+            raise Exception(f"Query execution failed: {str(e)}")
+    
     async def execute_many(self, sql: str, params_list: list[tuple]) -> int:
         """Execute SQL with multiple parameter sets"""
         await self.connect()
@@ -46,6 +46,9 @@ class ElasticsearchConnector:
     
     async def connect(self):
         """Create Elasticsearch client"""
+        if self._client is not None:
+            return
+        
         if self.use_opensearch:
             await self._connect_opensearch()
         else:
@@ -53,6 +53,9 @@ class OpenSearchConnector:
     
     async def connect(self):
         """Create OpenSearch async client"""
+        if self._client is not None:
+            return
+        
         try:
             from opensearchpy import AsyncOpenSearch
             
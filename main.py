@@ -3,8 +3,10 @@ AI Query Agent - Main Entry Point
 Natural Language to SQL conversion powered by LLM
 """
 import os
+import logging
 import uvicorn
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
@@ -13,6 +15,11 @@ from dotenv import load_dotenv
 # Load env vars immediately
 load_dotenv()
 
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
+
 from config import config, load_config_from_env
 
 
@@ -30,6 +37,10 @@ async def lifespan(app: FastAPI):
     await init_database()
     init_vector_store()
     
+    # Compile analytics kernels before the first request
+    from agents.analytics import warmup
+    warmup()
+    
     # Initialize agent repository
     try:
         from models import init_agent_repository
@@ -50,6 +61,9 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     print("Shutting down AI Query Agent...")
+    from agents.multi_db_supervisor import close_agent_supervisors, close_search_connectors
+    await close_agent_supervisors()
+    await close_search_connectors()
 
 
 # Create FastAPI app
@@ -57,7 +71,9 @@ app = FastAPI(
     title="AI Query Agent",
     description="Natural Language to SQL conversion powered by LLM - Inspired by Uber FINCH",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    # Query responses carry result rows and agent context; orjson encodes them faster
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
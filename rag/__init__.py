@@ -2,12 +2,14 @@
 AI Query Agent - RAG Package
 """
 from .vector_store import VectorStore, init_vector_store
-from .schema_manager import SchemaManager
-from .semantic_layer import SemanticLayer
+from .schema_manager import SchemaManager, get_schema_manager
+from .semantic_layer import SemanticLayer, get_semantic_layer
 
 __all__ = [
     "VectorStore",
     "init_vector_store",
     "SchemaManager",
-    "SemanticLayer"
+    "get_schema_manager",
+    "SemanticLayer",
+    "get_semantic_layer"
 ]
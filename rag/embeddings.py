@@ -0,0 +1,53 @@
+"""
+Embedding Model - One shared sentence embedder for search, caching and memory
+Loads the int8-quantized ONNX export when available, FP32 otherwise
+"""
+import logging
+import threading
+from typing import Any, Optional
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+_model: Optional[Any] = None
+_loaded = False
+_lock = threading.Lock()
+
+
+def _load_model() -> Optional[Any]:
+    """Load the configured embedding model, falling back to FP32"""
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        logger.warning("sentence-transformers not found. Vector search disabled.")
+        return None
+    
+    settings = config.vector_store
+    if settings.embedding_backend == "onnx":
+        try:
+            # Needs sentence-transformers>=3.2 with onnxruntime/optimum installed
+            return SentenceTransformer(
+                settings.embedding_model,
+                backend="onnx",
+                model_kwargs={"file_name": settings.embedding_onnx_file}
+            )
+        except Exception as e:
+            logger.warning("Quantized embedding model unavailable, using FP32: %s", e)
+    
+    try:
+        return SentenceTransformer(settings.embedding_model)
+    except Exception as e:
+        logger.warning("Failed to load embedding model: %s", e)
+        return None
+
+
+def get_embedding_model() -> Optional[Any]:
+    """Get or load the shared embedding model (None when unavailable)"""
+    global _model, _loaded
+    if not _loaded:
+        with _lock:
+            if not _loaded:
+                _model = _load_model()
+                _loaded = True
+    return _model
@@ -6,12 +6,7 @@ import json
 from opensearchpy import OpenSearch, RequestsHttpConnection, AWSV4SignerAuth
 import boto3
 from config import config
-try:
-    from sentence_transformers import SentenceTransformer
-    HAS_EMBEDDINGS = True
-except ImportError:
-    HAS_EMBEDDINGS = False
-    print("Warning: sentence-transformers not found. Vector search disabled.")
+from .embeddings import get_embedding_model
 
 class OpenSearchStore:
     """
@@ -26,13 +21,8 @@ class OpenSearchStore:
             "semantic_terms": "semantic_terms"
         }
         
-        # Initialize embedding model if available
-        self.embedding_model = None
-        if HAS_EMBEDDINGS:
-            try:
-                self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-            except Exception as e:
-                print(f"Failed to load embedding model: {e}")
+        # Shared embedding model (int8 ONNX when available), None if unavailable
+        self.embedding_model = get_embedding_model()
 
         self._ensure_indices()
 
@@ -234,7 +224,60 @@ class OpenSearchStore:
 
     def search_definitions(self, query: str, k: int = 3, agent_id: Optional[str] = None) -> List[Dict]:
         """Search for definitions using Hybrid Search (Vector + Keyword)"""
+        query_vector = None
+        if self.embedding_model and query != "*":
+            try:
+                query_vector = self.embedding_model.encode(query).tolist()
+            except Exception as e:
+                print(f"Error encoding query: {e}")
+
+        body = self._definitions_query(query, query_vector, k, agent_id)
         
+        try:
+            response = self.client.search(index=self.indices["semantic_definitions"], body=body)
+            return self._definition_hits(response)
+        except Exception as e:
+            print(f"Search failed: {e}")
+            return []
+
+    def search_definitions_batch(self, queries: List[str], k: int = 3, agent_id: Optional[str] = None) -> List[List[Dict]]:
+        """Search definitions for many queries with one encode call and one msearch request"""
+        if not queries:
+            return []
+
+        # Encode all queries in a single model call
+        vectors = [None] * len(queries)
+        to_encode = [i for i, q in enumerate(queries) if q != "*"]
+        if self.embedding_model and to_encode:
+            try:
+                encoded = self.embedding_model.encode([queries[i] for i in to_encode])
+                for i, vector in zip(to_encode, encoded):
+                    vectors[i] = vector.tolist()
+            except Exception as e:
+                print(f"Error encoding queries: {e}")
+
+        body = ""
+        header = json.dumps({"index": self.indices["semantic_definitions"]})
+        for query, vector in zip(queries, vectors):
+            body += header + "\n" + json.dumps(self._definitions_query(query, vector, k, agent_id)) + "\n"
+
+        try:
+            response = self.client.msearch(body=body)
+        except Exception as e:
+            print(f"Batch search failed: {e}")
+            return [[] for _ in queries]
+
+        results = []
+        for item in response["responses"]:
+            if "error" in item:
+                print(f"Search failed: {item['error']}")
+                results.append([])
+            else:
+                results.append(self._definition_hits(item))
+        return results
+
+    def _definitions_query(self, query: str, query_vector: Optional[List[float]], k: int, agent_id: Optional[str]) -> Dict:
+        """Build the hybrid definitions search body"""
         # 1. Keyword Query (Base)
         if query == "*":
              keyword_query = {"match_all": {}}
@@ -249,19 +292,15 @@ class OpenSearchStore:
 
         # 2. Vector Query (KNN)
         vector_query = None
-        if self.embedding_model and query != "*":
-            try:
-                query_vector = self.embedding_model.encode(query).tolist()
-                vector_query = {
-                    "knn": {
-                        "embedding": {
-                            "vector": query_vector,
-                            "k": k
-                        }
+        if query_vector is not None:
+            vector_query = {
+                "knn": {
+                    "embedding": {
+                        "vector": query_vector,
+                        "k": k
                     }
                 }
-            except Exception as e:
-                print(f"Error encoding query: {e}")
+            }
 
         # 3. Filter Context
         filters = []
@@ -289,7 +328,7 @@ class OpenSearchStore:
         else:
             must_clause = [keyword_query]
 
-        body = {
+        return {
             "size": k,
             "query": {
                 "bool": {
@@ -298,24 +337,20 @@ class OpenSearchStore:
                 }
             }
         }
-        
-        try:
-            response = self.client.search(index=self.indices["semantic_definitions"], body=body)
-            
-            results = []
-            for hit in response["hits"]["hits"]:
-                source = hit["_source"]
-                results.append({
-                    "question": source.get("text"),
-                    "sql": source.get("name"),
-                    "type": source.get("type"),
-                    "score": hit["_score"],
-                    "obj": None
-                })
-            return results
-        except Exception as e:
-            print(f"Search failed: {e}")
-            return []
+
+    def _definition_hits(self, response: Dict) -> List[Dict]:
+        """Convert a definitions search response to result dicts"""
+        results = []
+        for hit in response["hits"]["hits"]:
+            source = hit["_source"]
+            results.append({
+                "question": source.get("text"),
+                "sql": source.get("name"),
+                "type": source.get("type"),
+                "score": hit["_score"],
+                "obj": None
+            })
+        return results
 
     def search_similar(self, question: str, k: int = 3, agent_id: Optional[str] = None) -> List[Dict]:
         """Search for similar SQL examples (Hybrid)"""
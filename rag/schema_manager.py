@@ -1,7 +1,7 @@
 """
 Schema Manager - Manages database schema metadata for SQL generation
 """
-from typing import Optional
+from typing import Iterable, Optional
 from dataclasses import dataclass, field
 
 
@@ -38,6 +38,8 @@ class SchemaManager:
     def __init__(self, db_connector=None):
         self.db_connector = db_connector
         self.tables: dict[str, TableInfo] = {}
+        # Bumped whenever tables change, so consumers can cache derived text
+        self.version = 0
         
         # Load default E-commerce schema
         self._load_default_schema()
@@ -138,12 +140,22 @@ class SchemaManager:
                 name=table_name,
                 columns=column_infos
             )
+        
+        self.version += 1
     
-    def get_schema_description(self) -> str:
-        """Generate human-readable schema description for LLM"""
+    def get_schema_description(self, tables: Optional[Iterable[str]] = None) -> str:
+        """
+        Generate human-readable schema description for LLM
+        
+        When tables are given, only those and the tables one foreign key away
+        are described; with no known table among them, the full schema is.
+        """
+        selected = self.get_related_tables(tables) if tables is not None else None
         lines = ["## Database Schema\n"]
         
         for table_name, table in self.tables.items():
+            if selected and table_name not in selected:
+                continue
             lines.append(f"### Table: {table_name}")
             if table.description:
                 lines.append(f"Description: {table.description}")
@@ -159,6 +171,21 @@ class SchemaManager:
         
         return "\n".join(lines)
     
+    def get_related_tables(self, tables: Iterable[str]) -> set[str]:
+        """Known tables among the given ones, plus tables joined to them by a foreign key"""
+        selected = {t for t in tables if t in self.tables}
+        related = set(selected)
+        for table_name, table in self.tables.items():
+            for col in table.columns:
+                if not col.foreign_key:
+                    continue
+                target = col.foreign_key.split(".", 1)[0]
+                if table_name in selected and target in self.tables:
+                    related.add(target)
+                elif target in selected:
+                    related.add(table_name)
+        return related
+    
     def get_table_names(self) -> list[str]:
         """Get list of all table names"""
         return list(self.tables.keys())
@@ -173,3 +200,15 @@ class SchemaManager:
         if table:
             return [col.name for col in table.columns]
         return []
+
+
+# Global schema manager, shared by request handlers so derived indexes survive
+_schema_manager: Optional[SchemaManager] = None
+
+
+def get_schema_manager() -> SchemaManager:
+    """Get or create the global schema manager"""
+    global _schema_manager
+    if _schema_manager is None:
+        _schema_manager = SchemaManager()
+    return _schema_manager
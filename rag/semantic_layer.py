@@ -67,6 +67,8 @@ class SemanticLayer:
     
     def __init__(self, mappings_file: Optional[str] = None, agent_id: Optional[str] = None):
         self.agent_id = agent_id
+        # Bumped on every definition change, so consumers can cache derived text
+        self.version = 0
         self.entities: Dict[str, SemanticEntity] = {}
         self.metrics: Dict[str, SemanticMetric] = {}
         self.relationships: List[SemanticRelationship] = []
@@ -120,7 +122,15 @@ class SemanticLayer:
     def search_definitions(self, query: str, k: int = 3) -> List[Dict]:
         """Search for relevant semantic definitions using vector store"""
         results = self.vector_store.search_definitions(query, k=k, agent_id=self.agent_id)
-        # Enrich results with actual objects
+        return self._enrich_definitions(results)
+
+    def search_definitions_batch(self, queries: List[str], k: int = 3) -> List[List[Dict]]:
+        """Search definitions for many queries in one vector store round trip"""
+        batches = self.vector_store.search_definitions_batch(queries, k=k, agent_id=self.agent_id)
+        return [self._enrich_definitions(results) for results in batches]
+
+    def _enrich_definitions(self, results: List[Dict]) -> List[Dict]:
+        """Enrich vector store results with actual objects"""
         enriched = []
         for res in results:
             name = res.get('sql') # We stored name in 'sql' field for reuse
@@ -238,12 +248,30 @@ class SemanticLayer:
         self._entity_map[entity.name.lower()] = entity
         for syn in entity.synonyms:
             self._entity_map[syn.lower()] = entity
+        self.version += 1
 
     def add_metric(self, metric: SemanticMetric):
         self.metrics[metric.name] = metric
+        self.version += 1
 
     def add_relationship(self, rel: SemanticRelationship):
         self.relationships.append(rel)
+        self.version += 1
+
+    def get_all_aliases(self) -> List[str]:
+        """All business names and synonyms known to the layer"""
+        aliases = []
+        for e in self.entities.values():
+            aliases.append(e.name)
+            aliases.extend(e.synonyms)
+        for m in self.metrics.values():
+            aliases.append(m.name)
+            aliases.extend(m.synonyms)
+        for t in self.term_mappings:
+            aliases.append(t.term)
+            aliases.extend(t.synonyms)
+        aliases.extend(v.alias for v in self.value_mappings)
+        return aliases
 
     def find_entity(self, term: str) -> Optional[SemanticEntity]:
         return self._entity_map.get(term.lower())
@@ -352,3 +380,16 @@ class SemanticLayer:
             
         self.term_mappings = [TermMapping(**m) for m in data.get("term_mappings", [])]
         self.value_mappings = [ValueMapping(**m) for m in data.get("value_mappings", [])]
+        self.version += 1
+
+
+# Global semantic layer, shared by request handlers so derived indexes survive
+_semantic_layer: Optional[SemanticLayer] = None
+
+
+def get_semantic_layer() -> SemanticLayer:
+    """Get or create the global (system-level) semantic layer"""
+    global _semantic_layer
+    if _semantic_layer is None:
+        _semantic_layer = SemanticLayer()
+    return _semantic_layer
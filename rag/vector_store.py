@@ -21,6 +21,8 @@ class VectorStore:
     def __init__(self, persist_directory: str = "./data/chroma", collection_name: str = "sql_examples"):
         self.persist_directory = Path(persist_directory)
         self.persist_directory.mkdir(parents=True, exist_ok=True)
+        # Bumped whenever the examples change, so callers can cache search results
+        self.version = 0
         
         # Initialize ChromaDB
         self.client = chromadb.PersistentClient(
@@ -82,6 +84,7 @@ class VectorStore:
             metadatas=metadatas,
             ids=ids
         )
+        self.version += 1
     
     def search_similar(self, question: str, k: int = 3) -> list[dict]:
         """Search for similar SQL examples"""
@@ -121,6 +124,7 @@ class VectorStore:
             name=self.collection.name,
             metadata={"description": "SQL examples for few-shot learning"}
         )
+        self.version += 1
 
 
 
@@ -2,14 +2,18 @@
 AI Query Agent - Services Package
 Enterprise-grade services for production deployment
 """
-from .ai_gateway import AIGateway
+from .ai_gateway import AIGateway, BatchCoalescer, LaneScheduler
 from .memory import ConversationMemory
 from .feedback import FeedbackService
 from .cache import QueryCache
+from .semantic_cache import SemanticCache
 
 __all__ = [
     "AIGateway",
+    "BatchCoalescer",
+    "LaneScheduler",
     "ConversationMemory",
     "FeedbackService",
-    "QueryCache"
+    "QueryCache",
+    "SemanticCache"
 ]
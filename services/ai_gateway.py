@@ -5,7 +5,10 @@ Inspired by Uber FINCH's Generative AI Gateway
 from typing import Optional, Any, Callable
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+from collections import deque
+from contextlib import asynccontextmanager
 import asyncio
+import weakref
 import hashlib
 import json
 import time
@@ -38,7 +41,7 @@ class GatewayConfig:
     track_usage: bool = True
 
 
-@dataclass
+@dataclass(slots=True)
 class UsageRecord:
     """Track LLM usage"""
     timestamp: datetime
@@ -148,6 +151,188 @@ class ResponseCache:
         self._access_order.clear()
 
 
+class LaneScheduler:
+    """
+    Shared LLM batch slots with short and long priority lanes
+    
+    At most `max_batches` batches run at once. When a slot frees up, waiting
+    short-prompt batches (intent classification) go first, but after
+    `short_per_long` short grants in a row a waiting long-prompt batch
+    (SQL/report/insight) gets the slot, so neither lane starves.
+    
+    One scheduler per event loop - see get_lane_scheduler().
+    """
+    
+    LANES = ("short", "long")
+    
+    def __init__(self, max_batches: int = 4, short_per_long: int = 4):
+        self.max_batches = max_batches
+        self.short_per_long = short_per_long
+        self._active = 0
+        self._waiters: dict[str, deque[asyncio.Future]] = {lane: deque() for lane in self.LANES}
+        self._short_streak = 0
+    
+    @asynccontextmanager
+    async def slot(self, lane: str):
+        """Hold one batch slot in the given lane"""
+        if self._active < self.max_batches and not any(self._waiters.values()):
+            self._active += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._waiters[lane].append(future)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    self._release()  # Slot was handed over as we were cancelled
+                else:
+                    self._waiters[lane].remove(future)
+                raise
+        try:
+            yield
+        finally:
+            self._release()
+    
+    def _release(self):
+        """Hand the slot to the next waiter, or free it"""
+        waiter = self._next_waiter()
+        if waiter is not None:
+            waiter.set_result(None)
+        else:
+            self._active -= 1
+    
+    def _next_waiter(self) -> Optional[asyncio.Future]:
+        """Pick the next waiting batch: short first, long every short_per_long grants"""
+        short, long = self._waiters["short"], self._waiters["long"]
+        if long and (not short or self._short_streak >= self.short_per_long):
+            self._short_streak = 0
+            return long.popleft()
+        if short:
+            self._short_streak += 1
+            return short.popleft()
+        return None
+
+
+_schedulers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, LaneScheduler]" = weakref.WeakKeyDictionary()
+
+
+def get_lane_scheduler() -> LaneScheduler:
+    """Get the lane scheduler for the running event loop"""
+    loop = asyncio.get_running_loop()
+    scheduler = _schedulers.get(loop)
+    if scheduler is None:
+        scheduler = _schedulers[loop] = LaneScheduler()
+    return scheduler
+
+
+class BatchCoalescer:
+    """
+    Merge concurrent calls to a runnable into one batched call
+    
+    Calls arriving within `max_wait_ms` of each other (or until
+    `max_batch_size` are waiting) go out as a single `abatch`, and each
+    caller gets its own result or exception back.
+    
+    Batches run in a LaneScheduler lane: "short" for small, latency-critical
+    prompts, "long" for large ones, or None to skip scheduling.
+    
+    Usage:
+        coalescer = BatchCoalescer(prompt | llm | parser, lane="short")
+        result = await coalescer.ainvoke({"question": "..."})
+    """
+    
+    def __init__(
+        self,
+        runnable,
+        max_batch_size: int = 16,
+        max_wait_ms: float = 20.0,
+        max_concurrency: int = 8,
+        lane: Optional[str] = "long"
+    ):
+        self.runnable = runnable
+        self.lane = lane
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_ms / 1000
+        self.max_concurrency = max_concurrency
+        self._pending: list[tuple[Any, asyncio.Future]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+        
+        # Metrics
+        self.requests = 0
+        self.batches = 0
+    
+    async def ainvoke(self, input: Any) -> Any:
+        """Queue an input for the next batch and wait for its result"""
+        loop = asyncio.get_running_loop()
+        if self._pending and loop is not self._loop:
+            # Futures can't cross event loops, so don't join another loop's batch
+            return await self.runnable.ainvoke(input)
+        
+        self._loop = loop
+        future = loop.create_future()
+        self._pending.append((input, future))
+        self.requests += 1
+        
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_seconds, self._flush)
+        return await future
+    
+    def _flush(self):
+        """Send everything queued so far as one batch"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        
+        batch, self._pending = self._pending, []
+        self.batches += 1
+        task = self._loop.create_task(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _run_batch(self, batch: list[tuple[Any, asyncio.Future]]):
+        """Run one batch and resolve each caller's future"""
+        try:
+            if self.lane is None:
+                outputs = await self._abatch(batch)
+            else:
+                async with get_lane_scheduler().slot(self.lane):
+                    outputs = await self._abatch(batch)
+        except Exception as e:
+            outputs = [e] * len(batch)
+        
+        for (_, future), output in zip(batch, outputs):
+            if future.done():  # Caller was cancelled
+                continue
+            if isinstance(output, Exception):
+                future.set_exception(output)
+            else:
+                future.set_result(output)
+    
+    async def _abatch(self, batch: list[tuple[Any, asyncio.Future]]) -> list:
+        """Send the batch's inputs to the runnable"""
+        return await self.runnable.abatch(
+            [input for input, _ in batch],
+            config={"max_concurrency": self.max_concurrency},
+            return_exceptions=True
+        )
+    
+    def get_stats(self) -> dict:
+        """Batching statistics"""
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "avg_batch_size": self.requests / self.batches if self.batches else 0,
+            # Share of requests that rode along in someone else's batch
+            "merge_rate": 1 - self.batches / self.requests if self.requests else 0
+        }
+
+
 class AIGateway:
     """
     AI Gateway - Enterprise LLM Interface
@@ -4,11 +4,12 @@ Query Cache - Fast response for repeated queries
 from typing import Optional, Any
 from dataclasses import dataclass
 from datetime import datetime
+from collections import OrderedDict
 import hashlib
 import time
 
 
-@dataclass
+@dataclass(slots=True)
 class CacheEntry:
     """A cached query result"""
     question: str
@@ -25,28 +26,53 @@ class QueryCache:
     Features:
     - Cache SQL query results
     - TTL-based expiration
-    - LRU eviction
+    - LRU eviction (O(1))
+    - Exact-match hash lookup before any embedding work
     - Fuzzy matching for similar queries
+    - Semantic matching on question embeddings (paraphrases)
+    - Scoped entries: a scope (e.g. one database) only sees its own results
     """
     
-    def __init__(self, max_size: int = 500, ttl_seconds: int = 1800):
+    # Scopes with their own paraphrase index, least recently used dropped
+    MAX_SEMANTIC_SCOPES = 64
+    
+    def __init__(self, max_size: int = 500, ttl_seconds: int = 1800,
+                 similarity_threshold: float = 0.95):
         self.max_size = max_size
         self.ttl_seconds = ttl_seconds
-        self._cache: dict[str, CacheEntry] = {}
+        # Paraphrases replay query results without any check, so be strict
+        self.similarity_threshold = similarity_threshold
+        self._cache: OrderedDict[bytes, CacheEntry] = OrderedDict()
+        # Scope -> index of question embedding -> cache key, created on first embedded entry
+        self._semantic: OrderedDict[str, Any] = OrderedDict()
     
     def _normalize_question(self, question: str) -> str:
-        """Normalize question for matching"""
-        return question.lower().strip()
+        """Normalize question for matching - case and whitespace insensitive"""
+        return " ".join(question.lower().split())
     
-    def _hash_key(self, question: str) -> str:
+    def _hash_key(self, question: str, scope: str = "") -> bytes:
         """Generate cache key"""
         normalized = self._normalize_question(question)
-        return hashlib.md5(normalized.encode()).hexdigest()[:16]
+        return hashlib.blake2b(f"{scope}\0{normalized}".encode(), digest_size=16).digest()
     
-    def get(self, question: str) -> Optional[dict]:
+    def get(self, question: str, scope: str = "") -> Optional[dict]:
         """Get cached result"""
-        key = self._hash_key(question)
+        return self._get_entry(self._hash_key(question, scope))
+    
+    def get_similar(self, embedding, scope: str = "") -> Optional[dict]:
+        """Get the cached result of the most similar question (normalized embedding)"""
+        index = self._semantic.get(scope)
+        if index is None:
+            return None
         
+        self._semantic.move_to_end(scope)
+        hit = index.lookup(embedding)
+        if hit is None or hit[0] < self.similarity_threshold:
+            return None
+        return self._get_entry(hit[1])
+    
+    def _get_entry(self, key: bytes) -> Optional[dict]:
+        """Get a live entry by key, counting the hit"""
         if key in self._cache:
             entry = self._cache[key]
             
@@ -55,6 +81,7 @@ class QueryCache:
                 del self._cache[key]
                 return None
             
+            self._cache.move_to_end(key)
             entry.hit_count += 1
             return {
                 "sql": entry.sql,
@@ -64,31 +91,40 @@ class QueryCache:
         
         return None
     
-    def set(self, question: str, sql: str, result: dict):
-        """Cache a result"""
-        # Evict if needed
-        while len(self._cache) >= self.max_size:
-            # Remove oldest entry
-            oldest_key = min(self._cache.keys(), key=lambda k: self._cache[k].created_at)
-            del self._cache[oldest_key]
-        
-        key = self._hash_key(question)
+    def set(self, question: str, sql: str, result: dict, embedding=None, scope: str = ""):
+        """Cache a result, optionally indexed by its question embedding"""
+        key = self._hash_key(question, scope)
         self._cache[key] = CacheEntry(
             question=question,
             sql=sql,
             result=result,
             created_at=time.time()
         )
+        self._cache.move_to_end(key)
+        
+        # Evict least recently used
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+        
+        # Evicted or expired keys left in the index simply miss in _get_entry
+        if embedding is not None:
+            index = self._semantic.get(scope)
+            if index is None:
+                from .semantic_cache import SemanticCache
+                index = self._semantic[scope] = SemanticCache(max_size=self.max_size)
+                while len(self._semantic) > self.MAX_SEMANTIC_SCOPES:
+                    self._semantic.popitem(last=False)
+            self._semantic.move_to_end(scope)
+            index.add(embedding, key)
     
-    def invalidate(self, question: str):
+    def invalidate(self, question: str, scope: str = ""):
         """Invalidate cache entry"""
-        key = self._hash_key(question)
-        if key in self._cache:
-            del self._cache[key]
+        self._cache.pop(self._hash_key(question, scope), None)
     
     def clear(self):
         """Clear all cache"""
         self._cache.clear()
+        self._semantic.clear()
     
     def get_stats(self) -> dict:
         """Get cache statistics"""
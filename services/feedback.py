@@ -9,7 +9,7 @@ import json
 from pathlib import Path
 
 
-@dataclass
+@dataclass(slots=True)
 class FeedbackRecord:
     """A feedback record for learning"""
     question: str
@@ -10,13 +10,15 @@ import json
 import hashlib
 
 
-@dataclass
+@dataclass(slots=True)
 class Message:
     """A single message in conversation"""
     role: str  # "user" or "assistant"
     content: str
     timestamp: datetime = field(default_factory=datetime.now)
     metadata: dict = field(default_factory=dict)
+    # Normalized question embedding, for retrieving related turns
+    embedding: Any = field(default=None, repr=False, compare=False)
     
     def to_dict(self) -> dict:
         return {
@@ -74,7 +76,8 @@ class ConversationMemory:
         role: str,
         content: str,
         session_id: Optional[str] = None,
-        metadata: Optional[dict] = None
+        metadata: Optional[dict] = None,
+        embedding: Any = None
     ):
         """Add message to conversation history"""
         sid = self._get_session_id(user_id, session_id)
@@ -86,7 +89,8 @@ class ConversationMemory:
         message = Message(
             role=role,
             content=content,
-            metadata=metadata or {}
+            metadata=metadata or {},
+            embedding=embedding
         )
         self._sessions[sid].append(message)
         
@@ -150,6 +154,10 @@ class ConversationMemory:
             if "avg" not in ctx.aggregations:
                 ctx.aggregations.append("avg")
     
+    def has_history(self, user_id: str, session_id: Optional[str] = None) -> bool:
+        """Whether the session has any messages yet"""
+        return bool(self._sessions.get(self._get_session_id(user_id, session_id)))
+    
     def get_history(
         self,
         user_id: str,
@@ -177,14 +185,42 @@ class ConversationMemory:
         sid = self._get_session_id(user_id, session_id)
         return self._contexts.get(sid, ConversationContext())
     
+    def _related_turns(self, sid: str, embedding: Any, k: int) -> list[tuple[str, str]]:
+        """Top-k earlier (question, SQL) pairs most similar to the embedding, oldest first"""
+        import numpy as np
+        
+        messages = list(self._sessions.get(sid, ()))
+        scored = []
+        for i, msg in enumerate(messages):
+            if msg.role != "user" or msg.embedding is None:
+                continue
+            answer = messages[i + 1] if i + 1 < len(messages) else None
+            sql = answer.metadata.get("sql", "") if answer and answer.role == "assistant" else ""
+            score = float(np.dot(msg.embedding, embedding))
+            scored.append((score, i, msg.content, sql))
+        
+        top = sorted(scored, reverse=True)[:k]
+        return [(question, sql) for _, _, question, sql in sorted(top, key=lambda t: t[1])]
+    
     def get_context_for_prompt(
         self,
         user_id: str,
-        session_id: Optional[str] = None
+        session_id: Optional[str] = None,
+        query_embedding: Any = None,
+        k: int = 3
     ) -> str:
-        """Format context for LLM prompt"""
+        """
+        Format context for LLM prompt, or "" when there is none yet
+        
+        With a query embedding, the k earlier turns most similar to the
+        question are included instead of the last few messages, so the
+        prompt stays the same size however long the session gets.
+        """
         ctx = self.get_context(user_id, session_id)
-        history = self.get_history(user_id, session_id, max_messages=5)
+        related = []
+        if query_embedding is not None:
+            related = self._related_turns(self._get_session_id(user_id, session_id), query_embedding, k)
+        history = [] if related else self.get_history(user_id, session_id, max_messages=5)
         
         lines = ["## Conversation Context"]
         
@@ -197,6 +233,13 @@ class ConversationMemory:
         if ctx.last_sql:
             lines.append(f"- Last SQL: {ctx.last_sql[:200]}...")
         
+        if related:
+            lines.append("\n## Related Previous Questions")
+            for question, sql in related:
+                lines.append(f"- User: {question[:200]}")
+                if sql:
+                    lines.append(f"  SQL: {sql[:200]}")
+        
         if history:
             lines.append("\n## Recent Messages")
             for msg in history[-3:]:  # Last 3 messages
@@ -204,6 +247,9 @@ class ConversationMemory:
                 content = msg["content"][:200]
                 lines.append(f"- {role}: {content}")
         
+        # Nothing to add: an empty context keeps the question cacheable as asked
+        if len(lines) == 1:
+            return ""
         return "\n".join(lines)
     
     def clear_session(self, user_id: str, session_id: Optional[str] = None):
@@ -0,0 +1,65 @@
+"""
+Semantic Cache - Reuse answers for questions that mean the same thing
+Nearest-neighbour lookup over normalized question embeddings
+"""
+from typing import Optional, Any
+
+import numpy as np
+
+
+class SemanticCache:
+    """
+    Semantic Cache
+
+    Features:
+    - Cosine-similarity lookup against cached question embeddings
+    - Fixed-size matrix, oldest entry overwritten when full
+    - Embeddings stored as int8 with a per-row scale (4x smaller than float32)
+    - Values are opaque to the cache
+
+    Embeddings must be L2-normalized, so a dot product is the cosine similarity.
+    """
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._matrix: Optional[np.ndarray] = None  # int8 rows
+        self._scales: Optional[np.ndarray] = None  # float32, one per row
+        self._values: list[Any] = []
+        self._next = 0  # Slot to write once full
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def lookup(self, embedding: np.ndarray) -> Optional[tuple[float, Any]]:
+        """Return (similarity, value) of the closest cached question"""
+        if not self._values:
+            return None
+
+        # Only the cached side is quantized, so the query keeps full precision
+        n = len(self._values)
+        scores = (self._matrix[:n] @ np.asarray(embedding, dtype=np.float32)) * self._scales[:n]
+        best = int(scores.argmax())
+        return float(scores[best]), self._values[best]
+
+    def add(self, embedding: np.ndarray, value: Any):
+        """Cache a value under a question embedding"""
+        embedding = np.asarray(embedding, dtype=np.float32)
+        if self._matrix is None:
+            self._matrix = np.empty((self.max_size, embedding.shape[0]), dtype=np.int8)
+            self._scales = np.empty(self.max_size, dtype=np.float32)
+
+        if len(self._values) < self.max_size:
+            slot = len(self._values)
+            self._values.append(value)
+        else:
+            slot = self._next
+            self._values[slot] = value
+            self._next = (slot + 1) % self.max_size
+        scale = float(np.abs(embedding).max()) / 127 or 1.0
+        self._matrix[slot] = np.round(embedding / scale)
+        self._scales[slot] = scale
+
+    def clear(self):
+        """Clear all entries"""
+        self._values.clear()
+        self._next = 0
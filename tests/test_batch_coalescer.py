@@ -0,0 +1,71 @@
+"""
+Unit tests for BatchCoalescer request merging
+"""
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import asyncio
+
+import pytest
+
+from services.ai_gateway import BatchCoalescer
+
+
+class RecordingRunnable:
+    """Doubles its inputs, recording each batch it receives"""
+
+    def __init__(self):
+        self.batches = []
+
+    async def abatch(self, inputs, config=None, return_exceptions=False):
+        self.batches.append(list(inputs))
+        return [ValueError(x) if x < 0 else x * 2 for x in inputs]
+
+    async def ainvoke(self, input):
+        return input * 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_batch():
+    runnable = RecordingRunnable()
+    coalescer = BatchCoalescer(runnable, max_wait_ms=10, lane=None)
+
+    results = await asyncio.gather(*(coalescer.ainvoke(i) for i in range(5)))
+    assert results == [0, 2, 4, 6, 8]
+    assert runnable.batches == [[0, 1, 2, 3, 4]]
+    assert coalescer.get_stats()["batches"] == 1
+
+
+@pytest.mark.asyncio
+async def test_full_batch_is_sent_without_waiting():
+    runnable = RecordingRunnable()
+    coalescer = BatchCoalescer(runnable, max_batch_size=2, max_wait_ms=10_000, lane=None)
+
+    results = await asyncio.wait_for(
+        asyncio.gather(coalescer.ainvoke(1), coalescer.ainvoke(2)), timeout=1
+    )
+    assert results == [2, 4]
+
+
+@pytest.mark.asyncio
+async def test_errors_go_only_to_their_caller():
+    coalescer = BatchCoalescer(RecordingRunnable(), max_wait_ms=10, lane=None)
+
+    results = await asyncio.gather(
+        coalescer.ainvoke(1), coalescer.ainvoke(-1), return_exceptions=True
+    )
+    assert results[0] == 2
+    assert isinstance(results[1], ValueError)
+
+
+@pytest.mark.asyncio
+async def test_sequential_calls_use_separate_batches():
+    runnable = RecordingRunnable()
+    coalescer = BatchCoalescer(runnable, max_wait_ms=1, lane=None)
+
+    assert await coalescer.ainvoke(1) == 2
+    assert await coalescer.ainvoke(2) == 4
+    assert runnable.batches == [[1], [2]]
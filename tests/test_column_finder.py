@@ -0,0 +1,83 @@
+"""
+Unit tests for Column Finder matching and its per-term memo
+"""
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pytest
+
+from agents.tools.column_finder import ColumnFinderTool
+
+
+class FlakySemanticLayer:
+    """Semantic layer whose vector search fails until told otherwise"""
+    term_mappings = []
+
+    def __init__(self):
+        self.fail = True
+        self.calls = 0
+
+    def search_definitions(self, term, k=3):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("search unavailable")
+        return []
+
+
+def _columns(matches):
+    return [(m["table"], m["column"]) for m in matches]
+
+
+def test_exact_term_ignores_case_and_whitespace():
+    tool = ColumnFinderTool()
+
+    matches = tool._run("  Revenue ")
+    assert _columns(matches) == [("orders", "total_amount")]
+    assert matches[0]["score"] == 1.0
+
+
+def test_misspelled_term_matches_fuzzily():
+    tool = ColumnFinderTool()
+
+    matches = tool._run("revnue")
+    assert _columns(matches) == [("orders", "total_amount")]
+    assert 0 < matches[0]["score"] < 1.0
+
+
+def test_partial_term_matches_contained_terms():
+    tool = ColumnFinderTool()
+
+    assert ("products", "stock") in _columns(tool._run("stock level"))
+
+
+def test_unknown_term_has_no_matches():
+    assert ColumnFinderTool()._run("xyz") == []
+
+
+def test_memo_hands_out_copies():
+    tool = ColumnFinderTool()
+    tool._run("revenue")[0]["score"] = 0.0
+
+    assert tool._run("REVENUE")[0]["score"] == 1.0
+
+
+def test_failed_semantic_search_is_not_memoized():
+    layer = FlakySemanticLayer()
+    tool = ColumnFinderTool(semantic_layer=layer)
+
+    tool._run("revenue")
+    layer.fail = False
+    tool._run("revenue")
+    tool._run("revenue")
+    assert layer.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_batch_matches_single_lookups():
+    tool = ColumnFinderTool()
+
+    batch = await tool._arun_batch(["revenue", "revnue", "revenue"])
+    assert batch == [tool._run("revenue"), tool._run("revnue"), tool._run("revenue")]
@@ -0,0 +1,53 @@
+"""
+Unit tests for SQL validation and result formatting
+"""
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pytest
+
+from agents.tools import ExecuteSQLTool
+from agents.validation_agent import ValidationAgent
+
+
+@pytest.mark.parametrize("sql", [
+    "DELETE FROM orders",
+    "SELECT 1; DROP TABLE orders",
+    "UPDATE orders SET status = 'x'",
+])
+def test_write_queries_are_rejected(sql):
+    is_valid, error = ExecuteSQLTool()._validate_sql(sql)
+
+    assert not is_valid and error
+
+
+def test_select_is_accepted():
+    assert ExecuteSQLTool()._validate_sql("SELECT id FROM orders") == (True, "")
+
+
+def test_format_as_table_keeps_columns_of_ragged_rows():
+    table = ExecuteSQLTool().format_as_table({
+        "success": True,
+        "columns": ["id", "name", "city"],
+        "rows": [[1], [22, "Ann", "Hanoi", "extra"]],
+        "row_count": 2
+    })
+    header, separator, short_row, long_row = table.splitlines()[:4]
+
+    assert header.split(" | ") == ["id", "name", "city "]
+    assert short_row.split(" | ")[0] == "1 "
+    assert long_row.split(" | ") == ["22", "Ann ", "Hanoi"]
+    assert len(short_row) == len(long_row) == len(separator)
+
+
+def test_validation_memo_returns_copies():
+    agent = ValidationAgent()
+    first = agent.validate("SELECT * FROM orders")
+    first.warnings.append("mutated")
+
+    second = agent.validate("SELECT * FROM orders")
+    assert "mutated" not in second.warnings
+    assert second.sql == first.sql
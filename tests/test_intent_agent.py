@@ -0,0 +1,62 @@
+"""
+Unit tests for intent fast-path rules, caching and fallback
+"""
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from agents.intent_agent import IntentAgent
+
+INSIGHT_JSON = '{"intent_type": "insight_generation", "confidence": 0.9}'
+REPORT_JSON = '{"intent_type": "report_generation", "confidence": 0.9}'
+
+
+@pytest.mark.parametrize("question, intent_type", [
+    ("help", "query_assistance"),
+    ("How do I write a join?", "query_assistance"),
+    ("Generate the monthly sales report", "report_generation"),
+    ("P&L", "report_generation"),
+    ("Why did revenue drop in March?", "insight_generation"),
+    ("Show me top 5 products", "data_retrieval"),
+])
+def test_fast_path_classifies_unambiguous_questions(question, intent_type):
+    agent = IntentAgent(FakeListChatModel(responses=[INSIGHT_JSON]))
+
+    assert agent._fast_analysis(question).intent_type == intent_type
+
+
+@pytest.mark.parametrize("question", [
+    "help me find top customers",
+    "show revenue by region and explain the report",
+    "list orders and why they failed",
+    "compare this quarter with last quarter",
+])
+def test_fast_path_leaves_mixed_questions_to_llm(question):
+    agent = IntentAgent(FakeListChatModel(responses=[INSIGHT_JSON]))
+
+    assert agent._fast_analysis(question) is None
+
+
+@pytest.mark.asyncio
+async def test_llm_result_is_cached():
+    llm = FakeListChatModel(responses=[INSIGHT_JSON, REPORT_JSON])
+    agent = IntentAgent(llm)
+
+    first = await agent.analyze("list orders and why they failed")
+    second = await agent.analyze("  LIST orders and why they failed")
+    assert first.intent_type == second.intent_type == "insight_generation"
+    assert llm.i == 1
+
+
+@pytest.mark.asyncio
+async def test_unparseable_llm_output_falls_back_to_rules():
+    agent = IntentAgent(FakeListChatModel(responses=["not json"]))
+
+    result = await agent.analyze("compare revenue this quarter with last quarter")
+    assert result.intent_type == "data_retrieval"
+    assert result.query_type == "compare"
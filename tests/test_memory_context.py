@@ -0,0 +1,36 @@
+"""
+Unit tests for conversation memory prompt context
+"""
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from services.memory import ConversationMemory
+
+
+def test_new_session_has_no_context():
+    memory = ConversationMemory()
+
+    assert memory.get_context_for_prompt("alice", "s1") == ""
+    assert not memory.has_history("alice", "s1")
+
+
+def test_context_after_first_message():
+    memory = ConversationMemory()
+    memory.add_message("alice", "user", "Top 5 products by revenue", session_id="s1")
+
+    context = memory.get_context_for_prompt("alice", "s1")
+    assert context.startswith("## Conversation Context")
+    assert "Top 5 products by revenue" in context
+    assert memory.has_history("alice", "s1")
+
+
+def test_sessions_are_isolated():
+    memory = ConversationMemory()
+    memory.add_message("alice", "user", "Top 5 products by revenue", session_id="s1")
+
+    assert memory.get_context_for_prompt("alice", "s2") == ""
+    assert memory.get_context_for_prompt("bob", "s1") == ""
+    assert not memory.has_history("bob", "s1")
@@ -0,0 +1,131 @@
+"""
+Unit tests for the multi-database supervisor's response cache
+"""
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pytest
+
+from agents.multi_db_supervisor import (
+    MultiDatabaseSupervisor, _result_cache, _search_connectors, close_search_connectors,
+    invalidate_agent_supervisor
+)
+from agents.supervisor import QueryResponse
+from models import Agent, DatabaseSource
+
+
+class CountingSupervisor:
+    """Per-database supervisor double that answers every question"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def process_query(self, question, user_id, session_id, intent_hint=None):
+        self.calls.append((question, user_id, session_id, intent_hint))
+        return QueryResponse(
+            success=True, question=question, sql="SELECT 1", explanation="", data={"rows": [[1]]}
+        )
+
+
+@pytest.fixture
+def supervisor():
+    _result_cache.clear()
+    multi = MultiDatabaseSupervisor(Agent(id="agent-1"), llm=object())
+    multi.connectors["db-1"] = {"connector": None, "source": None, "name": "Sales", "type": "sqlite"}
+    multi._supervisors["db-1"] = CountingSupervisor()
+    yield multi
+    _result_cache.clear()
+
+
+def test_cache_key_is_scoped_to_conversation(supervisor):
+    key = supervisor._result_cache_key("db-1", "Top products", "alice", "s1")
+
+    assert key == supervisor._result_cache_key("db-1", "  top PRODUCTS ", "alice", "s1")
+    assert key != supervisor._result_cache_key("db-1", "Top products", "bob", "s1")
+    assert key != supervisor._result_cache_key("db-1", "Top products", "alice", "s2")
+    assert key != supervisor._result_cache_key("db-2", "Top products", "alice", "s1")
+    assert key != supervisor._result_cache_key("db-1", "Top products", "alice", "s1", "report_generation")
+
+
+@pytest.mark.asyncio
+async def test_repeated_question_is_served_from_cache(supervisor):
+    first = await supervisor.process_query("Top products", "alice", "s1", database_id="db-1")
+    second = await supervisor.process_query("Top products", "alice", "s1", database_id="db-1")
+
+    assert not first.cached and second.cached
+    assert len(supervisor._supervisors["db-1"].calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_other_users_are_not_served_cached_responses(supervisor):
+    await supervisor.process_query("Top products", "alice", "s1", database_id="db-1")
+    result = await supervisor.process_query("Top products", "bob", "s1", database_id="db-1")
+
+    assert not result.cached
+    assert len(supervisor._supervisors["db-1"].calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_cached_response_is_a_copy(supervisor):
+    first = await supervisor.process_query("Top products", "alice", "s1", database_id="db-1")
+    first.data["rows"].append([2])
+
+    second = await supervisor.process_query("Top products", "alice", "s1", database_id="db-1")
+    assert second.data["rows"] == [[1]]
+
+
+@pytest.mark.asyncio
+async def test_intent_hint_is_passed_through(supervisor):
+    await supervisor.process_query(
+        "Top products", "alice", "s1", database_id="db-1", intent_hint="report_generation"
+    )
+
+    assert supervisor._supervisors["db-1"].calls[0][3] == "report_generation"
+    with pytest.raises(ValueError):
+        await supervisor.process_query("Top products", database_id="db-1", intent_hint="bogus")
+
+
+@pytest.mark.asyncio
+async def test_invalidating_an_agent_drops_its_cached_responses(supervisor):
+    await supervisor.process_query("Top products", "alice", "s1", database_id="db-1")
+    _result_cache["agent-2:db-1:digest"] = _result_cache[next(iter(_result_cache))]
+
+    await invalidate_agent_supervisor("agent-1")
+    assert list(_result_cache) == ["agent-2:db-1:digest"]
+
+    result = await supervisor.process_query("Top products", "alice", "s1", database_id="db-1")
+    assert not result.cached
+
+
+class FakeSearchConnector:
+    """Search connector double that records disconnects"""
+
+    def __init__(self):
+        self.disconnected = False
+
+    async def disconnect(self):
+        self.disconnected = True
+
+
+@pytest.mark.asyncio
+async def test_shared_search_connector_closes_with_its_last_user(monkeypatch):
+    monkeypatch.setattr(
+        MultiDatabaseSupervisor, "_create_search_connector",
+        lambda self, db_source, port: FakeSearchConnector()
+    )
+    source = DatabaseSource(id="logs", name="Logs", db_type="elasticsearch", host="es", password="old")
+    first = MultiDatabaseSupervisor(Agent(id="agent-1", databases=[source]), llm=object())
+    second = MultiDatabaseSupervisor(Agent(id="agent-2", databases=[source]), llm=object())
+    connector = first.connectors["logs"]["connector"]
+    assert second.connectors["logs"]["connector"] is connector
+
+    await first.close()
+    assert not connector.disconnected
+
+    await second.close()
+    assert connector.disconnected
+    assert not _search_connectors
+    await close_search_connectors()
@@ -0,0 +1,70 @@
+"""
+Unit tests for the query result cache (exact, paraphrase and scoped lookups)
+"""
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from services.cache import QueryCache
+
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_exact_hit_ignores_case_and_whitespace():
+    cache = QueryCache()
+    cache.set("Top 5 products", "SELECT 1", {"rows": [[1]]})
+
+    hit = cache.get("  top 5   PRODUCTS ")
+    assert hit == {"sql": "SELECT 1", "result": {"rows": [[1]]}, "cached": True}
+
+
+def test_miss_for_unknown_question():
+    cache = QueryCache()
+    cache.set("Top 5 products", "SELECT 1", {})
+
+    assert cache.get("Top 5 customers") is None
+
+
+def test_scopes_are_isolated():
+    cache = QueryCache()
+    cache.set("Top 5 products", "SELECT 1", {}, scope="sales-db")
+
+    assert cache.get("Top 5 products", "sales-db") is not None
+    assert cache.get("Top 5 products", "hr-db") is None
+    assert cache.get("Top 5 products") is None
+
+
+def test_paraphrase_hit_is_scoped():
+    cache = QueryCache(similarity_threshold=0.95)
+    embedding = _unit([1.0, 0.0, 0.0])
+    cache.set("Top 5 products", "SELECT 1", {}, embedding=embedding, scope="sales-db")
+
+    assert cache.get_similar(_unit([1.0, 0.01, 0.0]), "sales-db")["sql"] == "SELECT 1"
+    assert cache.get_similar(_unit([0.0, 1.0, 0.0]), "sales-db") is None
+    assert cache.get_similar(embedding, "hr-db") is None
+
+
+def test_expired_entry_misses():
+    cache = QueryCache(ttl_seconds=-1)
+    cache.set("Top 5 products", "SELECT 1", {})
+
+    assert cache.get("Top 5 products") is None
+
+
+def test_lru_eviction_keeps_recent_entries():
+    cache = QueryCache(max_size=2)
+    cache.set("q1", "SELECT 1", {})
+    cache.set("q2", "SELECT 2", {})
+    cache.get("q1")
+    cache.set("q3", "SELECT 3", {})
+
+    assert cache.get("q1") is not None
+    assert cache.get("q2") is None
+    assert cache.get("q3") is not None
@@ -0,0 +1,106 @@
+"""
+Unit tests for SQL Writer result caching and context isolation
+"""
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import json
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from agents.sql_writer import AgentContext, SQLWriterAgent
+
+
+def _sql_json(sql: str) -> str:
+    return json.dumps({"intent": "list", "assumptions": "", "sql": sql, "explanation": sql})
+
+
+class CountingExecutor:
+    """execute_sql double returning the same rows on every run"""
+
+    def __init__(self, success=True):
+        self.success = success
+        self.calls = 0
+
+    async def _arun(self, sql):
+        self.calls += 1
+        return {"success": self.success, "columns": ["id"], "rows": [[1], [2]], "row_count": 2}
+
+
+@pytest.fixture
+def writer():
+    llm = FakeListChatModel(responses=[_sql_json("SELECT 1"), _sql_json("SELECT 2")])
+    return SQLWriterAgent(llm, db_type="sqlite")
+
+
+def test_context_dump_is_a_fresh_copy():
+    context = AgentContext(tables=[{"table": "orders"}])
+    dump = context.dump()
+    dump["tables"].append({"table": "customers"})
+    dump["tables"][0]["table"] = "mutated"
+    dump["extra"] = True
+
+    assert context.dump() == {"tables": [{"table": "orders"}], "columns": [], "values": [], "rules": []}
+
+
+@pytest.mark.asyncio
+async def test_cached_context_is_isolated_from_callers(writer):
+    await writer.generate_sql("Top products")
+    writer.context.columns.append({"column": "mutated"})
+
+    await writer.generate_sql("Top products")
+    assert {"column": "mutated"} not in writer.context.columns
+
+
+@pytest.mark.asyncio
+async def test_repeated_question_hits_sql_cache(writer):
+    first = await writer.generate_sql("Top products")
+    second = await writer.generate_sql("  top PRODUCTS", conversation_context="")
+
+    assert first.sql == second.sql == "SELECT 1"
+    assert writer.llm.i == 1
+
+
+@pytest.mark.asyncio
+async def test_follow_up_context_misses_sql_cache(writer):
+    await writer.generate_sql("Top products")
+    follow_up = await writer.generate_sql(
+        "Top products", conversation_context="## Conversation Context\n- User: only 2024"
+    )
+
+    assert follow_up.sql == "SELECT 2"
+
+
+@pytest.mark.asyncio
+async def test_exec_cache_replays_copies(writer):
+    writer.execute_sql = CountingExecutor()
+    first = await writer._execute("SELECT id FROM orders")
+    first["rows"][0].append("mutated")
+    first["rows"].append([3])
+
+    second = await writer._execute("SELECT  id FROM orders")
+    assert writer.execute_sql.calls == 1
+    assert second["rows"] == [[1], [2]]
+
+
+@pytest.mark.asyncio
+async def test_exec_cache_skips_failures(writer):
+    writer.execute_sql = CountingExecutor(success=False)
+    await writer._execute("SELECT id FROM orders")
+    await writer._execute("SELECT id FROM orders")
+
+    assert writer.execute_sql.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_equivalence_check_is_a_miss(writer):
+    class BrokenLLM:
+        async def ainvoke(self, prompt):
+            raise KeyError("provider error")
+
+    writer.llm = BrokenLLM()
+    assert await writer._questions_equivalent("Top products", "Best products") is False
@@ -0,0 +1,75 @@
+"""
+Unit tests for supervisor routing and query cache scoping
+"""
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import uuid
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from agents.intent_agent import IntentResult
+from agents.supervisor import SupervisorAgent
+from services.cache import get_cache
+
+
+def _supervisor(cache_scope: str) -> SupervisorAgent:
+    return SupervisorAgent(FakeListChatModel(responses=["{}"]), db_type="sqlite", cache_scope=cache_scope)
+
+
+@pytest.mark.parametrize("intent_type, route", [
+    ("data_retrieval", "data_retrieval"),
+    ("query_assistance", "data_retrieval"),
+    ("report_generation", "report_generation"),
+    ("insight_generation", "insight_generation"),
+    ("knowledge_base", "data_retrieval"),
+])
+def test_route_after_intent(intent_type, route):
+    state = {"intent": IntentResult(intent_type=intent_type), "error": None}
+
+    assert SupervisorAgent._route_after_intent(state) == route
+
+
+def test_route_after_intent_reports_errors():
+    assert SupervisorAgent._route_after_intent({"intent": None, "error": None}) == "error"
+    assert SupervisorAgent._route_after_intent({"intent": None, "error": "boom"}) == "error"
+
+
+def test_hinted_graphs_skip_intent_analysis():
+    graph = SupervisorAgent._get_graph("report_generation")
+
+    assert "analyze_intent" not in graph.nodes
+    assert "generate_report" in graph.nodes
+    assert SupervisorAgent._get_graph("data_retrieval") is SupervisorAgent._get_graph("query_assistance")
+
+
+def test_cache_scope_narrows_once_session_has_history():
+    supervisor = _supervisor("db-1")
+    user = f"user-{uuid.uuid4()}"
+    assert supervisor._get_cache_scope(user, "s1") == "db-1"
+
+    supervisor.memory.add_message(user, "user", "Top products", session_id="s1")
+    assert supervisor._get_cache_scope(user, "s1") == f"db-1:{user}:s1"
+    assert supervisor._get_cache_scope(user, "s2") == "db-1"
+
+
+@pytest.mark.asyncio
+async def test_cached_results_are_not_shared_across_databases():
+    question = f"Top products {uuid.uuid4()}"
+    get_cache().set(question, "SELECT 1", {"rows": [[1]]}, scope="db-1")
+    user = f"user-{uuid.uuid4()}"
+
+    result = await _supervisor("db-1").process_query(question, user_id=user)
+    assert result.cached and result.sql == "SELECT 1"
+
+    cached, _ = await _supervisor("db-2")._check_cache(question, "db-2")
+    assert cached is None
+
+
+def test_unknown_intent_hint_is_rejected():
+    with pytest.raises(ValueError):
+        _supervisor("db-1").process_query_sync("Top products", intent_hint="bogus")